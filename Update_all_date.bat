@@ -8,9 +8,7 @@ echo From old prices update.
 python -m reglament_task.nomenk_class
 echo Nomenklatura classification ready.
 python -m reglament_task.delta_price_process
-python -m accessold.statisticforacc
-python -m accessold.stockend
-python -m accessold.priceendmonth
+python -m reglament_task.refresh_pivots salespivot suppliespivot stockendmonth priceendmonth
 echo statistic for end of month ready
 python -m reglament_task.dromsend
 python -m reglament_task.zzapsend
@@ -19,7 +17,7 @@ python -m otherpoint.bychinaevgeni
 python -m from_folder_to_df.mailru_utils
 python -m from_folder_to_df.prices_to_sql
 python -m mail.cleanmail
-python -m statistic.calculation
+python -m reglament_task.refresh_pivots full_statistic
 python -m accessold.datastatisticforacc
 rem Запись информации о выполнении в лог-файл
 echo Процедура %~nx0 выполнена в %date% %time% >> log.txt
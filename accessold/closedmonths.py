@@ -0,0 +1,151 @@
+"""
+Состояние закрытых месяцев для инкрементального пересчета помесячных витрин.
+
+Витрина (priceendmonth, stockendmonth) записывает в ``public.closed_month_state``
+последний рассчитанный месяц и отпечаток исходной истории до его конца.  Если
+при следующем запуске отпечаток совпадает, прошлые месяцы не пересчитываются:
+к витрине дописываются только новые.  Иначе витрина строится заново.
+
+Для больших таблиц движений отпечаток считает сервер (``table_fingerprint``),
+чтобы закрытую историю не приходилось скачивать; после проверки сохраненного
+отпечатка новый досчитывается только по месяцам после него (``extend_fingerprint``).  ``one_c_window_start``
+подсказывает, с какого месяца история могла измениться при последней загрузке.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from datetime import date, datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+from ugkorea.reglament_task.one_c_receiver_runtime.partitions import TEXT_PERIOD_FUNCTION, text_period_expression
+
+STATE_TABLE = "closed_month_state"
+
+
+def history_fingerprint(frame: pd.DataFrame, columns: Sequence[str]) -> str:
+    """
+    Отпечаток набора строк, не зависящий от их порядка.
+
+    Сумма 64-битных хэшей строк по модулю 2**64 вместе с числом строк:
+    добавление, удаление или изменение любой строки меняет отпечаток.
+    """
+    if frame.empty:
+        return "0:0"
+    hashes = pd.util.hash_pandas_object(frame[list(columns)], index=False).to_numpy()
+    return f"{len(hashes)}:{int(hashes.sum()):016x}"
+
+
+def table_fingerprint(connection: object, table: str, where: str, parameters: dict) -> str:
+    """
+    Отпечаток строк таблицы, отобранных условием ``where``, посчитанный на сервере.
+
+    Сумма хэшей текстового представления строк не зависит от их порядка и
+    меняется при добавлении, удалении или изменении любой строки.
+    """
+    rows, total = connection.execute(
+        text(
+            "SELECT count(*), COALESCE(sum(hashtextextended(source::text, 0)), 0)::text "
+            f"FROM public.{table} AS source WHERE {where}"
+        ),
+        parameters,
+    ).one()
+    return f"{rows}:{total}"
+
+
+def extend_fingerprint(
+    connection: object, table: str, period: str, fingerprint: str, since: datetime, until: datetime
+) -> str:
+    """
+    Отпечаток ``table_fingerprint`` строк с ``period < until`` по отпечатку строк с ``period < since``.
+
+    Сумма хэшей аддитивна, поэтому сервер читает только строки [since, until),
+    а не всю закрытую историю заново.
+    """
+    if until == since:
+        return fingerprint
+    if until < since:
+        return table_fingerprint(connection, table, f"{period} < :until", {"until": until})
+    rows, total = fingerprint.split(":")
+    added_rows, added_total = table_fingerprint(
+        connection, table, f"{period} >= :since AND {period} < :until", {"since": since, "until": until}
+    ).split(":")
+    return f"{int(rows) + int(added_rows)}:{int(total) + int(added_total)}"
+
+
+def text_period(connection: object, column: str, pattern: str) -> str:
+    """
+    SQL-выражение даты текстовой колонки периода 1С.
+
+    one_c_text_period, если загрузчик ее создал (по ней построены индексы и
+    секции), иначе ``to_timestamp`` по шаблону ``pattern``.
+    """
+    has_function = connection.execute(
+        text("SELECT to_regprocedure(:signature) IS NOT NULL"),
+        {"signature": f"{TEXT_PERIOD_FUNCTION}(text)"},
+    ).scalar_one()
+    if has_function:
+        return text_period_expression(column)
+    return f"to_timestamp(BTRIM(\"{column}\"), '{pattern}')"
+
+
+def one_c_window_start(connection: object, contract: str, reference: datetime | None = None) -> date:
+    """
+    Начало окна, которое последняя загрузка из 1С могла перезаписать в таблице контракта.
+
+    update_analitics_gl перезагружает период с первого числа того же месяца год
+    назад (``rolling_bounds``) и не оставляет записей о прогоне; приемник
+    выгрузок пишет окно каждого контракта в one_c_import_contract.
+    """
+    reference = reference or datetime.now()
+    start = date(reference.year - 1, reference.month, 1)
+    if connection.execute(text("SELECT to_regclass('public.one_c_import_contract') IS NULL")).scalar():
+        return start
+    scope_start = connection.execute(
+        text(
+            "SELECT contract.scope_start FROM public.one_c_import_contract AS contract "
+            "JOIN public.one_c_import_run AS run ON run.run_id = contract.run_id "
+            "WHERE contract.contract_name = :contract AND contract.publication = 'period' "
+            "AND NOT contract.skipped "
+            "ORDER BY run.applied_at DESC, run.run_id DESC LIMIT 1"
+        ),
+        {"contract": contract},
+    ).scalar()
+    return start if scope_start is None else min(start, scope_start)
+
+
+def read_closed_month(engine: object, pivot: str) -> tuple[str, str] | None:
+    """(последний закрытый месяц 'YYYY-MM', отпечаток) витрины или None."""
+    with engine.connect() as connection:
+        if connection.execute(text(f"SELECT to_regclass('public.{STATE_TABLE}') IS NULL")).scalar():
+            return None
+        row = connection.execute(
+            text(f"SELECT last_month, fingerprint FROM public.{STATE_TABLE} WHERE pivot = :pivot"),
+            {"pivot": pivot},
+        ).one_or_none()
+    return None if row is None else (row.last_month, row.fingerprint)
+
+
+def save_closed_month(connection: object, pivot: str, last_month: str, fingerprint: str) -> None:
+    """Запоминает состояние в той же транзакции, что и запись витрины."""
+    if connection.execute(text(f"SELECT to_regclass('public.{STATE_TABLE}') IS NULL")).scalar():
+        # Витрины обновляются параллельно: таблицу создает только одна транзакция
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": STATE_TABLE})
+        connection.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS public.{STATE_TABLE} ("
+                "pivot text PRIMARY KEY, last_month text NOT NULL, "
+                "fingerprint text NOT NULL, updated_at timestamptz NOT NULL DEFAULT now())"
+            )
+        )
+    connection.execute(
+        text(
+            f"INSERT INTO public.{STATE_TABLE} (pivot, last_month, fingerprint) "
+            "VALUES (:pivot, :last_month, :fingerprint) "
+            "ON CONFLICT (pivot) DO UPDATE SET last_month = EXCLUDED.last_month, "
+            "fingerprint = EXCLUDED.fingerprint, updated_at = now()"
+        ),
+        {"pivot": pivot, "last_month": last_month, "fingerprint": fingerprint},
+    )
@@ -1,5 +1,46 @@
+import numpy as np
 import pandas as pd
+from sqlalchemy import text
 from ugkorea.db.database import get_db_engine
+from ugkorea.db.bulkwrite import write_frame
+from ugkorea.db.tablecache import mark_tables_changed
+from ugkorea.accessold.closedmonths import history_fingerprint, read_closed_month, save_closed_month
+
+# Дата создания для товаров без datasozdanija
+DEFAULT_CREATION_DATE = pd.Timestamp('2021-12-31')
+
+
+def month_grid(kods, month_ends):
+    """Все пары (kod, конец месяца), отсортированные по kod и дате."""
+    grid = pd.DataFrame({
+        'data': np.tile(np.asarray(month_ends, dtype='datetime64[ns]'), len(kods)),
+        'kod': np.repeat(np.asarray(kods, dtype=object), len(month_ends)),
+    })
+    return grid.sort_values(by=['kod', 'data'], kind='stable').reset_index(drop=True)
+
+
+def last_known_prices(grid, changes):
+    """
+    As-of join: для каждой строки сетки цена последнего изменения этого kod
+    с датой не позже data.  При нескольких изменениях в одну дату берется
+    последнее в порядке ``changes``.
+    """
+    left = grid[['kod', 'data']].astype({'data': 'datetime64[ns]'}).sort_values('data', kind='stable')
+    right = changes[['kod', 'data', 'tsena']].dropna(subset=['kod', 'data'])
+    # merge_asof требует одного типа kod, а пустая часть сетки бывает object
+    right = right.astype({'data': 'datetime64[ns]', 'kod': left['kod'].dtype}).sort_values('data', kind='stable')
+    matched = pd.merge_asof(left, right, on='data', by='kod', direction='backward')
+    return pd.Series(matched['tsena'].to_numpy(), index=left.index).reindex(grid.index)
+
+
+def fill_missing_prices(grid, prices, creation_dates, current_prices):
+    """Без истории цен: 0 до даты создания товара, иначе текущая цена из priceold."""
+    created = grid['kod'].map(creation_dates[~creation_dates.index.duplicated()])
+    created = created.fillna(DEFAULT_CREATION_DATE)
+    current = grid['kod'].map(current_prices[~current_prices.index.duplicated()])
+    fallback = pd.Series(np.where(grid['data'] < created, 0.0, current), index=grid.index)
+    return prices.fillna(fallback).astype(float)
+
 
 # Получаем объект подключения к базе данных
 engine = get_db_engine()
@@ -12,16 +53,17 @@ WHERE table_name = 'priceendmonth'
 """
 
 run_update = False
+stored_last_month = None
 
 if not pd.read_sql_query(query_check, engine).empty:
-    df_priceendmonth = pd.read_sql_query("SELECT * FROM priceendmonth", engine)
-    
-    # Преобразуем столбец 'data' в datetime
-    df_priceendmonth['data'] = pd.to_datetime(df_priceendmonth['data'], format='%Y-%m')
-    
     # Определяем последний месяц в данных
     last_month = (pd.Timestamp.today() - pd.DateOffset(months=1)).strftime('%Y-%m')
-    if any(df_priceendmonth['data'].dt.strftime('%Y-%m') == last_month):
+    with engine.connect() as connection:
+        stored_last_month, is_actual = connection.execute(
+            text("SELECT max(data), COALESCE(bool_or(data = :last_month), false) FROM priceendmonth"),
+            {'last_month': last_month},
+        ).one()
+    if is_actual:
         print("Данные актуальны. Обновление не требуется.")
     else:
         # В таблице нет данных за последний месяц, выполняем обновление
@@ -32,10 +74,10 @@ else:
 
 if run_update:
     # Определяем запросы для получения данных из каждой таблицы
-    query_nomenklatura = "SELECT * FROM public.nomenklatura"
-    query_postuplenija = "SELECT * FROM public.postuplenija"
-    query_tsenynakonetsmesjatsa = "SELECT * FROM public.tsenynakonetsmesjatsa"
-    query_priceold = "SELECT * FROM public.priceold"
+    query_nomenklatura = "SELECT kod, datasozdanija FROM public.nomenklatura"
+    query_postuplenija = "SELECT kod, data, tsenaroznichnaja, proveden FROM public.postuplenija"
+    query_tsenynakonetsmesjatsa = "SELECT period, nomenklaturakod, tsena, tiptseny FROM public.tsenynakonetsmesjatsa"
+    query_priceold = "SELECT kod, tsenarozn FROM public.priceold"
 
     # Получаем данные и преобразуем их в DataFrame
     df_nomenklatura = pd.read_sql_query(query_nomenklatura, engine)
@@ -97,39 +139,48 @@ if run_update:
 
     # Создаем диапазон дат с конца каждого месяца, начиная с самой ранней даты до текущей даты
     date_range = pd.date_range(start=earliest_date, end=pd.Timestamp.today(), freq='ME')
+    months = date_range.strftime('%Y-%m')
+    kods = df_priceactual.index
+
+    # Прошлые месяцы не пересчитываются, если история цен до конца последнего
+    # записанного месяца не изменилась с прошлого запуска
+    fingerprint_columns = ['kod', 'data', 'tsena']
+    state = read_closed_month(engine, 'priceendmonth') if stored_last_month else None
+    closed_months = int((months <= stored_last_month).sum()) if state else 0
+    incremental = (
+        state is not None
+        and state[0] == stored_last_month
+        and closed_months > 0
+        and history_fingerprint(
+            df_combined[df_combined['data'] <= date_range[closed_months - 1]], fingerprint_columns
+        ) == state[1]
+    )
 
-    # Создаем DataFrame для хранения цен на конец каждого месяца
-    result = pd.DataFrame({'data': date_range.repeat(df_priceactual.shape[0])})
-    result['kod'] = list(df_priceactual.index) * len(date_range)
-    result = result.sort_values(by=['kod', 'data']).reset_index(drop=True)
+    if incremental:
+        # Новые месяцы для всех товаров и вся история для товаров, которых еще нет в таблице
+        stored_kods = pd.read_sql_query("SELECT DISTINCT kod FROM priceendmonth", engine)['kod']
+        new_kods = kods[~kods.isin(stored_kods)]
+        # Закрытые месяцы до первой цены товара в истории заполнены из priceold и
+        # nomenklatura, которых нет в отпечатке: они пересчитываются при каждом запуске
+        first_prices = df_combined.groupby('kod')['data'].min()
+        fallback = month_grid(kods[kods.isin(stored_kods)], date_range[:closed_months])
+        fallback = fallback[~(fallback['kod'].map(first_prices) <= fallback['data'])]
+        result = pd.concat([
+            month_grid(kods, date_range[closed_months:]),
+            month_grid(new_kods, date_range[:closed_months]),
+            fallback,
+        ], ignore_index=True)
+        print(
+            f"Пересчет месяцев после {stored_last_month}: {len(date_range) - closed_months}, "
+            f"новых товаров: {len(new_kods)}, строк без истории цен: {len(fallback)}."
+        )
+    else:
+        result = month_grid(kods, date_range)
 
-    # Подготовка данных о датах создания товаров
+    # Последняя известная цена на конец каждого месяца; без истории — 0 до даты создания или текущая цена
     df_nomenklatura = df_nomenklatura.set_index('kod')
-    creation_dates = df_nomenklatura['datasozdanija']
-
-    # Подготовка таблицы изменений цен для быстрого доступа
-    df_combined = df_combined.sort_values(by=['kod', 'data'])
-    df_combined = df_combined.set_index(['kod', 'data']).sort_index()
-
-    # Функция для получения последней цены до текущей даты
-    def get_last_price(kod, date):
-        try:
-            changes = df_combined.loc[kod].loc[:date]
-            if not changes.empty:
-                return changes.iloc[-1]['tsena']
-        except KeyError:
-            pass
-        return None
-
-    # Применение функции для каждой строки
-    result['tsena'] = result.apply(lambda row: get_last_price(row['kod'], row['data']), axis=1)
-
-    # Обработка NaN значений
-    result['tsena'] = result.apply(
-        lambda row: row['tsena'] if pd.notnull(row['tsena']) else (
-            0 if row['data'] < creation_dates.get(row['kod'], pd.Timestamp('2021-12-31')) else df_priceactual.loc[row['kod'], 'tsena']
-        ), axis=1
-    )
+    result['tsena'] = last_known_prices(result, df_combined)
+    result['tsena'] = fill_missing_prices(result, result['tsena'], df_nomenklatura['datasozdanija'], df_priceactual['tsena'])
 
     # Приводим результат к нужному формату
     result['data'] = result['data'].dt.strftime('%Y-%m')
@@ -138,7 +189,31 @@ if run_update:
     print("result (вертикальная таблица):")
     print(result.head())
 
-    # Сохраняем результат в таблицу priceendmonth
-    result.to_sql('priceendmonth', engine, if_exists='replace', index=False)
-
-    print("Данные успешно сохранены в таблицу priceendmonth.")
+    # Сохраняем результат в таблицу priceendmonth вместе с отпечатком истории закрытых месяцев
+    with engine.begin() as connection:
+        if incremental:
+            connection.execute(
+                text("DELETE FROM priceendmonth WHERE NOT (kod = ANY(:kods))"),
+                {'kods': list(kods)},
+            )
+            connection.execute(
+                text(
+                    "DELETE FROM priceendmonth AS stored "
+                    "USING unnest(CAST(:kods AS text[]), CAST(:months AS text[])) AS fallback(kod, data) "
+                    "WHERE stored.kod = fallback.kod AND stored.data = fallback.data"
+                ),
+                {'kods': list(fallback['kod']), 'months': list(fallback['data'].dt.strftime('%Y-%m'))},
+            )
+            written = write_frame(result, 'priceendmonth', connection, if_exists='append', index=False)
+        else:
+            written = write_frame(result, 'priceendmonth', connection, if_exists='replace', index=False)
+        mark_tables_changed(connection, ['priceendmonth'])
+        if len(date_range):
+            save_closed_month(
+                connection,
+                'priceendmonth',
+                months[-1],
+                history_fingerprint(df_combined[df_combined['data'] <= date_range[-1]], fingerprint_columns),
+            )
+
+    print(f"Данные успешно сохранены в таблицу priceendmonth: {written.describe()}.")
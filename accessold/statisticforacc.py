@@ -1,118 +1,195 @@
+import sys
+import time
+
 import pandas as pd
 from ugkorea.db.database import get_db_engine
+from ugkorea.db.tablecache import mark_tables_changed
+from ugkorea.accessold.closedmonths import (
+    extend_fingerprint,
+    one_c_window_start,
+    read_closed_month,
+    save_closed_month,
+    table_fingerprint,
+    text_period,
+)
+from ugkorea.statistic.loaddata import NUMBER_PATTERN
 from sqlalchemy.sql import text
 
+
+def number_expression(column, *, grouping=True):
+    """
+    SQL-выражение числа из текстовой колонки; нечисловые значения дают NULL.
+
+    grouping=True повторяет прежнюю очистку сумм: удаляются неразрывные и
+    обычные пробелы, запятая заменяется точкой.  Иначе только обрезаются края.
+    """
+    value = f"{column}::text"
+    if grouping:
+        value = f"REPLACE(REPLACE(REPLACE({value}, CHR(160), ''), ' ', ''), ',', '.')"
+    value = f"regexp_replace({value}, '^\\s+|\\s+$', '', 'g')"
+    return f"CASE WHEN {value} ~ :number THEN {value}::numeric END"
+
+
+def sales_aggregate(period):
+    """Продажи по kod и месяцу: kolichestvo и summa из prodazhi."""
+    return f"""
+        SELECT
+            BTRIM(kod) AS kod,
+            to_char({period}, 'YYYY-MM') AS year_month,
+            COALESCE(sum({number_expression('kolichestvo', grouping=False)}), 0)::float8 AS kolichestvo,
+            COALESCE(sum({number_expression('summa')}), 0)::float8 AS summa
+        FROM public.prodazhi
+        WHERE kod IS NOT NULL AND {period} >= :since
+        GROUP BY 1, 2
+    """
+
+
+def supplies_aggregate(period):
+    """Поступления по kod и месяцу: kolichestvo и summa = kolichestvo * tsena по строкам."""
+    kolichestvo = f"COALESCE({number_expression('kolichestvo', grouping=False)}, 0)"
+    tsena = f"COALESCE({number_expression('tsena')}, 0)"
+    return f"""
+        SELECT
+            BTRIM(kod) AS kod,
+            to_char({period}, 'YYYY-MM') AS year_month,
+            sum({kolichestvo})::float8 AS kolichestvo,
+            sum({kolichestvo} * {tsena})::float8 AS summa
+        FROM public.postuplenija
+        WHERE kod IS NOT NULL AND {period} >= :since
+        GROUP BY 1, 2
+    """
+
+
+# Витрина -> (исходная таблица, контракт выгрузки 1С, колонка периода, запрос агрегата)
+PIVOTS = {
+    'salespivot': ('prodazhi', 'sales', 'period', sales_aggregate),
+    'suppliespivot': ('postuplenija', 'receipts', 'data', supplies_aggregate),
+}
+# Начало истории для полного пересчета
+HISTORY_START = pd.Timestamp('1900-01-01')
+
+
+def has_primary_key(connection, pivot):
+    return connection.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:table_name) AND contype = 'p')"
+        ),
+        {'table_name': f'public.{pivot}'},
+    ).scalar_one()
+
+
+def refresh_pivot(engine, pivot, full=False):
+    """
+    Пересчитывает помесячную витрину на сервере и обновляет только изменившиеся строки.
+
+    Месяцы до окна последней загрузки из 1С считаются закрытыми: пока отпечаток
+    их исходных строк совпадает с сохраненным, пересчитываются только месяцы
+    после последнего закрытого.  Строки витрины обновляются через
+    INSERT ... ON CONFLICT, исчезнувшие пары (kod, месяц) удаляются, таблица
+    остается доступной читателям всё время пересчета.
+    """
+    source, contract, column, aggregate = PIVOTS[pivot]
+    state = read_closed_month(engine, pivot)
+    started = time.perf_counter()
+    # Один снимок базы: сохраненный отпечаток относится к тем же строкам, что агрегированы
+    with engine.connect().execution_options(isolation_level='REPEATABLE READ') as connection, connection.begin():
+        if column == 'period':
+            period = text_period(connection, column, 'DD.MM.YYYY')
+        else:
+            period = f'"{column}"::timestamp'
+        closed_month = pd.Period(one_c_window_start(connection, contract), freq='M') - 1
+
+        since = HISTORY_START
+        if not has_primary_key(connection, pivot):
+            # Первый запуск или таблица прежнего формата без ключа
+            connection.execute(text(f"DROP TABLE IF EXISTS public.{pivot}"))
+            connection.execute(
+                text(
+                    f"CREATE TABLE public.{pivot} (kod text NOT NULL, year_month text NOT NULL, "
+                    "kolichestvo double precision NOT NULL, summa double precision NOT NULL, "
+                    "PRIMARY KEY (kod, year_month))"
+                )
+            )
+        elif not full and state is not None:
+            stored_until = (pd.Period(state[0], freq='M') + 1).to_timestamp()
+            stored_history = table_fingerprint(
+                connection, source, f"{period} < :until", {'until': stored_until.to_pydatetime()}
+            )
+            if stored_history == state[1]:
+                since = stored_until
+
+        upserted, removed, fresh = connection.execute(
+            text(
+                f"""
+                WITH fresh AS ({aggregate(period)}),
+                upserted AS (
+                    INSERT INTO public.{pivot} AS target (kod, year_month, kolichestvo, summa)
+                    SELECT kod, year_month, kolichestvo, summa FROM fresh
+                    ON CONFLICT (kod, year_month) DO UPDATE
+                    SET kolichestvo = EXCLUDED.kolichestvo, summa = EXCLUDED.summa
+                    WHERE (target.kolichestvo, target.summa)
+                        IS DISTINCT FROM (EXCLUDED.kolichestvo, EXCLUDED.summa)
+                    RETURNING 1
+                ),
+                removed AS (
+                    DELETE FROM public.{pivot} AS target
+                    WHERE target.year_month >= :since_month
+                      AND NOT EXISTS (
+                          SELECT 1 FROM fresh
+                          WHERE fresh.kod = target.kod AND fresh.year_month = target.year_month
+                      )
+                    RETURNING 1
+                )
+                SELECT (SELECT count(*) FROM upserted), (SELECT count(*) FROM removed),
+                       (SELECT count(*) FROM fresh)
+                """
+            ),
+            {
+                'since': since.to_pydatetime(),
+                'since_month': since.strftime('%Y-%m'),
+                'number': NUMBER_PATTERN,
+            },
+        ).one()
+
+        if upserted or removed:
+            # Отметка для витрин, которые строятся из этой (reglament_task.refresh_pivots)
+            mark_tables_changed(connection, [pivot])
+
+        until = (closed_month + 1).to_timestamp().to_pydatetime()
+        if since == HISTORY_START:
+            fingerprint = table_fingerprint(connection, source, f"{period} < :until", {'until': until})
+        else:
+            # Проверенный отпечаток закрытых месяцев дополняется только месяцами после них
+            fingerprint = extend_fingerprint(connection, source, period, stored_history, since.to_pydatetime(), until)
+        save_closed_month(connection, pivot, str(closed_month), fingerprint)
+
+    window = 'вся история' if since == HISTORY_START else f"месяцы с {since:%Y-%m}"
+    print(
+        f"[Загрузка] Таблица '{pivot}': {window}, {fresh} строк агрегата, "
+        f"обновлено {upserted}, удалено {removed} за {time.perf_counter() - started:.1f} с."
+    )
+
+
 # Подключение к базе данных
 engine = get_db_engine()
 
-# Получение данных из таблицы prodazhi с нужными колонками
-query_prodazhi = "SELECT kod, kolichestvo, summa, period FROM prodazhi"
-prodazhi_df = pd.read_sql(query_prodazhi, engine)
-prodazhi_df.name = "prodazhi"
-
-# Преобразуем колонку period в формат datetime для prodazhi_df
-prodazhi_df['period'] = pd.to_datetime(prodazhi_df['period'], format='%d.%m.%Y')
-
-# Добавляем колонку year_month для группировки по месяцам
-prodazhi_df['year_month'] = prodazhi_df['period'].dt.to_period('M')
-
-# Удаляем неразрывные пробелы \xa0, обычные пробелы и заменяем запятую на точку для корректного преобразования
-prodazhi_df["summa"] = (
-    prodazhi_df["summa"]
-    .astype(str)
-    .str.replace("\xa0", "", regex=True)  # Удаление неразрывных пробелов
-    .str.replace(" ", "")  # Удаление обычных пробелов
-    .str.replace(",", ".")  # Замена запятой на точку
-    .str.strip()
-)
-prodazhi_df["summa"] = pd.to_numeric(prodazhi_df["summa"], errors="coerce").fillna(0)
-
-# Убираем пробелы и преобразуем kolichestvo в числовой формат
-prodazhi_df["kolichestvo"] = prodazhi_df["kolichestvo"].astype(str).str.strip()
-prodazhi_df["kolichestvo"] = pd.to_numeric(
-    prodazhi_df["kolichestvo"], errors="coerce"
-).fillna(0)
-
-monthly_sales = prodazhi_df.groupby(['kod', 'year_month']).agg({
-    'kolichestvo': 'sum',
-    'summa': 'sum'
-}).reset_index()
-
-# Преобразуем данные в длинный формат
-sales_long = monthly_sales.pivot_table(index=['kod', 'year_month'], values=['kolichestvo', 'summa']).reset_index()
-
-# Преобразуем столбцы year_month в строки
-sales_long['year_month'] = sales_long['year_month'].astype(str)
-sales_long['kod'] = sales_long['kod'].astype(str).str.strip()
-# Сохраняем результат в таблицу базы данных
-sales_long.to_sql('salespivot', engine, schema='public', if_exists='replace', index=False)
-
-# Проверка успешности сохранения
-with engine.connect() as conn:
-    result = conn.execute(text("SELECT COUNT(*) FROM public.salespivot"))
-    count = result.fetchone()[0]
-
-if count > 0:
-    print(f"Таблица salespivot успешно сохранена в базу данных. Количество записей: {count}")
-else:
-    print("Ошибка при сохранении таблицы salespivot в базу данных.")
-
-# Вывод первых 20 строк из таблицы salespivot
-print("Первые 20 строк из таблицы salespivot:")
-sales_pivot_first_20 = pd.read_sql("SELECT * FROM public.salespivot LIMIT 20", engine)
-print(sales_pivot_first_20)
-
-# Работа с таблицей postuplenija
-query_postuplenija = "SELECT kod, kolichestvo, tsena, data FROM postuplenija"
-postuplenija_df = pd.read_sql(query_postuplenija, engine)
-postuplenija_df.name = "postuplenija"
-
-# Преобразуем колонку data в формат datetime для postuplenija_df
-postuplenija_df['data'] = pd.to_datetime(postuplenija_df['data'], format='%Y-%m-%d %H:%M:%S')
-
-# Добавляем колонку year_month для группировки по месяцам
-postuplenija_df['year_month'] = postuplenija_df['data'].dt.to_period('M')
-
-# Рассчитываем сумму (kolichestvo * tsena)
-postuplenija_df['kolichestvo'] = pd.to_numeric(postuplenija_df['kolichestvo'], errors='coerce').fillna(0)
-# Убираем пробелы и заменяем запятую на точку для корректного преобразования
-postuplenija_df["tsena"] = (
-    postuplenija_df["tsena"]
-    .astype(str)
-    .str.replace("\xa0", "", regex=True)  # Удаление неразрывных пробелов
-    .str.replace(" ", "")  # Удаление пробелов, используемых как разделители тысяч
-    .str.replace(",", ".")  # Замена запятой на точку
-    .str.strip()
-)
-postuplenija_df['tsena'] = pd.to_numeric(postuplenija_df['tsena'], errors='coerce').fillna(0)
-postuplenija_df['summa'] = postuplenija_df['kolichestvo'] * postuplenija_df['tsena']
-
-# Группируем данные по kod и year_month и суммируем kolichestvo и summa
-monthly_supplies = postuplenija_df.groupby(['kod', 'year_month']).agg({
-    'kolichestvo': 'sum',
-    'summa': 'sum'
-}).reset_index()
-
-# Преобразуем данные в длинный формат
-supplies_long = monthly_supplies.pivot_table(index=['kod', 'year_month'], values=['kolichestvo', 'summa']).reset_index()
-
-# Преобразуем столбцы year_month в строки
-supplies_long['year_month'] = supplies_long['year_month'].astype(str)
-supplies_long['kod'] = supplies_long['kod'].astype(str).str.strip()
-# Сохраняем результат в таблицу базы данных
-supplies_long.to_sql('suppliespivot', engine, schema='public', if_exists='replace', index=False)
-
-# Проверка успешности сохранения
-with engine.connect() as conn:
-    result = conn.execute(text("SELECT COUNT(*) FROM public.suppliespivot"))
-    count = result.fetchone()[0]
-
-if count > 0:
-    print(f"Таблица suppliespivot успешно сохранена в базу данных. Количество записей: {count}")
-else:
-    print("Ошибка при сохранении таблицы suppliespivot в базу данных.")
-
-# Вывод первых 20 строк из таблицы suppliespivot
-print("Первые 20 строк из таблицы suppliespivot:")
-supplies_pivot_first_20 = pd.read_sql("SELECT * FROM public.suppliespivot LIMIT 20", engine)
-print(supplies_pivot_first_20)
+# Имена витрин в аргументах ограничивают пересчет ими (так их запускает reglament_task.refresh_pivots)
+selected = [pivot for pivot in PIVOTS if pivot in sys.argv[1:]] or list(PIVOTS)
+
+for pivot in selected:
+    refresh_pivot(engine, pivot, full='--full' in sys.argv)
+
+    # Проверка успешности сохранения
+    with engine.connect() as conn:
+        result = conn.execute(text(f"SELECT COUNT(*) FROM public.{pivot}"))
+        count = result.fetchone()[0]
+
+    if count > 0:
+        print(f"Таблица {pivot} успешно сохранена в базу данных. Количество записей: {count}")
+    else:
+        print(f"Ошибка при сохранении таблицы {pivot} в базу данных.")
+
+    # Вывод первых 20 строк из таблицы
+    print(f"Первые 20 строк из таблицы {pivot}:")
+    print(pd.read_sql(f"SELECT * FROM public.{pivot} LIMIT 20", engine))
@@ -1,91 +1,143 @@
+import numpy as np
 import pandas as pd
+from sqlalchemy import text
 from ugkorea.db.database import get_db_engine
-from datetime import datetime, timedelta
+from ugkorea.db.bulkwrite import write_frame
+from ugkorea.db.tablecache import mark_tables_changed
+from ugkorea.accessold.closedmonths import (
+    extend_fingerprint,
+    read_closed_month,
+    save_closed_month,
+    table_fingerprint,
+    text_period,
+)
+
+# Склад, по которому считаются остатки
+STOCK_WAREHOUSE = "Основной склад компании"
+# Формат колонки period в registrostatkitovarov
+PERIOD_FORMAT = '%d.%m.%Y %H:%M:%S'
+PERIOD_PATTERN = 'DD.MM.YYYY HH24:MI:SS'
+
+
+def load_movements(connection, period, since=None):
+    """Движения основного склада из registrostatkitovarov (с начала месяца since, если он задан)."""
+    query = (
+        "SELECT nomenklaturakod, period, viddvizhenija, kolichestvo FROM public.registrostatkitovarov "
+        "WHERE kolichestvo IS NOT NULL AND skladkompanii = :warehouse"
+    )
+    params = {'warehouse': STOCK_WAREHOUSE}
+    if since is not None:
+        query += f" AND {period} >= :since"
+        params['since'] = since.to_timestamp().to_pydatetime()
+    dataframe = pd.read_sql(text(query), connection, params=params)
+
+    # Преобразуем колонку period в тип данных datetime
+    dataframe['period'] = pd.to_datetime(dataframe['period'], format=PERIOD_FORMAT)
+    # Заменяем запятые на точки в колонке kolichestvo и преобразуем в тип данных float
+    dataframe['kolichestvo'] = dataframe['kolichestvo'].str.replace(',', '.').astype(float)
+    dataframe['month'] = dataframe['period'].dt.to_period('M')
+    # Расход уменьшает остаток, остальные движения увеличивают
+    dataframe['adjusted_kolichestvo'] = np.where(
+        dataframe['viddvizhenija'] == 'Расход', -dataframe['kolichestvo'], dataframe['kolichestvo']
+    )
+    return dataframe
+
+
+def month_end_balances(movements, opening=None):
+    """
+    Матрица остатков kod × месяц: накопленная сумма помесячного чистого движения.
+
+    Месяцы — только те, в которых были движения.  opening — остатки по kod на
+    начало первого месяца (конец последнего закрытого), коды без движений до
+    своего первого месяца получают 0.
+    """
+    if movements.empty:
+        return pd.DataFrame(index=pd.Index([], name='nomenklaturakod'), dtype=float)
+    net = (
+        movements.groupby(['nomenklaturakod', 'month'])['adjusted_kolichestvo'].sum()
+        .unstack('month', fill_value=0.0)
+        .sort_index(axis=1)
+    )
+    if opening is not None and not net.empty:
+        net = net.reindex(net.index.union(opening.index), fill_value=0.0)
+        net.iloc[:, 0] += opening.reindex(net.index, fill_value=0.0)
+    return net.cumsum(axis=1)
+
+
+def to_long_format(balances):
+    """Матрица остатков в вертикальном формате (nomenklaturakod, month, balance)."""
+    long_format_df = balances.rename_axis(index='nomenklaturakod', columns=None).reset_index().melt(
+        id_vars=['nomenklaturakod'], var_name='month', value_name='balance'
+    )
+    # Преобразуем значения 'month' в строки
+    long_format_df['month'] = long_format_df['month'].astype(str)
+    return long_format_df
+
 
 # Получаем объект подключения к базе данных
 engine = get_db_engine()
 
-# SQL-запрос для получения всех данных из таблицы registrostatkitovarov
-query = "SELECT * FROM public.registrostatkitovarov"
-
-# Выполняем запрос и сохраняем результат в переменной dataframe
-dataframe = pd.read_sql(query, engine)
-
-# Убираем строки, где в колонке kolichestvo значение None
-dataframe = dataframe.dropna(subset=['kolichestvo'])
-
-# Оставляем только строки, где в колонке skladkompanii значение "Основной склад компании"
-dataframe = dataframe[dataframe['skladkompanii'] == "Основной склад компании"]
-
-# Преобразуем колонку period в тип данных datetime
-dataframe['period'] = pd.to_datetime(dataframe['period'], format='%d.%m.%Y %H:%M:%S')
-
-# Заменяем запятые на точки в колонке kolichestvo и преобразуем в тип данных float
-dataframe['kolichestvo'] = dataframe['kolichestvo'].str.replace(',', '.').astype(float)
-
-# Сбрасываем индекс
-dataframe.reset_index(drop=True, inplace=True)
-
-# Определяем уникальные месяцы в данных
-dataframe['month'] = dataframe['period'].dt.to_period('M')
-unique_months = sorted(dataframe['month'].unique())
-
-# Создаем столбец, который будет изменять знак kolichestvo в зависимости от viddvizhenija
-dataframe['adjusted_kolichestvo'] = dataframe.apply(
-    lambda row: -row['kolichestvo'] if row['viddvizhenija'] == 'Расход' else row['kolichestvo'], axis=1)
-
-# Функция для вычисления начального остатка до конца месяца
-def calculate_initial_balance(df):
-    return df['adjusted_kolichestvo'].sum()
-
-# Рассчитываем начальные остатки на конец первого месяца
-first_month_end = unique_months[0].to_timestamp(how='end')
-initial_df = dataframe[dataframe['period'] <= first_month_end]
-
-initial_balances = initial_df.groupby('nomenklaturakod').agg({'adjusted_kolichestvo': 'sum'}).reset_index()
-initial_balances.columns = ['nomenklaturakod', 'balance']
-
-# Преобразуем результат в DataFrame
-result_df = initial_balances.copy()
-result_df['month'] = unique_months[0]
-
-# Функция для обновления баланса за месяц
-def update_balance(df, balances):
-    for _, row in df.iterrows():
-        kod = row['nomenklaturakod']
-        if kod not in balances:
-            balances[kod] = 0  # Добавляем новый код если его нет в балансе
-        balances[kod] += row['adjusted_kolichestvo']
-    return balances
-
-# Рассчитываем остатки для каждого следующего месяца
-balances = initial_balances.set_index('nomenklaturakod')['balance'].to_dict()
-for month in unique_months[1:]:
-    month_start = month.to_timestamp(how='start')
-    month_end = month.to_timestamp(how='end')
-    month_df = dataframe[(dataframe['period'] > month_start) & (dataframe['period'] <= month_end)]
-    balances = update_balance(month_df, balances)
-    month_result = pd.DataFrame(list(balances.items()), columns=['nomenklaturakod', 'balance'])
-    month_result['month'] = month
-    result_df = pd.concat([result_df, month_result], ignore_index=True)
-
-# Преобразуем результат в сводную таблицу
-pivot_table = result_df.pivot(index='nomenklaturakod', columns='month', values='balance').fillna(0)
-
-# Сортируем колонки по возрастанию месяцев
-pivot_table = pivot_table.sort_index(axis=1)
-
-# Преобразуем сводную таблицу обратно в длинный формат
-long_format_df = pivot_table.reset_index().melt(id_vars=['nomenklaturakod'], var_name='month', value_name='balance')
-
-# Преобразуем значения 'month' в строки
-long_format_df['month'] = long_format_df['month'].astype(str)
-
-# Убираем колонку current_balance
-final_df = long_format_df
-
-# Загружаем таблицу в базу данных в схему public с названием stockendmonth в вертикальном формате
-final_df.to_sql('stockendmonth', engine, schema='public', if_exists='replace', index=False)
+current_month = pd.Timestamp.today().to_period('M')
+state = read_closed_month(engine, 'stockendmonth')
+
+# Один снимок базы на весь запуск: отпечаток сохраняется по тем же движениям, что посчитаны
+with engine.connect().execution_options(isolation_level='REPEATABLE READ') as connection, connection.begin():
+    period = text_period(connection, 'period', PERIOD_PATTERN)
+    opening = None
+    if state is not None and connection.execute(text("SELECT to_regclass('public.stockendmonth') IS NOT NULL")).scalar():
+        # Закрытые месяцы не пересчитываются, пока их движения не менялись
+        closed_month = pd.Period(state[0], freq='M')
+        closed_history = table_fingerprint(
+            connection, 'registrostatkitovarov', f"{period} < :until",
+            {'until': (closed_month + 1).to_timestamp().to_pydatetime()},
+        )
+        if closed_history == state[1]:
+            opening = pd.read_sql(
+                text("SELECT nomenklaturakod, balance FROM public.stockendmonth WHERE month = :month"),
+                connection, params={'month': state[0]},
+            ).set_index('nomenklaturakod')['balance']
+            if opening.empty:
+                opening = None
+
+    if opening is None:
+        # Полный пересчет всей истории движений
+        dataframe = load_movements(connection, period)
+        final_df = to_long_format(month_end_balances(dataframe))
+        result = write_frame(final_df, 'stockendmonth', connection, schema='public', if_exists='replace', index=False)
+    else:
+        # Остатки последнего закрытого месяца плюс движения после него
+        dataframe = load_movements(connection, period, since=closed_month + 1)
+        final_df = to_long_format(month_end_balances(dataframe, opening))
+        # Коды, впервые появившиеся в новых месяцах, получают нулевые остатки в закрытых месяцах
+        new_kods = final_df.loc[~final_df['nomenklaturakod'].isin(opening.index), 'nomenklaturakod'].unique()
+        closed_months = pd.read_sql(
+            text("SELECT DISTINCT month FROM public.stockendmonth WHERE month <= :month ORDER BY month"),
+            connection, params={'month': state[0]},
+        )['month']
+        backfill = pd.DataFrame({
+            'nomenklaturakod': np.repeat(new_kods, len(closed_months)),
+            'month': np.tile(closed_months.to_numpy(), len(new_kods)),
+            'balance': 0.0,
+        })
+        final_df = pd.concat([backfill, final_df], ignore_index=True)
+        connection.execute(text("DELETE FROM public.stockendmonth WHERE month > :month"), {'month': state[0]})
+        result = write_frame(final_df, 'stockendmonth', connection, schema='public', if_exists='append', index=False)
+        print(f"Пересчитаны месяцы после {state[0]}, новых кодов: {len(new_kods)}.")
+    mark_tables_changed(connection, ['stockendmonth'])
+
+    # Последний закрытый месяц с движениями становится точкой отсчета для следующего запуска
+    closed = sorted(month for month in dataframe['month'].unique() if month < current_month)
+    if closed:
+        until = (closed[-1] + 1).to_timestamp().to_pydatetime()
+        if opening is None:
+            fingerprint = table_fingerprint(connection, 'registrostatkitovarov', f"{period} < :until", {'until': until})
+        else:
+            # Проверенный отпечаток закрытых месяцев дополняется только новыми движениями
+            fingerprint = extend_fingerprint(
+                connection, 'registrostatkitovarov', period, closed_history,
+                (closed_month + 1).to_timestamp().to_pydatetime(), until,
+            )
+        save_closed_month(connection, 'stockendmonth', str(closed[-1]), fingerprint)
 
 # Выводим сообщение о том, что все сделано успешно
-print("Данные успешно загружены в таблицу 'stockendmonth' в схеме 'public'.")
+print(f"Данные успешно загружены в таблицу 'stockendmonth' в схеме 'public': {result.describe()}.")
@@ -1,4 +1,5 @@
 from ugkorea.db.database import get_db_engine
+from ugkorea.db.tablecache import read_base_table
 import pandas as pd
 import os
 import numpy as np
@@ -24,12 +25,12 @@ def load_foranalitics_data(engine):
         return df
 
     # Загрузка данных с нормализацией
-    nomenklatura_query = """
-    SELECT kod, artikul, proizvoditel, naimenovaniepolnoe, 
-           bazovajaedinitsa AS edizm, datasozdanija, vidnomenklatury
-    FROM nomenklatura
-    """
-    nomenklatura_df = load_and_normalize_table(nomenklatura_query)
+    nomenklatura_df = normalize_kod_column(read_base_table(
+        engine,
+        "nomenklatura",
+        ["kod", "artikul", "proizvoditel", "naimenovaniepolnoe", "bazovajaedinitsa", "datasozdanija", "vidnomenklatury"],
+        rename={"bazovajaedinitsa": "edizm"},
+    ))
 
     nomenklaturaold_query = """
     SELECT kod, stellazh, pometkaudalenija
@@ -49,17 +50,11 @@ def load_foranalitics_data(engine):
     """
     middlemaxprice_df = load_and_normalize_table(middlemaxprice_query)
 
-    priceold_query = """
-    SELECT kod, tsenazakup, tsenarozn
-    FROM priceold
-    """
-    priceold_df = load_and_normalize_table(priceold_query)
+    priceold_df = normalize_kod_column(read_base_table(engine, "priceold", ["kod", "tsenazakup", "tsenarozn"]))
 
-    stockold_query = """
-    SELECT kod, osnsklad AS ostatok
-    FROM stockold
-    """
-    stockold_df = load_and_normalize_table(stockold_query)
+    stockold_df = normalize_kod_column(
+        read_base_table(engine, "stockold", ["kod", "osnsklad"], rename={"osnsklad": "ostatok"})
+    )
 
     typedetailgen_query = """
     SELECT kod, type_detail
@@ -137,12 +132,12 @@ def load_foranalitics_data(engine):
     vyrabotka_df = clean_and_convert_to_float(vyrabotka_df, "summa")
     vyrabotka_df["slesar"] = vyrabotka_df["slesar"].fillna("Субподряд")
 
-    postuplenija_query = """
-    SELECT ssylka, kod, data, tsena, kolichestvo, hozoperatsija, kontragent
-    FROM postuplenija
-    WHERE proveden = 'Да' 
-    """
-    postuplenija_df = load_and_normalize_table(postuplenija_query)
+    postuplenija_df = normalize_kod_column(read_base_table(
+        engine,
+        "postuplenija",
+        ["ssylka", "kod", "data", "tsena", "kolichestvo", "hozoperatsija", "kontragent"],
+        filters={"proveden": "Да"},
+    ))
     postuplenija_df = clean_and_convert_to_float(postuplenija_df, "tsena")
     postuplenija_df["kolichestvo"] = postuplenija_df["kolichestvo"].astype(float)
 
@@ -156,15 +151,15 @@ def load_foranalitics_data(engine):
     korrektirovki_df["kolichestvo"] = korrektirovki_df["kolichestvo"].astype(float)
 
     # Загрузка данных из таблиц prodazhi и realizatsija и объединение
-    prodaja_query = """
-    SELECT kod, period, kolichestvo, summa, hozoperatsija, pokupatel, dokumentprodazhi, skladkompanii
-    FROM prodazhi 
-    """
     realizatsija_query = """
     SELECT ssylka AS dokumentprodazhi, kod, dokumentosnovanie, avtor, rs_zakaznarjad
     FROM realizatsija
     """
-    prodaja_df = load_and_normalize_table(prodaja_query)
+    prodaja_df = normalize_kod_column(read_base_table(
+        engine,
+        "prodazhi",
+        ["kod", "period", "kolichestvo", "summa", "hozoperatsija", "pokupatel", "dokumentprodazhi", "skladkompanii"],
+    ))
     realizatsija_df = load_and_normalize_table(realizatsija_query, column="kod")
 
     # Очистка полей от пробелов и непечатных символов перед объединением
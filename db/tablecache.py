@@ -0,0 +1,274 @@
+"""
+Кэш базовых таблиц: в пределах процесса и в локальных снимках Parquet.
+
+Загрузчики statistic, reprising и bianalitics за один запуск несколько раз
+читают одни и те же таблицы (nomenklatura, prodazhi, postuplenija, priceold,
+stockold).  ``read_table`` читает нужные колонки таблицы один раз и затем
+отдает копии, пока не изменится отметка изменений таблицы: последний прогон
+загрузки one_c_import_run, отметка ``mark_tables_changed`` из
+``public.table_change_marker`` и oid таблицы (замена через to_sql).  Загрузки,
+меняющие таблицу на месте, ставят отметку в своей транзакции.  Более узкая
+проекция берется из уже прочитанной широкой.  Фильтры равенства и IN входят в
+ключ кэша и в запрос: загрузчик читает с сервера только свои строки, а если
+таблица уже прочитана без фильтра, строки отбираются из нее в памяти.
+
+Если установлен pyarrow, ``refresh_snapshots`` после загрузки из 1С сохраняет
+таблицы целиком в снимки Parquet в каталоге ``UGKOREA_SNAPSHOT_DIR`` (по
+умолчанию ``~/.ugkorea/snapshots``).  Чтение берет из снимка текущей отметки
+только нужные колонки через memory map; без снимка с сервера читаются только
+нужные колонки.  ``UGKOREA_SNAPSHOT_DIR=off`` отключает снимки.
+
+    python -m ugkorea.db.tablecache   # снимки после ручной загрузки
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import os
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import and_, column, literal_column, select, table as table_clause, text
+
+# Таблицы, которые ``refresh_snapshots`` материализует после загрузки из 1С.
+BASE_TABLES = ("nomenklatura", "prodazhi", "postuplenija", "priceold", "stockold")
+DEFAULT_SNAPSHOT_DIR = Path.home() / ".ugkorea" / "snapshots"
+MARKER_TABLE = "table_change_marker"
+
+# Условие отбора: ((колонка, (значения...)), ...) по имени колонки; () — без фильтра
+Condition = tuple[tuple[str, tuple[object, ...]], ...]
+# (url движка, таблица) -> (отметка изменений, {(проекция, условие): DataFrame}); None — все колонки
+_TABLES: dict[
+    tuple[object, str],
+    tuple[tuple, dict[tuple[tuple[str, ...] | None, Condition], pd.DataFrame]],
+] = {}
+
+
+def table_change_token(connection: object, table: str) -> tuple:
+    """
+    Дешевая отметка, которая меняется при любой перезаписи или загрузке таблицы.
+
+    Прогон one_c_import_run, отметка загрузки и oid видны сразу после коммита,
+    в отличие от счетчиков pg_stat, которые сервер публикует с задержкой.
+    """
+    relation, has_runs, has_markers = connection.execute(
+        text(
+            "SELECT to_regclass(:table_name)::oid::bigint, "
+            "to_regclass('public.one_c_import_run') IS NOT NULL, "
+            f"to_regclass('public.{MARKER_TABLE}') IS NOT NULL"
+        ),
+        {"table_name": table},
+    ).one()
+    latest_run = None
+    if has_runs:
+        latest_run = connection.execute(
+            text(
+                "SELECT run_id::text FROM public.one_c_import_run "
+                "ORDER BY applied_at DESC, run_id DESC LIMIT 1"
+            )
+        ).scalar()
+    changed_at = None
+    if has_markers:
+        changed_at = connection.execute(
+            text(f"SELECT changed_at::text FROM public.{MARKER_TABLE} WHERE table_name = :table_name"),
+            {"table_name": table},
+        ).scalar()
+    return latest_run, changed_at, relation
+
+
+def mark_tables_changed(connection: object, tables: Iterable[str]) -> None:
+    """Ставит в транзакции загрузки отметку изменения таблиц для кэша и снимков."""
+    if connection.execute(text(f"SELECT to_regclass('public.{MARKER_TABLE}') IS NULL")).scalar():
+        # Загрузки могут начать одновременно: таблицу создает только одна транзакция
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": MARKER_TABLE})
+        connection.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS public.{MARKER_TABLE} ("
+                "table_name text PRIMARY KEY, changed_at timestamptz NOT NULL)"
+            )
+        )
+    connection.execute(
+        text(
+            f"INSERT INTO public.{MARKER_TABLE} (table_name, changed_at) "
+            "SELECT table_name, clock_timestamp() FROM unnest(CAST(:tables AS text[])) AS table_name "
+            "ON CONFLICT (table_name) DO UPDATE SET changed_at = EXCLUDED.changed_at"
+        ),
+        {"tables": sorted(set(tables))},
+    )
+
+
+def snapshot_directory() -> Path | None:
+    """Каталог снимков Parquet или None, если снимки отключены или pyarrow не установлен."""
+    configured = os.getenv("UGKOREA_SNAPSHOT_DIR")
+    if configured is not None and configured.strip().lower() in {"", "0", "off", "no", "false"}:
+        return None
+    if importlib.util.find_spec("pyarrow") is None:
+        return None
+    return Path(configured) if configured else DEFAULT_SNAPSHOT_DIR
+
+
+def read_table(
+    engine: object,
+    table: str,
+    columns: Sequence[str] | None = None,
+    filters: dict[str, object] | None = None,
+) -> pd.DataFrame:
+    """
+    Читает таблицу как ``pd.read_sql_table(table, engine, columns=columns)``.
+
+    filters — колонка -> значение (равенство) или список значений (IN), без NULL;
+    отбор выполняет сервер или чтение снимка.  Повторный запрос той же или более
+    узкой проекции с тем же условием при неизменной отметке не обращается к
+    таблице.  Возвращается копия: загрузчики меняют DataFrame на месте.
+    """
+    with engine.connect() as connection:
+        token = table_change_token(connection, table)
+    key = (engine.url, table)
+    cached_token, frames = _TABLES.get(key, (None, {}))
+    if cached_token != token:
+        frames = {}
+        _TABLES[key] = (token, frames)
+
+    projection = None if columns is None else tuple(columns)
+    condition = _condition(filters)
+    frame = _cached_projection(frames, projection, condition)
+    if frame is None:
+        frame = _load_table(engine, table, token, projection, condition)
+        frames[(projection, condition)] = frame
+    if projection is None:
+        return frame.copy()
+    return frame[list(projection)].copy()
+
+
+def read_base_table(
+    engine: object,
+    table: str,
+    columns: Sequence[str],
+    filters: dict[str, object] | None = None,
+    rename: dict[str, str] | None = None,
+) -> pd.DataFrame:
+    """Колонки columns строк таблицы, отобранных filters, с псевдонимами rename."""
+    frame = read_table(engine, table, columns, filters)
+    return frame.rename(columns=rename or {}).reset_index(drop=True)
+
+
+def refresh_snapshots(engine: object, tables: Sequence[str] = BASE_TABLES) -> list[str]:
+    """
+    Сохраняет снимки таблиц, у которых нет снимка текущей отметки; возвращает их.
+
+    Вызывается после коммита загрузки: чтения снимки не создают.
+    """
+    refreshed = []
+    for table in tables:
+        with engine.connect() as connection:
+            token = table_change_token(connection, table)
+        path = _snapshot_path(engine, table, token)
+        if path is None:
+            return refreshed
+        # token[-1] — oid: таблицы нет
+        if token[-1] is None or path.exists():
+            continue
+        if _write_snapshot(pd.read_sql_table(table, engine), path):
+            refreshed.append(table)
+    return refreshed
+
+
+def clear_table_cache() -> None:
+    _TABLES.clear()
+
+
+def _condition(filters: dict[str, object] | None) -> Condition:
+    condition = []
+    for name, value in sorted((filters or {}).items()):
+        values = value if isinstance(value, (list, tuple, set, frozenset)) else [value]
+        condition.append((name, tuple(sorted(set(values), key=repr))))
+    return tuple(condition)
+
+
+def _covers(cached: tuple[str, ...] | None, needed: Iterable[str] | None) -> bool:
+    return cached is None or (needed is not None and set(needed) <= set(cached))
+
+
+def _cached_projection(
+    frames: dict[tuple[tuple[str, ...] | None, Condition], pd.DataFrame],
+    projection: tuple[str, ...] | None,
+    condition: Condition,
+) -> pd.DataFrame | None:
+    """Кэшированная проекция с тем же условием или отбор строк из прочитанной без фильтра."""
+    for (cached, cached_condition), frame in frames.items():
+        if cached_condition == condition and _covers(cached, projection):
+            return frame
+    if not condition:
+        return None
+    needed = None if projection is None else [*projection, *(name for name, _ in condition)]
+    for (cached, cached_condition), frame in frames.items():
+        if not cached_condition and _covers(cached, needed):
+            for name, values in condition:
+                frame = frame[frame[name].isin(values)]
+            return frame.reset_index(drop=True)
+    return None
+
+
+def _load_table(
+    engine: object,
+    table: str,
+    token: tuple,
+    projection: tuple[str, ...] | None,
+    condition: Condition = (),
+) -> pd.DataFrame:
+    """Проекция из снимка текущей отметки, а без него — только ее колонки и строки с сервера."""
+    columns = None if projection is None else list(projection)
+    path = _snapshot_path(engine, table, token)
+    if path is not None and path.exists():
+        filters = [(name, "in", list(values)) for name, values in condition] or None
+        return pd.read_parquet(path, columns=columns, filters=filters, memory_map=True)
+    if not condition:
+        return pd.read_sql_table(table, engine, columns=columns)
+    selected = [literal_column("*")] if columns is None else [column(name) for name in columns]
+    query = select(*selected).select_from(table_clause(table)).where(
+        and_(*(column(name).in_(values) for name, values in condition))
+    )
+    with engine.connect() as connection:
+        return pd.read_sql(query, connection)
+
+
+def _snapshot_path(engine: object, table: str, token: tuple) -> Path | None:
+    directory = snapshot_directory()
+    if directory is None:
+        return None
+    url = engine.url
+    database = hashlib.sha256(f"{url.host}:{url.port}/{url.database}".encode()).hexdigest()[:16]
+    version = hashlib.sha256(repr(token).encode()).hexdigest()[:16]
+    return directory / database / f"{table}.{version}.parquet"
+
+
+def _write_snapshot(frame: pd.DataFrame, path: Path) -> bool:
+    """Пишет снимок атомарно и удаляет снимки прежних версий таблицы."""
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        frame.to_parquet(temporary)
+        os.replace(temporary, path)
+    except (OSError, TypeError, ValueError) as error:
+        # Колонки со смешанными типами или недоступный диск: таблица читается с сервера
+        print(f"[Снимок] Таблица '{path.name.split('.')[0]}' не сохранена в Parquet: {error}")
+        temporary.unlink(missing_ok=True)
+        return False
+    table = path.name.split(".")[0]
+    for stale in path.parent.glob(f"{table}.*.parquet"):
+        if stale != path:
+            try:
+                stale.unlink()
+            except OSError:
+                # Снимок может быть открыт другим процессом (Windows); удалится в следующий раз
+                pass
+    return True
+
+
+if __name__ == "__main__":
+    from ugkorea.db.database import get_db_engine
+
+    refreshed = refresh_snapshots(get_db_engine())
+    print(f"[Снимок] Обновлены снимки таблиц: {', '.join(refreshed) or 'нет'}.")
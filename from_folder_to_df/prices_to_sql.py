@@ -5,6 +5,7 @@ import subprocess
 from sqlalchemy import text
 from ugkorea.from_folder_to_df.main_get_dataframe import get_df_main, find_repo_folder
 from ugkorea.db.database import get_db_engine
+from ugkorea.reglament_task.supplier_offers import index_supplier_table
 from datetime import datetime, timedelta
 
 
@@ -50,6 +51,16 @@ def delete_old_data(connection, full_table_name):
     connection.execute(delete_query, {'cutoff_date': cutoff_date})
     print(f"Удалены данные старше {cutoff_date} из таблицы {full_table_name}.")
 
+# Обновление индекса предложений поставщиков по последней дате таблицы
+def refresh_offer_index(connection, table_name):
+    # Ошибка индексации не отменяет загрузку прайса: индекс догонит deliveryminprice
+    try:
+        with connection.begin_nested():
+            rows = index_supplier_table(connection, table_name)
+        print(f"Индекс предложений для таблицы prices.{table_name} обновлен: {rows} строк.")
+    except Exception as e:
+        print(f"Ошибка при обновлении индекса предложений для таблицы prices.{table_name}: {e}")
+
 # Импорт и добавление данных в базу
 def import_and_load_data():
     dataframes_dict = get_df_main(folder_path)
@@ -70,6 +81,7 @@ def import_and_load_data():
                     print(f"Таблица {full_table_name} не существует. Создаю новую таблицу.")
                     df.to_sql(table_name, connection, schema='prices', if_exists='replace', index=False)
                     print(f"Таблица {full_table_name} успешно создана и данные добавлены.")
+                    refresh_offer_index(connection, table_name)
                     continue
 
                 # Удаляем данные старше 60 дней
@@ -88,6 +100,7 @@ def import_and_load_data():
                     print(f"В таблицу {full_table_name} добавлено {num_rows_added} строк.")
                     print("Первые 5 строк добавленных данных:")
                     print(df_filtered.head())
+                    refresh_offer_index(connection, table_name)
             connection.commit()  # Подтверждение транзакции
         except Exception as e:
             print(f"Ошибка при работе с базой данных: {e}")
@@ -0,0 +1,604 @@
+"""Synthetic benchmark for the 1C receiver hot paths.
+
+Generates one artifact per contract (including the unquoted multiline and
+trailing-delimiter repair cases), measures the reader, staging conversion and
+timestamp parsing stages, and optionally the full ``apply_manifest`` round trip
+against a throwaway PostgreSQL database.  Timestamp parsing is also measured
+with the uncached generic parser as a baseline, on the generated column and on
+one repeating a few thousand distinct timestamps.  The report is JSON with rows/sec,
+elapsed seconds and peak RSS per stage and contract.
+
+Usage::
+
+    python -m reglament_task.one_c_receiver_runtime.benchmark --rows 1000000 \\
+        --postgres-bin /usr/lib/postgresql/16/bin --report benchmark.json
+
+``--postgres-bin`` starts a private cluster in the work directory;
+``--database-url`` instead uses an existing, empty local database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, date, datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import TextIO
+from uuid import uuid4
+
+import psutil
+from sqlalchemy import Engine, create_engine, inspect, text
+
+from .contracts import CONTRACTS_BY_NAME, OBSERVED_CONTRACTS, CsvContract, CsvRowRepair
+from .normalization import (
+    _parse_datetime_generic,
+    _parse_datetime_text,
+    normalize_text,
+    parse_datetime,
+)
+from .reader import AcceptedRow, detect_encoding, iter_row_blocks, iter_rows, read_metadata
+from .receiver import (
+    LEGACY_CONTRACTS,
+    PublicationKind,
+    _SNAPSHOT_CONTRACTS,
+    _stage_value,
+    apply_manifest,
+    load_manifest,
+    sha256_file,
+)
+
+BENCHMARK_SIZES = (10_000, 1_000_000, 10_000_000)
+REPORT_VERSION = 1
+DEFAULT_SCOPE_START = date(2024, 1, 1)
+DEFAULT_SCOPE_END = date(2025, 1, 1)
+# Every n-th generated row exercises the contract's row repair.
+_REPAIR_EVERY = 25
+_BLANK_REPAIR_EVERY = 100
+# Distinct values per generated text column; 1C exports repeat codes heavily.
+_VALUE_POOL_SIZE = 5_000
+_RSS_SAMPLE_SECONDS = 0.01
+# Timestamp parsing is measured on at most this many values held in memory.
+_PARSE_SAMPLE_SIZE = 1_000_000
+# Distinct timestamps in the repeated column; 1C documents share a few thousand posting times.
+_REPEATED_TIMESTAMPS = 3_000
+# Executor period runs require an earlier version 2 snapshot in the same database.
+_SNAPSHOT_ONLY_CONTRACTS = frozenset({"service_order_executors"})
+_LOCAL_HOSTS = frozenset({"localhost", "127.0.0.1", "::1"})
+_TIMESTAMP_TYPE = "timestamp without time zone"
+
+
+@dataclass(frozen=True, slots=True)
+class StageMeasurement:
+    stage: str
+    contract: str | None
+    rows: int
+    seconds: float
+    rows_per_second: float | None
+    peak_rss_bytes: int
+
+
+@dataclass(slots=True)
+class BenchmarkReport:
+    rows_per_contract: int
+    contract_set: str
+    encoding: str
+    started_at: str
+    python: str = field(default_factory=platform.python_version)
+    platform: str = field(default_factory=platform.platform)
+    report_version: int = REPORT_VERSION
+    stages: list[StageMeasurement] = field(default_factory=list)
+    apply_results: list[dict[str, object]] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False, indent=2, default=str)
+
+
+@dataclass(frozen=True, slots=True)
+class GeneratedArtifact:
+    contract: CsvContract
+    path: Path
+    rows: int
+    publication: PublicationKind
+    scope: tuple[date, date] | None
+
+
+class _PeakRss:
+    """Sample the process RSS on a background thread while a stage runs."""
+
+    def __init__(self) -> None:
+        self._process = psutil.Process()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self.peak_bytes = self._process.memory_info().rss
+
+    def __enter__(self) -> _PeakRss:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._stopped.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self._process.memory_info().rss)
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(_RSS_SAMPLE_SECONDS):
+            self.peak_bytes = max(self.peak_bytes, self._process.memory_info().rss)
+
+
+def measure(
+    report: BenchmarkReport,
+    stage: str,
+    contract: str | None,
+    function: Callable[[], int],
+) -> int:
+    """Run ``function`` (returning its row count) and append its measurement."""
+    with _PeakRss() as rss:
+        started = time.perf_counter()
+        rows = function()
+        seconds = time.perf_counter() - started
+    report.stages.append(
+        StageMeasurement(
+            stage=stage,
+            contract=contract,
+            rows=rows,
+            seconds=round(seconds, 6),
+            rows_per_second=round(rows / seconds, 1) if seconds > 0 else None,
+            peak_rss_bytes=rss.peak_bytes,
+        )
+    )
+    print(f"[benchmark] {stage} {contract or '-'}: {rows} rows in {seconds:.3f}s", flush=True)
+    return rows
+
+
+def benchmark_contracts(*, latest: bool) -> tuple[CsvContract, ...]:
+    """Observed contracts cover both repair cases; ``latest`` uses current versions."""
+    if latest:
+        return tuple(CONTRACTS_BY_NAME[contract.name] for contract in OBSERVED_CONTRACTS)
+    return OBSERVED_CONTRACTS
+
+
+def generate_artifact(
+    contract: CsvContract,
+    path: Path,
+    rows: int,
+    *,
+    encoding: str = "utf-8-sig",
+    scope: tuple[date, date] = (DEFAULT_SCOPE_START, DEFAULT_SCOPE_END),
+) -> GeneratedArtifact:
+    """Write ``rows`` logical rows of deterministic synthetic data for ``contract``."""
+    spec = LEGACY_CONTRACTS[contract.name]
+    period = (
+        spec.period_header
+        if spec.period_header in contract.headers
+        and contract.name not in _SNAPSHOT_CONTRACTS | _SNAPSHOT_ONLY_CONTRACTS
+        else None
+    )
+    formatters = [
+        _value_formatter(contract, header, period_header=period, scope=scope)
+        for header in contract.headers
+    ]
+    with path.open("w", encoding=encoding, newline="") as target:
+        writer = csv.writer(target, delimiter=";", lineterminator="\r\n")
+        writer.writerow(contract.headers)
+        for index in range(rows):
+            values = [formatter(index) for formatter in formatters]
+            if contract.row_repair is CsvRowRepair.NONE or index % _REPAIR_EVERY:
+                writer.writerow(values)
+            else:
+                _write_repaired_row(target, contract, values, index)
+    return GeneratedArtifact(
+        contract=contract,
+        path=path,
+        rows=rows,
+        publication=PublicationKind.PERIOD if period else PublicationKind.SNAPSHOT,
+        scope=scope if period else None,
+    )
+
+
+def _write_repaired_row(
+    target: TextIO,
+    contract: CsvContract,
+    values: list[str],
+    index: int,
+) -> None:
+    if contract.row_repair is CsvRowRepair.TRAILING_DELIMITERS:
+        values[-1] = f"{values[-1]}; корпус {index % 7}; кв. {index % 90}"
+        target.write(";".join(values) + "\r\n")
+        return
+    assert contract.repair_field_index is not None
+    field_index = contract.repair_field_index
+    head = values[:field_index] + [f"{values[field_index]} (комплект"]
+    tail = [f"{index % 4 + 1} шт.)"] + values[field_index + 1 :]
+    blank = "\r\n" if index % _BLANK_REPAIR_EVERY == 0 else ""
+    target.write(";".join(head) + "\r\n" + blank + ";".join(tail) + "\r\n")
+
+
+def _value_formatter(
+    contract: CsvContract,
+    header: str,
+    *,
+    period_header: str | None,
+    scope: tuple[date, date],
+) -> Callable[[int], str]:
+    spec = LEGACY_CONTRACTS[contract.name]
+    sql_type = spec.sql_type(spec.target_column(header))
+    scope_days = (scope[1] - scope[0]).days
+    if header == period_header and spec.period_storage == "text_date":
+        return lambda index: (scope[0] + timedelta(days=index % scope_days)).strftime("%d.%m.%Y")
+    if header == period_header or sql_type == _TIMESTAMP_TYPE:
+        return lambda index: (
+            datetime.combine(scope[0], datetime.min.time())
+            + timedelta(days=index % scope_days, seconds=(index * 7919) % 86_400)
+        ).strftime("%d.%m.%Y %H:%M:%S")
+    if sql_type == "bigint":
+        return lambda index: str(index % 97 + 1)
+    if sql_type == "double precision":
+        return lambda index: f"{index % 97 + 1},{index % 4 * 25}"
+    if header == "Проведен":
+        return lambda index: "Да" if index % 10 else "Нет"
+    if header in {"Количество", "Процент", "НомерСтроки"}:
+        return lambda index: str(index % 97 + 1)
+    if header in {"Цена", "Сумма", "Себестоимость", "ЦенаРозничная"}:
+        return lambda index: f"{index % 9_973 + 10},{index % 100:02d}"
+    if header in {"Код", "НоменклатураКод"}:
+        return lambda index: f"{index % _VALUE_POOL_SIZE:08d}"
+    if header == "Ссылка":
+        return lambda index: f"Документ УТ-{index:09d}"
+    return lambda index: f"{header} {index % _VALUE_POOL_SIZE}"
+
+
+def write_manifest(
+    source_dir: Path,
+    artifacts: list[GeneratedArtifact],
+    *,
+    mode: str = "fast",
+) -> Path:
+    path = source_dir / f"manifest-{uuid4().hex}.json"
+    payload = {
+        "schema_version": 1,
+        "status": "ready",
+        "run_id": str(uuid4()),
+        "mode": mode,
+        "captured_at": datetime.now(UTC).isoformat(),
+        "contracts": [
+            {
+                "name": artifact.contract.name,
+                "contract_version": artifact.contract.version,
+                "file_name": artifact.contract.file_name,
+                "publication": artifact.publication.value,
+                "scope": (
+                    None
+                    if artifact.scope is None
+                    else {
+                        "start": artifact.scope[0].isoformat(),
+                        "end_exclusive": artifact.scope[1].isoformat(),
+                    }
+                ),
+                "size_bytes": artifact.path.stat().st_size,
+                "row_count": artifact.rows,
+                "sha256": sha256_file(artifact.path),
+            }
+            for artifact in artifacts
+        ],
+    }
+    path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def benchmark_reader(report: BenchmarkReport, artifact: GeneratedArtifact) -> None:
+    contract = artifact.contract
+    spec = LEGACY_CONTRACTS[contract.name]
+    path = artifact.path
+
+    def encoding_rows() -> int:
+        detect_encoding(path)
+        return 1
+
+    measure(report, "detect_encoding", contract.name, encoding_rows)
+    metadata = read_metadata(path)
+
+    def accepted_rows() -> int:
+        return sum(isinstance(row, AcceptedRow) for row in iter_rows(path, metadata, contract))
+
+    def block_rows() -> int:
+        return sum(len(block) for block in iter_row_blocks(path, metadata, contract))
+
+    for stage, function in (("iter_rows", accepted_rows), ("iter_row_blocks", block_rows)):
+        if measure(report, stage, contract.name, function) != artifact.rows:
+            raise RuntimeError(f"Reader accepted an unexpected row count for {contract.name}")
+
+    typed_headers = tuple(
+        (header, spec.sql_type(spec.target_column(header))) for header in contract.headers
+    )
+
+    def staged_rows() -> int:
+        rows = 0
+        for block in iter_row_blocks(path, metadata, contract):
+            for header, sql_type in typed_headers:
+                for value in block.columns[header]:
+                    _stage_value(value, sql_type)
+            rows += len(block)
+        return rows
+
+    measure(report, "stage_value", contract.name, staged_rows)
+    datetime_headers = [
+        header
+        for header, sql_type in typed_headers
+        if sql_type == _TIMESTAMP_TYPE or header == spec.period_header
+    ]
+    if not datetime_headers:
+        return
+    values = list(
+        islice(
+            (
+                value
+                for block in iter_row_blocks(path, metadata, contract)
+                for header in datetime_headers
+                for value in block.columns[header]
+            ),
+            _PARSE_SAMPLE_SIZE,
+        )
+    )
+
+    # The same sample, as a realistic column repeating a few thousand timestamps.
+    repeated = [values[index % _REPEATED_TIMESTAMPS] for index in range(len(values))]
+    for suffix, column in (("", values), ("_repeated", repeated)):
+        baseline = _measure_parse(
+            report, f"parse_datetime_baseline{suffix}", contract.name, column, _baseline_parse_datetime
+        )
+        current = _measure_parse(
+            report, f"parse_datetime{suffix}", contract.name, column, parse_datetime
+        )
+        if current != baseline:
+            raise RuntimeError(f"parse_datetime differs from the baseline for {contract.name}")
+
+
+def _measure_parse(
+    report: BenchmarkReport,
+    stage: str,
+    contract: str,
+    column: list[str],
+    parse: Callable[[str], datetime | None],
+) -> list[datetime | None]:
+    """Parse ``column`` from a cold cache as one measured stage; return the parsed values."""
+    parsed: list[datetime | None] = []
+
+    def parsed_values() -> int:
+        _parse_datetime_text.cache_clear()
+        parsed.extend(parse(value) for value in column)
+        return len(column)
+
+    measure(report, stage, contract, parsed_values)
+    return parsed
+
+
+def _baseline_parse_datetime(value: str) -> datetime | None:
+    """Text ``parse_datetime`` before memoisation and the dd.mm.yyyy fast path."""
+    text = normalize_text(value)
+    return None if text is None else _parse_datetime_generic(text)
+
+
+def benchmark_apply(
+    report: BenchmarkReport,
+    database_url: str,
+    source_dir: Path,
+    artifacts: list[GeneratedArtifact],
+    *,
+    workers: int,
+    single_pass: bool,
+    delta_snapshots: bool,
+    partitioned_periods: bool,
+    keep_tables: bool,
+) -> None:
+    """Publish every artifact, then republish the unchanged set in a second fast run."""
+    engine = create_engine(database_url, future=True, pool_size=max(5, workers))
+    try:
+        _require_throwaway_database(engine)
+        rows = sum(artifact.rows for artifact in artifacts)
+        for stage in ("apply_manifest", "apply_manifest_unchanged"):
+            manifest = load_manifest(write_manifest(source_dir, artifacts))
+
+            def applied_rows() -> int:
+                result = apply_manifest(
+                    engine,
+                    source_dir,
+                    manifest,
+                    single_pass=single_pass,
+                    workers=workers,
+                    delta_snapshots=delta_snapshots,
+                    partitioned_periods=partitioned_periods,
+                )
+                report.apply_results.append({"stage": stage, **asdict(result)})
+                return rows
+
+            measure(report, stage, None, applied_rows)
+    finally:
+        try:
+            if not keep_tables:
+                _drop_receiver_tables(engine)
+        finally:
+            engine.dispose()
+
+
+def _receiver_tables() -> list[str]:
+    return [
+        "one_c_import_contract",
+        "one_c_import_run",
+        *sorted({spec.table_name for spec in LEGACY_CONTRACTS.values()}),
+    ]
+
+
+def _require_throwaway_database(engine: Engine) -> None:
+    url = engine.url
+    if url.get_backend_name() != "postgresql" or (url.host or "localhost") not in _LOCAL_HOSTS:
+        raise RuntimeError("Benchmark publication requires a local PostgreSQL database")
+    existing = set(inspect(engine).get_table_names(schema="public")) & set(_receiver_tables())
+    if existing:
+        raise RuntimeError(
+            "Benchmark database already contains receiver tables: " + ", ".join(sorted(existing))
+        )
+
+
+def _drop_receiver_tables(engine: Engine) -> None:
+    with engine.begin() as connection:
+        for table in _receiver_tables():
+            connection.execute(text(f'DROP TABLE IF EXISTS public."{table}" CASCADE'))
+
+
+@contextmanager
+def throwaway_cluster(postgres_bin: Path, data_dir: Path) -> Iterator[str]:
+    """Run a private PostgreSQL cluster on a free local port for the benchmark."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    subprocess.run(
+        [
+            str(postgres_bin / "initdb"),
+            "-D",
+            str(data_dir),
+            "-U",
+            "benchmark",
+            "-A",
+            "trust",
+            "-E",
+            "UTF8",
+            "--no-sync",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    pg_ctl = str(postgres_bin / "pg_ctl")
+    subprocess.run(
+        [
+            pg_ctl,
+            "-D",
+            str(data_dir),
+            "-l",
+            str(data_dir / "server.log"),
+            "-o",
+            f"-F -p {port} -c listen_addresses=127.0.0.1 -c unix_socket_directories=''",
+            "-w",
+            "start",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    try:
+        yield f"postgresql+psycopg2://benchmark@127.0.0.1:{port}/postgres"
+    finally:
+        subprocess.run(
+            [pg_ctl, "-D", str(data_dir), "-m", "fast", "-w", "stop"],
+            check=False,
+            capture_output=True,
+        )
+
+
+def run_benchmark(arguments: argparse.Namespace, work_dir: Path) -> BenchmarkReport:
+    contracts = benchmark_contracts(latest=arguments.latest)
+    if arguments.contracts:
+        unknown = set(arguments.contracts) - {contract.name for contract in contracts}
+        if unknown:
+            raise SystemExit(f"Unknown contracts: {', '.join(sorted(unknown))}")
+        contracts = tuple(
+            contract for contract in contracts if contract.name in arguments.contracts
+        )
+    report = BenchmarkReport(
+        rows_per_contract=arguments.rows,
+        contract_set="latest" if arguments.latest else "observed",
+        encoding=arguments.encoding,
+        started_at=datetime.now(UTC).isoformat(),
+    )
+    source_dir = work_dir / "exports"
+    source_dir.mkdir(parents=True, exist_ok=True)
+    artifacts: list[GeneratedArtifact] = []
+    for contract in contracts:
+        path = source_dir / contract.file_name
+
+        def generated_rows(contract: CsvContract = contract, path: Path = path) -> int:
+            artifacts.append(
+                generate_artifact(contract, path, arguments.rows, encoding=arguments.encoding)
+            )
+            return arguments.rows
+
+        measure(report, "generate", contract.name, generated_rows)
+    for artifact in artifacts:
+        benchmark_reader(report, artifact)
+
+    apply_options = {
+        "workers": arguments.workers,
+        "single_pass": arguments.single_pass,
+        "delta_snapshots": arguments.delta_snapshots,
+        "partitioned_periods": arguments.partitioned_periods,
+        "keep_tables": arguments.keep_tables,
+    }
+    if arguments.database_url:
+        benchmark_apply(report, arguments.database_url, source_dir, artifacts, **apply_options)
+    elif arguments.postgres_bin:
+        with throwaway_cluster(arguments.postgres_bin, work_dir / "pgdata") as database_url:
+            benchmark_apply(report, database_url, source_dir, artifacts, **apply_options)
+    return report
+
+
+def parse_arguments(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=BENCHMARK_SIZES[0],
+        help=f"logical rows per contract (reference sizes: {BENCHMARK_SIZES})",
+    )
+    parser.add_argument("--contracts", nargs="+", help="limit to these contract names")
+    parser.add_argument(
+        "--latest",
+        action="store_true",
+        help="use the latest contract versions instead of the observed ones",
+    )
+    parser.add_argument(
+        "--encoding", choices=("utf-8-sig", "utf-8", "cp1251"), default="utf-8-sig"
+    )
+    database = parser.add_mutually_exclusive_group()
+    database.add_argument("--database-url", help="existing empty local PostgreSQL database")
+    database.add_argument("--postgres-bin", type=Path, help="directory with initdb and pg_ctl")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--single-pass", action="store_true")
+    parser.add_argument("--delta-snapshots", action="store_true")
+    parser.add_argument("--partitioned-periods", action="store_true")
+    parser.add_argument("--keep-tables", action="store_true")
+    parser.add_argument("--work-dir", type=Path, help="keep generated files in this directory")
+    parser.add_argument("--report", type=Path, help="write the JSON report here")
+    arguments = parser.parse_args(argv)
+    if arguments.rows < 1:
+        parser.error("--rows must be positive")
+    return arguments
+
+
+def main(argv: list[str] | None = None) -> int:
+    arguments = parse_arguments(argv)
+    work_dir = arguments.work_dir or Path(tempfile.mkdtemp(prefix="one-c-benchmark-"))
+    try:
+        report = run_benchmark(arguments, work_dir)
+    finally:
+        if arguments.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    if arguments.report:
+        arguments.report.write_text(report.to_json(), encoding="utf-8")
+    else:
+        sys.stdout.write(report.to_json() + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -8,6 +8,7 @@ import unicodedata
 from collections.abc import Iterable
 from datetime import date, datetime, timedelta
 from decimal import Decimal, InvalidOperation
+from functools import lru_cache
 from uuid import UUID, uuid5
 
 NORMALIZATION_VERSION = 1
@@ -60,6 +61,8 @@ _DATE_FORMATS = (
     "%Y-%m-%d %H:%M:%S",
     "%Y-%m-%d",
 )
+# 1C exports repeat a few thousand distinct timestamps across millions of rows.
+_DATETIME_CACHE_SIZE = 65_536
 
 
 class NormalizationError(ValueError):
@@ -96,8 +99,7 @@ def normalize_code(value: object) -> str | None:
     text = normalize_text(value)
     if text is None:
         return None
-    compact = "".join(character for character in text if not character.isspace())
-    return compact.upper() or None
+    return _compact_code(text)
 
 
 def normalize_header(value: object) -> str:
@@ -126,23 +128,8 @@ def parse_decimal(value: object) -> Decimal | None:
         text = normalize_text(value)
         if text is None:
             return None
-        compact = re.sub(r"[\s\u00a0\u202f]", "", text)
-        if compact.count(",") > 1 or compact.count(".") > 1:
-            raise NormalizationError("AMBIGUOUS_DECIMAL", "Too many decimal separators")
-        if "," in compact and "." in compact:
-            if compact.rfind(",") > compact.rfind("."):
-                compact = compact.replace(".", "").replace(",", ".")
-            else:
-                compact = compact.replace(",", "")
-        else:
-            compact = compact.replace(",", ".")
-        try:
-            parsed = Decimal(compact)
-        except InvalidOperation as error:
-            raise NormalizationError("INVALID_DECIMAL", "Value is not a decimal") from error
-    if not parsed.is_finite():
-        raise NormalizationError("NON_FINITE_DECIMAL", "Decimal must be finite")
-    return parsed
+        return _parse_decimal_text(text)
+    return _finite_decimal(parsed)
 
 
 def parse_boolean(value: object) -> bool | None:
@@ -158,6 +145,42 @@ def parse_boolean(value: object) -> bool | None:
     text = normalize_text(value)
     if text is None:
         return None
+    return _parse_boolean_text(text)
+
+
+def _compact_code(text: str) -> str | None:
+    """Drop inner whitespace and upper-case an already normalized code text."""
+    compact = "".join(character for character in text if not character.isspace())
+    return compact.upper() or None
+
+
+def _parse_decimal_text(text: str) -> Decimal:
+    """Parse an already normalized, non-empty decimal text."""
+    compact = re.sub(r"[\s\u00a0\u202f]", "", text)
+    if compact.count(",") > 1 or compact.count(".") > 1:
+        raise NormalizationError("AMBIGUOUS_DECIMAL", "Too many decimal separators")
+    if "," in compact and "." in compact:
+        if compact.rfind(",") > compact.rfind("."):
+            compact = compact.replace(".", "").replace(",", ".")
+        else:
+            compact = compact.replace(",", "")
+    else:
+        compact = compact.replace(",", ".")
+    try:
+        parsed = Decimal(compact)
+    except InvalidOperation as error:
+        raise NormalizationError("INVALID_DECIMAL", "Value is not a decimal") from error
+    return _finite_decimal(parsed)
+
+
+def _finite_decimal(parsed: Decimal) -> Decimal:
+    if not parsed.is_finite():
+        raise NormalizationError("NON_FINITE_DECIMAL", "Decimal must be finite")
+    return parsed
+
+
+def _parse_boolean_text(text: str) -> bool:
+    """Parse an already normalized, non-empty boolean text."""
     folded = text.casefold()
     if folded in _TRUE_VALUES:
         return True
@@ -196,6 +219,8 @@ def parse_date(value: object, *, excel_datemode: int | None = None) -> date | No
 
 def parse_datetime(value: object, *, excel_datemode: int | None = None) -> datetime | None:
     """Parse a local 1C timestamp without inventing a timezone or discarding time."""
+    if isinstance(value, str):
+        return _parse_datetime_text(value)
     if value is None or (isinstance(value, float) and math.isnan(value)):
         return None
     if isinstance(value, datetime):
@@ -207,9 +232,22 @@ def parse_datetime(value: object, *, excel_datemode: int | None = None) -> datet
             raise NormalizationError("EXCEL_DATE_MODE_REQUIRED", "Excel date epoch is unknown")
         base = datetime(1899, 12, 30) if excel_datemode == 0 else datetime(1904, 1, 1)
         return base + timedelta(days=float(value))
+    return _parse_datetime_text(str(value))
+
+
+@lru_cache(maxsize=_DATETIME_CACHE_SIZE)
+def _parse_datetime_text(value: str) -> datetime | None:
     text = normalize_text(value)
     if text is None:
         return None
+    parsed = _parse_russian_datetime(text)
+    if parsed is not None:
+        return parsed
+    return _parse_datetime_generic(text)
+
+
+def _parse_datetime_generic(text: str) -> datetime:
+    """Parse a normalized, non-empty timestamp with fromisoformat and the allowed formats."""
     try:
         return datetime.fromisoformat(text).replace(tzinfo=None)
     except ValueError:
@@ -222,34 +260,130 @@ def parse_datetime(value: object, *, excel_datemode: int | None = None) -> datet
     raise NormalizationError("INVALID_DATETIME", "Value does not match an allowed datetime format")
 
 
+def _parse_russian_datetime(text: str) -> datetime | None:
+    """Parse zero-padded ``dd.mm.yyyy[ hh:mm[:ss]]`` exactly like the strptime formats.
+
+    Any other shape, or an out-of-range field, returns ``None`` so the generic
+    path decides (and raises) exactly as before.
+    """
+    length = len(text)
+    if length not in {10, 16, 19} or not text.isascii():
+        return None
+    if text[2] != "." or text[5] != ".":
+        return None
+    fields = [text[0:2], text[3:5], text[6:10]]
+    if length > 10:
+        if text[10] != " " or text[13] != ":":
+            return None
+        fields += [text[11:13], text[14:16]]
+        if length == 19:
+            if text[16] != ":":
+                return None
+            fields.append(text[17:19])
+    if not all(field.isdigit() for field in fields):
+        return None
+    day, month, year, *clock = (int(field) for field in fields)
+    try:
+        return datetime(year, month, day, *clock)
+    except ValueError:
+        return None
+
+
 def stable_analog_groups(edges: Iterable[tuple[str, str]]) -> dict[str, UUID]:
     """Return deterministic connected-component IDs for undirected analog edges."""
-    graph: dict[str, set[str]] = {}
-    for raw_left, raw_right in edges:
-        left = normalize_code(raw_left)
-        right = normalize_code(raw_right)
-        if left is None or right is None:
-            raise NormalizationError("EMPTY_ANALOG_CODE", "Analog edge has an empty code")
-        if left == right:
-            raise NormalizationError("ANALOG_SELF_REFERENCE", "Analog edge is a self-reference")
-        graph.setdefault(left, set()).add(right)
-        graph.setdefault(right, set()).add(left)
-
-    result: dict[str, UUID] = {}
-    visited: set[str] = set()
-    for start in sorted(graph):
-        if start in visited:
-            continue
-        component: set[str] = set()
-        pending = [start]
-        while pending:
-            code = pending.pop()
-            if code in visited:
-                continue
-            visited.add(code)
-            component.add(code)
-            pending.extend(sorted(graph[code] - visited, reverse=True))
-        fingerprint = f"v{NORMALIZATION_VERSION}:" + "\x1f".join(sorted(component))
-        group_id = uuid5(ANALOG_GROUP_NAMESPACE, fingerprint)
-        result.update({code: group_id for code in component})
-    return result
+    return AnalogGroups().add_edges(edges)
+
+
+class AnalogGroups:
+    """Incrementally maintained analog components with ``stable_analog_groups`` IDs.
+
+    Components live in a union-find forest (union by size, path compression)
+    that also keeps each root's member list, so a component's fingerprint is
+    recomputed only when a new edge touches it.
+    """
+
+    def __init__(self) -> None:
+        self._parent: dict[str, str] = {}
+        self._members: dict[str, list[str]] = {}
+        self._group_ids: dict[str, UUID] = {}
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def group_ids(self) -> dict[str, UUID]:
+        """Return the current group ID of every known code."""
+        return {code: self._group_ids[self._find(code)] for code in self._parent}
+
+    def group_id(self, code: str) -> UUID | None:
+        """Return the group ID of one raw code, or ``None`` when it has no analogs."""
+        normalized = normalize_code(code)
+        if normalized is None or normalized not in self._parent:
+            return None
+        return self._group_ids[self._find(normalized)]
+
+    def add_edges(self, edges: Iterable[tuple[str, str]]) -> dict[str, UUID]:
+        """Merge new edges and return the codes whose group ID changed.
+
+        Every member of a component that gained a code or merged with another
+        component is returned with its new ID; untouched components are not.
+        The whole batch is validated before any edge is applied.
+        """
+        # Analog tables repeat each code on many edges; normalize it once per batch.
+        normalized: dict[str, str | None] = {}
+
+        def normalized_code(raw: str) -> str | None:
+            if raw not in normalized:
+                normalized[raw] = normalize_code(raw)
+            return normalized[raw]
+
+        pairs = [
+            _analog_edge(normalized_code(left), normalized_code(right)) for left, right in edges
+        ]
+        touched: set[str] = set()
+        for left, right in pairs:
+            touched.add(self._union(left, right))
+        changed: dict[str, UUID] = {}
+        for root in {self._find(code) for code in touched}:
+            members = self._members[root]
+            fingerprint = f"v{NORMALIZATION_VERSION}:" + "\x1f".join(sorted(members))
+            group_id = uuid5(ANALOG_GROUP_NAMESPACE, fingerprint)
+            if self._group_ids.get(root) != group_id:
+                self._group_ids[root] = group_id
+                changed.update(dict.fromkeys(members, group_id))
+        return changed
+
+    def _find(self, code: str) -> str:
+        parent = self._parent
+        root = code
+        while parent[root] != root:
+            root = parent[root]
+        while parent[code] != root:
+            parent[code], code = root, parent[code]
+        return root
+
+    def _add(self, code: str) -> str:
+        if code in self._parent:
+            return self._find(code)
+        self._parent[code] = code
+        self._members[code] = [code]
+        return code
+
+    def _union(self, left: str, right: str) -> str:
+        left_root = self._add(left)
+        right_root = self._add(right)
+        if left_root == right_root:
+            return left_root
+        if len(self._members[left_root]) < len(self._members[right_root]):
+            left_root, right_root = right_root, left_root
+        self._parent[right_root] = left_root
+        self._members[left_root].extend(self._members.pop(right_root))
+        self._group_ids.pop(right_root, None)
+        return left_root
+
+
+def _analog_edge(left: str | None, right: str | None) -> tuple[str, str]:
+    if left is None or right is None:
+        raise NormalizationError("EMPTY_ANALOG_CODE", "Analog edge has an empty code")
+    if left == right:
+        raise NormalizationError("ANALOG_SELF_REFERENCE", "Analog edge is a self-reference")
+    return left, right
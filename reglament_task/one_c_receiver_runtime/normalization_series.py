@@ -0,0 +1,209 @@
+"""Column-level counterparts of the scalar 1C normalization rules.
+
+Each function returns, element by element, exactly what the scalar rule in
+``normalization`` returns.  String cells are factorized first, so a 1C column
+that repeats a few thousand distinct codes is normalized once per distinct
+value; any non-string cell is handed to the scalar rule unchanged.  Parsers
+report failures as a per-row error code instead of raising.
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import unicodedata
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cache
+
+import numpy as np
+import pandas as pd
+
+from .normalization import (
+    NormalizationError,
+    _compact_code,
+    _parse_boolean_text,
+    _parse_decimal_text,
+    normalize_code,
+    normalize_text,
+    parse_boolean,
+    parse_decimal,
+)
+
+# Every float below 2**53 converts to int64 without rounding.
+_EXACT_FLOAT_INTEGER_LIMIT = 2**53
+
+
+@dataclass(frozen=True, slots=True)
+class SeriesNormalization:
+    """Parsed values plus the ``NormalizationError.error_code`` of each failed row."""
+
+    values: pd.Series
+    error_codes: pd.Series
+
+    @property
+    def errors(self) -> pd.Series:
+        """Boolean mask of rows the scalar rule would have rejected."""
+        return self.error_codes.notna()
+
+
+def normalize_text_series(series: pd.Series) -> pd.Series:
+    """Vectorised ``normalize_text``."""
+    values = series.to_numpy(dtype=object)
+    strings = _string_mask(values)
+    result = np.full(len(values), None, dtype=object)
+    codes, uniques = _factorize(values[strings])
+    result[strings] = _normalize_strings(uniques).take(codes)
+    result[~strings] = _apply(normalize_text, values[~strings])
+    return _series_like(result, series)
+
+
+def normalize_code_series(series: pd.Series) -> pd.Series:
+    """Vectorised ``normalize_code``."""
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return _series_like(np.full(len(series), None, dtype=object), series)
+    if pd.api.types.is_integer_dtype(series.dtype) and not series.hasnans:
+        return _series_like(series.astype(str).to_numpy(dtype=object), series)
+    if pd.api.types.is_float_dtype(series.dtype):
+        return _normalize_float_codes(series)
+    values = series.to_numpy(dtype=object)
+    strings = _string_mask(values)
+    result = np.full(len(values), None, dtype=object)
+    codes, uniques = _factorize(values[strings])
+    text = _normalize_strings(uniques)
+    present = text != None  # noqa: E711 - element-wise comparison
+    text[present] = _apply(_compact_code, text[present])
+    result[strings] = text.take(codes)
+    result[~strings] = _apply(normalize_code, values[~strings])
+    return _series_like(result, series)
+
+
+def parse_decimal_series(series: pd.Series) -> SeriesNormalization:
+    """Vectorised ``parse_decimal`` with per-row error codes instead of exceptions."""
+    return _parse_series(series, parse_decimal, _parse_decimal_text)
+
+
+def parse_boolean_series(series: pd.Series) -> SeriesNormalization:
+    """Vectorised ``parse_boolean`` with per-row error codes instead of exceptions."""
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return SeriesNormalization(
+            values=_series_like(series.to_numpy(dtype=object), series),
+            error_codes=_series_like(np.full(len(series), None, dtype=object), series),
+        )
+    return _parse_series(series, parse_boolean, _parse_boolean_text)
+
+
+def _parse_series(
+    series: pd.Series,
+    parse_value: Callable[[object], object],
+    parse_text: Callable[[str], object],
+) -> SeriesNormalization:
+    values = series.to_numpy(dtype=object)
+    strings = _string_mask(values)
+    result = np.full(len(values), None, dtype=object)
+    errors = np.full(len(values), None, dtype=object)
+
+    codes, uniques = _factorize(values[strings])
+    text = _normalize_strings(uniques)
+    parsed = np.full(len(uniques), None, dtype=object)
+    parsed_errors = np.full(len(uniques), None, dtype=object)
+    present = text != None  # noqa: E711 - element-wise comparison
+    parsed[present], parsed_errors[present] = _apply_checked(parse_text, text[present])
+    result[strings] = parsed.take(codes)
+    errors[strings] = parsed_errors.take(codes)
+
+    result[~strings], errors[~strings] = _apply_checked(parse_value, values[~strings])
+    return SeriesNormalization(
+        values=_series_like(result, series),
+        error_codes=_series_like(errors, series),
+    )
+
+
+def _normalize_float_codes(series: pd.Series) -> pd.Series:
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    result = np.full(len(values), None, dtype=object)
+    with np.errstate(invalid="ignore"):
+        exact = (
+            np.isfinite(values)
+            & (values == np.floor(values))
+            & (np.abs(values) < _EXACT_FLOAT_INTEGER_LIMIT)
+        )
+    result[exact] = values[exact].astype(np.int64).astype(str).astype(object)
+    other = ~exact & ~np.isnan(values)
+    result[other] = _apply(normalize_code, series.to_numpy(dtype=object)[other])
+    return _series_like(result, series)
+
+
+def _normalize_strings(strings: np.ndarray) -> np.ndarray:
+    """``normalize_text`` over an array that holds only ``str`` elements."""
+    text = pd.Series(strings, dtype=object).str.normalize("NFKC")
+    # Printable strings cannot contain Cc/Cf characters; only the rest pay for the regex.
+    controlled = ~text.map(str.isprintable).astype(bool)
+    text[controlled] = text[controlled].str.replace(_control_characters(), "", regex=True)
+    return _none_if_empty(text.str.strip().to_numpy(dtype=object, copy=True))
+
+
+@cache
+def _control_characters() -> str:
+    """Regex class of every Cc/Cf code point ``normalize_text`` removes."""
+    ranges: list[list[int]] = []
+    for code_point in range(sys.maxunicode + 1):
+        if unicodedata.category(chr(code_point)) not in {"Cc", "Cf"}:
+            continue
+        if ranges and ranges[-1][1] == code_point - 1:
+            ranges[-1][1] = code_point
+        else:
+            ranges.append([code_point, code_point])
+    members = "".join(
+        re.escape(chr(start)) if start == end else f"{re.escape(chr(start))}-{re.escape(chr(end))}"
+        for start, end in ranges
+    )
+    return f"[{members}]"
+
+
+def _factorize(strings: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # ``pd.factorize`` hashes object strings as C strings and merges values
+    # that differ only after a NUL byte, so distinct values are keyed in a dict.
+    positions: dict[str, int] = {}
+    codes = np.fromiter(
+        (positions.setdefault(value, len(positions)) for value in strings),
+        dtype=np.intp,
+        count=len(strings),
+    )
+    uniques = np.full(len(positions), None, dtype=object)
+    uniques[:] = list(positions)
+    return codes, uniques
+
+
+def _string_mask(values: np.ndarray) -> np.ndarray:
+    return np.fromiter((type(value) is str for value in values), dtype=bool, count=len(values))
+
+
+def _none_if_empty(values: np.ndarray) -> np.ndarray:
+    values[values == ""] = None
+    return values
+
+
+def _apply(function: Callable[[object], object], values: np.ndarray) -> np.ndarray:
+    result = np.full(len(values), None, dtype=object)
+    for position, value in enumerate(values):
+        result[position] = function(value)
+    return result
+
+
+def _apply_checked(
+    function: Callable[[object], object],
+    values: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    result = np.full(len(values), None, dtype=object)
+    errors = np.full(len(values), None, dtype=object)
+    for position, value in enumerate(values):
+        try:
+            result[position] = function(value)
+        except NormalizationError as error:
+            errors[position] = error.error_code
+    return result, errors
+
+
+def _series_like(values: np.ndarray, series: pd.Series) -> pd.Series:
+    return pd.Series(values, index=series.index, name=series.name, dtype=object)
@@ -0,0 +1,374 @@
+"""Optional monthly range partitioning of the large 1C period tables.
+
+A heap table is converted once by ``partition_table``.  From then on both
+loaders detect the partitioned layout and refresh a window month by month:
+months the window covers completely are truncated, a partially covered month
+(usually the current one) is cleared by a predicate that touches only its own
+partition.  Rows whose month has no partition land in the default partition
+and are moved out by detaching it whenever that month's partition is created.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+from datetime import date, datetime, time
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+PARTITIONED_PERIOD_COLUMNS = {
+    "prodazhi": "period",
+    "realizatsija": "data",
+    "registrostatkitovarov": "period",
+    "postuplenija": "data",
+}
+TEXT_PERIOD_TABLES = frozenset({"prodazhi", "registrostatkitovarov"})
+# Text periods are parsed by an IMMUTABLE function so that PostgreSQL can use
+# it in an expression index and as a partition key.  Every accepted shape is
+# taken apart with substr and make_timestamp: a ::timestamp cast depends on
+# DateStyle and to_timestamp is only STABLE.
+TEXT_PERIOD_FUNCTION = "one_c_text_period"
+TEXT_PERIOD_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION {TEXT_PERIOD_FUNCTION}(value text)
+RETURNS timestamp
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+AS $$
+SELECT CASE
+    WHEN trimmed ~ '^[0-9]{{2}}[.][0-9]{{2}}[.][0-9]{{4}} [0-9]{{2}}:[0-9]{{2}}:[0-9]{{2}}$'
+        THEN make_timestamp(
+            substr(trimmed, 7, 4)::int, substr(trimmed, 4, 2)::int,
+            substr(trimmed, 1, 2)::int, substr(trimmed, 12, 2)::int,
+            substr(trimmed, 15, 2)::int, substr(trimmed, 18, 2)::double precision
+        )
+    WHEN trimmed ~ '^[0-9]{{2}}[.][0-9]{{2}}[.][0-9]{{4}}$'
+        THEN make_timestamp(
+            substr(trimmed, 7, 4)::int, substr(trimmed, 4, 2)::int,
+            substr(trimmed, 1, 2)::int, 0, 0, 0
+        )
+    WHEN trimmed ~ '^[0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}}[ T][0-9]{{2}}:[0-9]{{2}}:[0-9]{{2}}([.][0-9]{{1,6}})?$'
+        THEN make_timestamp(
+            substr(trimmed, 1, 4)::int, substr(trimmed, 6, 2)::int,
+            substr(trimmed, 9, 2)::int, substr(trimmed, 12, 2)::int,
+            substr(trimmed, 15, 2)::int, substr(trimmed, 18)::double precision
+        )
+    WHEN trimmed ~ '^[0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}}$'
+        THEN make_timestamp(
+            substr(trimmed, 1, 4)::int, substr(trimmed, 6, 2)::int,
+            substr(trimmed, 9, 2)::int, 0, 0, 0
+        )
+    ELSE NULL
+END
+FROM (SELECT BTRIM(REPLACE(value, CHR(160), ' ')) AS trimmed) AS period
+$$
+"""
+
+
+class PartitionError(ValueError):
+    """A table cannot be converted to or refreshed as a monthly partitioned table."""
+
+
+def ensure_text_period_function(connection: object) -> None:
+    connection.execute(text(TEXT_PERIOD_FUNCTION_SQL))
+
+
+def text_period_expression(column: str) -> str:
+    return f"{TEXT_PERIOD_FUNCTION}({_quote_identifier(column)})"
+
+
+def period_key(table: str) -> str:
+    """SQL expression the table is (or would be) partitioned by."""
+    try:
+        column = PARTITIONED_PERIOD_COLUMNS[table]
+    except KeyError as error:
+        raise PartitionError(f"Table {table} has no monthly partition layout") from error
+    if table in TEXT_PERIOD_TABLES:
+        return text_period_expression(column)
+    return _quote_identifier(column)
+
+
+def is_partitioned(connection: object, table: str) -> bool:
+    return bool(
+        connection.execute(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = to_regclass(:table_name))"
+            ),
+            {"table_name": _qualified(table)},
+        ).scalar_one()
+    )
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def month_starts(start: date, end_exclusive: date) -> list[date]:
+    """First days of every month that intersects ``[start, end_exclusive)``."""
+    start_at, end_at = _as_datetime(start), _as_datetime(end_exclusive)
+    months: list[date] = []
+    month = date(start_at.year, start_at.month, 1)
+    while _as_datetime(month) < end_at:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def partition_table(connection: object, table: str) -> int:
+    """Convert a heap table into monthly partitions; return the rows moved.
+
+    The conversion runs in the caller's transaction, so a failure (for example
+    a view that still depends on the table) leaves the heap table untouched.
+
+    The parent is created ``LIKE`` the heap ``INCLUDING ALL`` but its indexes:
+    columns, defaults, CHECK constraints, column comments and extended
+    statistics are copied.  Indexes, primary key, unique, exclusion and foreign
+    key constraints keep their names and are re-issued after the rows are
+    moved, followed by the table comment, the owner and the table grants.
+    Primary key, unique and exclusion constraints PostgreSQL refuses on a
+    partitioned table (any that miss the partition key, so all of them on a
+    text-period table) are dropped.  Triggers, policies, rules, column grants,
+    storage parameters and publication membership are not carried over.
+    """
+    ensure_text_period_function(connection)
+    if is_partitioned(connection, table):
+        return 0
+    key = period_key(table)
+    target = _qualified(table)
+    heap_name = f"{table}_unpartitioned"
+    heap = _qualified(heap_name)
+    connection.execute(text(f"LOCK TABLE {target} IN ACCESS EXCLUSIVE MODE"))
+    months = _months_present(connection, target, key)
+    optional, required = _carried_definitions(connection, target)
+    connection.execute(text(f"ALTER TABLE {target} RENAME TO {_quote_identifier(heap_name)}"))
+    connection.execute(
+        text(
+            f"CREATE TABLE {target} (LIKE {heap} INCLUDING ALL EXCLUDING INDEXES) "
+            f"PARTITION BY RANGE ({key})"
+        )
+    )
+    connection.execute(
+        text(f"CREATE TABLE {_qualified(_default_name(table))} PARTITION OF {target} DEFAULT")
+    )
+    for month in months:
+        _create_month_partition(connection, table, month)
+    moved = connection.execute(text(f"INSERT INTO {target} SELECT * FROM {heap}")).rowcount
+    connection.execute(text(f"DROP TABLE {heap}"))
+    # Index and constraint names are free only once the heap is gone.
+    for statement in optional:
+        try:
+            with connection.begin_nested():
+                connection.execute(_verbatim(statement))
+        except DBAPIError:
+            continue
+    for statement in required:
+        connection.execute(_verbatim(statement))
+    connection.execute(text(f"ANALYZE {target}"))
+    return moved
+
+
+def ensure_month_partitions(connection: object, table: str, months: Iterable[date]) -> int:
+    """Create the missing month partitions; return how many were created.
+
+    Rows of a new month that already sit in the default partition are moved
+    into it: the default partition is detached, the month partitions created,
+    the rows re-routed through the parent, and the default attached again.
+    """
+    missing = [
+        month
+        for month in sorted(set(months))
+        if connection.execute(
+            text("SELECT to_regclass(:partition) IS NULL"),
+            {"partition": _qualified(partition_name(table, month))},
+        ).scalar_one()
+    ]
+    if not missing:
+        return 0
+    key = period_key(table)
+    target = _qualified(table)
+    default = _qualified(_default_name(table))
+    stranded = _month_filter(key, missing)
+    has_stranded = connection.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {stranded})")
+    ).scalar_one()
+    if not has_stranded:
+        for month in missing:
+            _create_month_partition(connection, table, month)
+        return len(missing)
+    connection.execute(text(f"ALTER TABLE {target} DETACH PARTITION {default}"))
+    for month in missing:
+        _create_month_partition(connection, table, month)
+    connection.execute(text(f"INSERT INTO {target} SELECT * FROM {default} WHERE {stranded}"))
+    connection.execute(text(f"DELETE FROM {default} WHERE {stranded}"))
+    connection.execute(text(f"ALTER TABLE {target} ATTACH PARTITION {default} DEFAULT"))
+    return len(missing)
+
+
+def rebalance_default_partition(connection: object, table: str) -> int:
+    """Give every month found in the default partition its own partition."""
+    default = _qualified(_default_name(table))
+    return ensure_month_partitions(
+        connection, table, _months_present(connection, default, period_key(table))
+    )
+
+
+def clear_period(connection: object, table: str, start: date, end_exclusive: date) -> int:
+    """Remove every row whose period lies in ``[start, end_exclusive)``.
+
+    Month partitions inside the range are truncated; a month the range covers
+    only partially is cleared with a DELETE pruned to that partition.  The
+    partitions of the whole range exist afterwards, so reloaded rows never fall
+    into the default partition.  Returns the number of removed rows.
+    """
+    months = month_starts(start, end_exclusive)
+    ensure_month_partitions(connection, table, months)
+    start_at, end_at = _as_datetime(start), _as_datetime(end_exclusive)
+    key = period_key(table)
+    removed = 0
+    for month in months:
+        month_at, next_at = _as_datetime(month), _as_datetime(_next_month(month))
+        partition = _qualified(partition_name(table, month))
+        if start_at <= month_at and next_at <= end_at:
+            removed += int(
+                connection.execute(text(f"SELECT count(*) FROM {partition}")).scalar_one()
+            )
+            connection.execute(text(f"TRUNCATE {partition}"))
+            continue
+        removed += connection.execute(
+            text(f"DELETE FROM {partition} WHERE {key} >= :lower AND {key} < :upper"),
+            {"lower": max(start_at, month_at), "upper": min(end_at, next_at)},
+        ).rowcount
+    return removed
+
+
+def _months_present(connection: object, relation: str, key: str) -> list[date]:
+    rows = connection.execute(
+        text(
+            f"SELECT DISTINCT date_trunc('month', {key})::date FROM {relation} "
+            f"WHERE {key} IS NOT NULL"
+        )
+    ).scalars()
+    return sorted(rows)
+
+
+def _carried_definitions(connection: object, target: str) -> tuple[list[str], list[str]]:
+    """Statements re-creating what ``LIKE`` does not copy, as (optional, required).
+
+    Optional ones are the uniqueness guarantees a partitioned table may refuse.
+    """
+    relation = {"target": target}
+    constraints = connection.execute(
+        text(
+            "SELECT contype IN ('p', 'u', 'x'), "
+            "format('ALTER TABLE %s ADD CONSTRAINT %I %s', :target, conname, "
+            "pg_get_constraintdef(oid)) "
+            "FROM pg_constraint WHERE conrelid = to_regclass(:target) "
+            "AND contype IN ('p', 'u', 'x', 'f') ORDER BY contype = 'f', conname"
+        ),
+        relation,
+    ).all()
+    indexes = connection.execute(
+        text(
+            "SELECT index.indisunique, pg_get_indexdef(index.indexrelid) "
+            "FROM pg_index AS index "
+            "WHERE index.indrelid = to_regclass(:target) AND NOT EXISTS ("
+            "SELECT 1 FROM pg_constraint AS con WHERE con.conindid = index.indexrelid "
+            "AND con.conrelid = index.indrelid) "
+            "ORDER BY index.indexrelid"
+        ),
+        relation,
+    ).all()
+    # LIKE copies comments of CHECK constraints only; a comment on a refused
+    # uniqueness guarantee fails with it, so it is optional as well.
+    comments = connection.execute(
+        text(
+            "SELECT false, format('COMMENT ON TABLE %s IS %L', :target, "
+            "obj_description(to_regclass(:target), 'pg_class')) "
+            "WHERE obj_description(to_regclass(:target), 'pg_class') IS NOT NULL "
+            "UNION ALL "
+            "SELECT index.indisunique, format('COMMENT ON INDEX public.%I IS %L', "
+            "index_class.relname, obj_description(index.indexrelid, 'pg_class')) "
+            "FROM pg_index AS index JOIN pg_class AS index_class ON index_class.oid = index.indexrelid "
+            "WHERE index.indrelid = to_regclass(:target) "
+            "AND obj_description(index.indexrelid, 'pg_class') IS NOT NULL "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint AS con "
+            "WHERE con.conindid = index.indexrelid AND con.conrelid = index.indrelid) "
+            "UNION ALL "
+            "SELECT contype IN ('p', 'u', 'x'), format('COMMENT ON CONSTRAINT %I ON %s IS %L', "
+            "conname, :target, obj_description(oid, 'pg_constraint')) "
+            "FROM pg_constraint WHERE conrelid = to_regclass(:target) "
+            "AND contype IN ('p', 'u', 'x', 'f') "
+            "AND obj_description(oid, 'pg_constraint') IS NOT NULL"
+        ),
+        relation,
+    ).all()
+    owner = connection.execute(
+        text(
+            "SELECT format('ALTER TABLE %s OWNER TO %s', :target, relowner::regrole) "
+            "FROM pg_class WHERE oid = to_regclass(:target)"
+        ),
+        relation,
+    ).scalar_one()
+    grants = connection.execute(
+        text(
+            "SELECT format('GRANT %s ON %s TO %s%s', acl.privilege_type, :target, "
+            "CASE WHEN acl.grantee = 0 THEN 'PUBLIC' ELSE acl.grantee::regrole::text END, "
+            "CASE WHEN acl.is_grantable THEN ' WITH GRANT OPTION' ELSE '' END) "
+            "FROM pg_class AS class, aclexplode(class.relacl) AS acl "
+            "WHERE class.oid = to_regclass(:target) AND acl.grantee <> class.relowner"
+        ),
+        relation,
+    ).scalars().all()
+    definitions = [*constraints, *indexes, *comments]
+    optional = [statement for unique, statement in definitions if unique]
+    required = [statement for unique, statement in definitions if not unique]
+    return optional, [*required, owner, *grants]
+
+
+def _verbatim(statement: str) -> object:
+    # Generated statements carry literals (comments, partial-index predicates)
+    # whose colons must not be taken for bind parameters.
+    return text(statement.replace(":", "\\:"))
+
+
+def _create_month_partition(connection: object, table: str, month: date) -> None:
+    connection.execute(
+        text(
+            f"CREATE TABLE {_qualified(partition_name(table, month))} "
+            f"PARTITION OF {_qualified(table)} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+        )
+    )
+
+
+def _month_filter(key: str, months: list[date]) -> str:
+    return " OR ".join(
+        f"({key} >= '{month:%Y-%m-%d}' AND {key} < '{_next_month(month):%Y-%m-%d}')"
+        for month in months
+    )
+
+
+def _default_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def _next_month(month: date) -> date:
+    if month.month == 12:
+        return date(month.year + 1, 1, 1)
+    return date(month.year, month.month + 1, 1)
+
+
+def _as_datetime(value: date) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time())
+
+
+def _qualified(table: str) -> str:
+    return f"public.{_quote_identifier(table)}"
+
+
+def _quote_identifier(value: str) -> str:
+    if re.fullmatch(r"[a-z0-9_]+", value) is None:
+        raise PartitionError(f"Unsafe SQL identifier: {value!r}")
+    return f'"{value}"'
@@ -6,13 +6,20 @@ import codecs
 import csv
 import hashlib
 import json
-from collections.abc import Iterator
+from collections.abc import Callable, Iterator, Sequence
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
+from typing import TextIO
 
 from .contracts import CsvContract, CsvRowRepair
 
 UTF8_BOM = codecs.BOM_UTF8
+# Version 1 is the sorted-key JSON hash stored on ``AcceptedRow``; blocks
+# default to the cheaper version 2 field encoding (see ``row_hasher``) and hash
+# only when a caller asks for ``RowBlock.row_hashes()``.
+ROW_HASH_VERSION = 2
+DEFAULT_BLOCK_SIZE = 10_000
 
 
 class ContractMismatchError(ValueError):
@@ -39,6 +46,27 @@ class RejectedRow:
     safe_message: str
 
 
+@dataclass(frozen=True, slots=True)
+class RowBlock:
+    headers: tuple[str, ...]
+    row_numbers: list[int]
+    columns: dict[str, list[str]]
+    rejected: tuple[RejectedRow, ...] = ()
+    hash_version: int = ROW_HASH_VERSION
+
+    def __len__(self) -> int:
+        return len(self.row_numbers)
+
+    def rows(self) -> Iterator[tuple[str, ...]]:
+        """Iterate accepted rows as value tuples in header order."""
+        return zip(*(self.columns[header] for header in self.headers), strict=True)
+
+    def row_hashes(self) -> list[str]:
+        """Hash accepted rows with the block's canonical encoding version."""
+        hasher = row_hasher(self.headers, self.hash_version)
+        return [hasher(row) for row in self.rows()]
+
+
 CsvRowResult = AcceptedRow | RejectedRow
 
 
@@ -84,54 +112,160 @@ def validate_contract(metadata: CsvMetadata, contract: CsvContract) -> None:
 
 def iter_rows(path: Path, metadata: CsvMetadata, contract: CsvContract) -> Iterator[CsvRowResult]:
     """Yield validated rows without loading the complete file into memory."""
-    validate_contract(metadata, contract)
     with path.open("r", encoding=metadata.encoding, newline="") as source:
-        reader = csv.reader(source, delimiter=";")
-        next(reader)
-        pending_multiline: list[tuple[int, list[str]]] = []
-        for row in reader:
-            row_number = reader.line_num
-
-            if contract.row_repair is CsvRowRepair.TRAILING_DELIMITERS:
-                if len(row) > len(metadata.headers):
-                    row = row[: len(metadata.headers) - 1] + [
-                        ";".join(row[len(metadata.headers) - 1 :])
-                    ]
-                yield _row_result(row_number, row, metadata)
-                continue
+        yield from iter_source_rows(source, metadata, contract)
 
-            if contract.row_repair is CsvRowRepair.UNQUOTED_MULTILINE_FIELD:
-                field_index = contract.repair_field_index
-                assert field_index is not None
-                if pending_multiline:
-                    expected_tail_width = len(metadata.headers) - field_index
-                    if not row:
-                        pending_multiline.append((row_number, row))
-                        continue
-                    if len(row) == expected_tail_width:
-                        _, start = pending_multiline[0]
-                        field_fragments = [start[-1]]
-                        field_fragments.extend("" for _ in pending_multiline[1:])
-                        field_fragments.append(row[0])
-                        repaired = start[:-1] + ["\n".join(field_fragments)] + row[1:]
-                        yield _row_result(row_number, repaired, metadata)
-                        pending_multiline.clear()
-                        continue
-                    for buffered_number, buffered_row in pending_multiline:
-                        yield _row_result(buffered_number, buffered_row, metadata)
-                    pending_multiline.clear()
 
-                if len(row) == field_index + 1:
+def iter_source_rows(
+    source: TextIO,
+    metadata: CsvMetadata,
+    contract: CsvContract,
+) -> Iterator[CsvRowResult]:
+    """Yield validated rows from an already opened text stream positioned at the header."""
+    for row_number, row in _iter_raw_rows(source, metadata, contract):
+        yield _row_result(row_number, row, metadata)
+
+
+def iter_row_blocks(
+    path: Path,
+    metadata: CsvMetadata,
+    contract: CsvContract,
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    hash_version: int = ROW_HASH_VERSION,
+) -> Iterator[RowBlock]:
+    """Yield column-oriented blocks of at most ``block_size`` source rows."""
+    with path.open("r", encoding=metadata.encoding, newline="") as source:
+        yield from iter_source_blocks(
+            source,
+            metadata,
+            contract,
+            block_size=block_size,
+            hash_version=hash_version,
+        )
+
+
+def iter_source_blocks(
+    source: TextIO,
+    metadata: CsvMetadata,
+    contract: CsvContract,
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    hash_version: int = ROW_HASH_VERSION,
+) -> Iterator[RowBlock]:
+    """Yield column-oriented blocks from an already opened text stream.
+
+    Accepted rows are transposed into one list per header without building a
+    payload dict per row; rejected rows are reported on the block that read them.
+    """
+    if block_size < 1:
+        raise ValueError("Row block size must be positive")
+    row_hasher(metadata.headers, hash_version)  # reject unknown versions before reading
+    raw_rows = _iter_raw_rows(source, metadata, contract)
+    while batch := list(islice(raw_rows, block_size)):
+        accepted: list[list[str]] = []
+        row_numbers: list[int] = []
+        rejected: list[RejectedRow] = []
+        for row_number, row in batch:
+            rejection = _rejection(row_number, row, metadata)
+            if rejection is None:
+                accepted.append(row)
+                row_numbers.append(row_number)
+            else:
+                rejected.append(rejection)
+        columns = (
+            [list(values) for values in zip(*accepted, strict=True)]
+            if accepted
+            else [[] for _ in metadata.headers]
+        )
+        yield RowBlock(
+            headers=metadata.headers,
+            row_numbers=row_numbers,
+            columns=dict(zip(metadata.headers, columns, strict=True)),
+            rejected=tuple(rejected),
+            hash_version=hash_version,
+        )
+
+
+def row_hasher(
+    headers: tuple[str, ...],
+    version: int = ROW_HASH_VERSION,
+) -> Callable[[Sequence[str]], str]:
+    """Return the row hash function of a canonical encoding version.
+
+    Version 1 is the SHA-256 of the sorted-key JSON payload stored by
+    ``AcceptedRow.row_hash``.  Version 2 hashes the header tuple once and then
+    only the NUL-joined values in header order; NUL never occurs inside an
+    accepted value, so the encoding stays unambiguous for a fixed header.
+    """
+    if version == 1:
+
+        def json_hash(row: Sequence[str]) -> str:
+            return _json_row_hash(dict(zip(headers, row, strict=True)))
+
+        return json_hash
+    if version == 2:
+        seed = hashlib.sha256(b"v2\x00" + "\x00".join(headers).encode("utf-8") + b"\x00\x00")
+
+        def field_hash(row: Sequence[str]) -> str:
+            digest = seed.copy()
+            digest.update("\x00".join(row).encode("utf-8"))
+            return digest.hexdigest()
+
+        return field_hash
+    raise ValueError(f"Unsupported row hash version: {version}")
+
+
+def _iter_raw_rows(
+    source: TextIO,
+    metadata: CsvMetadata,
+    contract: CsvContract,
+) -> Iterator[tuple[int, list[str]]]:
+    validate_contract(metadata, contract)
+    reader = csv.reader(source, delimiter=";")
+    next(reader)
+    pending_multiline: list[tuple[int, list[str]]] = []
+    for row in reader:
+        row_number = reader.line_num
+
+        if contract.row_repair is CsvRowRepair.TRAILING_DELIMITERS:
+            if len(row) > len(metadata.headers):
+                row = row[: len(metadata.headers) - 1] + [
+                    ";".join(row[len(metadata.headers) - 1 :])
+                ]
+            yield row_number, row
+            continue
+
+        if contract.row_repair is CsvRowRepair.UNQUOTED_MULTILINE_FIELD:
+            field_index = contract.repair_field_index
+            assert field_index is not None
+            if pending_multiline:
+                expected_tail_width = len(metadata.headers) - field_index
+                if not row:
                     pending_multiline.append((row_number, row))
                     continue
+                if len(row) == expected_tail_width:
+                    _, start = pending_multiline[0]
+                    field_fragments = [start[-1]]
+                    field_fragments.extend("" for _ in pending_multiline[1:])
+                    field_fragments.append(row[0])
+                    repaired = start[:-1] + ["\n".join(field_fragments)] + row[1:]
+                    yield row_number, repaired
+                    pending_multiline.clear()
+                    continue
+                yield from pending_multiline
+                pending_multiline.clear()
+
+            if len(row) == field_index + 1:
+                pending_multiline.append((row_number, row))
+                continue
 
-            yield _row_result(row_number, row, metadata)
+        yield row_number, row
 
-        for buffered_number, buffered_row in pending_multiline:
-            yield _row_result(buffered_number, buffered_row, metadata)
+    yield from pending_multiline
 
 
-def _row_result(row_number: int, row: list[str], metadata: CsvMetadata) -> CsvRowResult:
+def _rejection(row_number: int, row: list[str], metadata: CsvMetadata) -> RejectedRow | None:
     if len(row) != len(metadata.headers):
         return RejectedRow(
             row_number=row_number,
@@ -144,15 +278,26 @@ def _row_result(row_number: int, row: list[str], metadata: CsvMetadata) -> CsvRo
             error_code="CSV_NULL_BYTE",
             safe_message="Row contains a NUL byte",
         )
+    return None
+
+
+def _row_result(row_number: int, row: list[str], metadata: CsvMetadata) -> CsvRowResult:
+    rejection = _rejection(row_number, row, metadata)
+    if rejection is not None:
+        return rejection
     payload = dict(zip(metadata.headers, row, strict=True))
+    return AcceptedRow(
+        row_number=row_number,
+        row_hash=_json_row_hash(payload),
+        payload=payload,
+    )
+
+
+def _json_row_hash(payload: dict[str, str]) -> str:
     canonical = json.dumps(
         payload,
         ensure_ascii=False,
         sort_keys=True,
         separators=(",", ":"),
     ).encode("utf-8")
-    return AcceptedRow(
-        row_number=row_number,
-        row_hash=hashlib.sha256(canonical).hexdigest(),
-        payload=payload,
-    )
+    return hashlib.sha256(canonical).hexdigest()
@@ -6,16 +6,21 @@ selects a database or source path implicitly and never logs business payload.
 
 from __future__ import annotations
 
+import csv
 import hashlib
+import io
 import json
-from collections.abc import Iterator
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
 from dataclasses import dataclass
 from datetime import date, datetime
 from enum import StrEnum
+from itertools import islice
 from pathlib import Path
 from uuid import UUID
 
-from sqlalchemy import Connection, Engine, create_engine, text
+from sqlalchemy import Connection, Engine, bindparam, create_engine, text
+from sqlalchemy.pool import NullPool
 
 from .contracts import (
     CONTRACT_VERSIONS_BY_NAME,
@@ -23,7 +28,21 @@ from .contracts import (
     CsvContract,
 )
 from .normalization import normalize_header, parse_datetime
-from .reader import AcceptedRow, iter_rows, read_metadata
+from .partitions import (
+    PARTITIONED_PERIOD_COLUMNS,
+    clear_period,
+    is_partitioned,
+    partition_table,
+    period_key,
+    rebalance_default_partition,
+)
+from .reader import (
+    CsvMetadata,
+    RowBlock,
+    iter_row_blocks,
+    iter_source_blocks,
+    read_metadata,
+)
 
 
 class ReceiverError(ValueError):
@@ -95,12 +114,20 @@ class ImportManifest:
     manifest_sha256: str
 
 
+@dataclass(frozen=True, slots=True)
+class PublicationCounts:
+    inserted: int
+    deleted: int
+    unchanged: int
+
+
 @dataclass(frozen=True, slots=True)
 class ApplyResult:
     run_id: UUID
     status: str
     applied_contracts: int
     applied_rows: int
+    skipped_contracts: int = 0
 
 
 TABLE_BY_CONTRACT = {
@@ -201,10 +228,18 @@ _SNAPSHOT_CONTRACTS = frozenset(
     }
 )
 _ALLOWED_MODES = frozenset({"fast", "incremental", "reconciliation", "full-recovery"})
+# Reconciliation and recovery runs always republish, even byte-identical artifacts.
+_SKIP_UNCHANGED_MODES = frozenset({"fast", "incremental"})
 _ALLOWED_SQL_TYPES = frozenset(
     {"text", "bigint", "double precision", "timestamp without time zone"}
 )
 _WRITE_CHUNK_SIZE = 5_000
+_COPY_READ_SIZE = 1024 * 1024
+_COPY_DRIVERS = frozenset({"psycopg2"})
+# Parallel stage tables are public.one_c_stage_<table>_<run>; the run that owns
+# them holds a session advisory lock on (_STAGE_LOCK_CLASS, hashtext(<run>)).
+_STAGE_PREFIX = "one_c_stage_"
+_STAGE_LOCK_CLASS = "one_c_stage"
 
 
 def sha256_file(path: Path) -> str:
@@ -344,60 +379,214 @@ def validate_artifact(source_dir: Path, entry: ManifestEntry) -> None:
         raise ReceiverError(f"Artifact is missing for {entry.spec.name}")
     if path.stat().st_size != entry.size_bytes or sha256_file(path) != entry.sha256:
         raise ReceiverError(f"Artifact fingerprint mismatch for {entry.spec.name}")
+    metadata = _artifact_metadata(path, entry)
+    accepted = sum(
+        len(block)
+        for block in _validated_blocks(iter_row_blocks(path, metadata, entry.contract), entry)
+    )
+    if accepted != entry.row_count:
+        raise ReceiverError(f"Artifact row count mismatch for {entry.spec.name}")
+
+
+def _artifact_metadata(path: Path, entry: ManifestEntry) -> CsvMetadata:
     metadata = read_metadata(path)
     if metadata.headers != entry.contract.headers:
         raise ReceiverError(f"Artifact header mismatch for {entry.spec.name}")
-    accepted = 0
-    for row in iter_rows(path, metadata, entry.contract):
-        if not isinstance(row, AcceptedRow):
+    return metadata
+
+
+def _validated_blocks(
+    blocks: Iterable[RowBlock],
+    entry: ManifestEntry,
+) -> Iterator[RowBlock]:
+    for block in blocks:
+        if block.rejected:
             raise ReceiverError(
-                f"Artifact contains a rejected row for {entry.spec.name}: {row.error_code}"
+                f"Artifact contains a rejected row for {entry.spec.name}: "
+                f"{block.rejected[0].error_code}"
             )
-        _validate_row_scope(entry, row.payload)
-        accepted += 1
-    if accepted != entry.row_count:
-        raise ReceiverError(f"Artifact row count mismatch for {entry.spec.name}")
+        _validate_block_scope(entry, block)
+        yield block
+
+
+class _FingerprintReader(io.RawIOBase):
+    """Raw byte stream that hashes and counts exactly what the CSV parser consumes."""
+
+    def __init__(self, raw: io.RawIOBase) -> None:
+        self._raw = raw
+        self._digest = hashlib.sha256()
+        self.size_bytes = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        count = self._raw.readinto(buffer)
+        if count:
+            self._digest.update(memoryview(buffer)[:count])
+            self.size_bytes += count
+        return count
+
+    def drain(self) -> None:
+        while self.read(1024 * 1024):
+            pass
 
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
 
-def _validate_row_scope(entry: ManifestEntry, payload: dict[str, str]) -> None:
+
+def _validate_block_scope(entry: ManifestEntry, block: RowBlock) -> None:
     if entry.publication is PublicationKind.SNAPSHOT:
         return
     assert entry.scope is not None
     assert entry.spec.period_header is not None
-    parsed = parse_datetime(payload.get(entry.spec.period_header))
-    if parsed is None:
-        raise ReceiverError(f"Period row has an empty event date for {entry.spec.name}")
-    if not entry.scope.start <= parsed.date() < entry.scope.end_exclusive:
-        raise ReceiverError(f"Period row is outside declared scope for {entry.spec.name}")
+    for value in block.columns[entry.spec.period_header]:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ReceiverError(f"Period row has an empty event date for {entry.spec.name}")
+        if not entry.scope.start <= parsed.date() < entry.scope.end_exclusive:
+            raise ReceiverError(f"Period row is outside declared scope for {entry.spec.name}")
 
 
 def apply_manifest(
     engine: Engine,
     source_dir: Path,
     manifest: ImportManifest,
+    *,
+    single_pass: bool = False,
+    workers: int = 1,
+    delta_snapshots: bool = False,
+    partitioned_periods: bool = False,
 ) -> ApplyResult:
-    for entry in manifest.entries:
-        validate_artifact(source_dir, entry)
+    """Validate and publish every manifest entry in one transaction.
+
+    With ``single_pass`` the artifacts are not pre-validated: each file is
+    hashed, scope-checked and staged in one read, and a fingerprint or row-count
+    mismatch found at the end of the file rolls the whole transaction back.
+
+    With ``workers > 1`` every artifact is validated and staged concurrently
+    in a worker process into its own unlogged table on a separate connection;
+    only the delete-scope/insert publication runs serially in the publishing
+    transaction.  Stage tables left behind by a killed run are dropped when the
+    next run starts.
+
+    In fast and incremental runs a contract whose artifact, version and scope
+    equal its latest successful publication, and whose published scope still
+    has the content fingerprint recorded then, is not republished; its artifact
+    is only re-hashed.  It is recorded with ``skipped = true`` in
+    ``one_c_import_contract``.
+
+    With ``delta_snapshots`` the core snapshot contracts are diffed against the
+    published table by a digest of each typed row: only vanished rows are
+    deleted and only new rows inserted.  Inserted, deleted and unchanged row counts are recorded
+    per contract for every publication.
+
+    With ``partitioned_periods`` the large movement tables (sales, realizations,
+    receipts, inventory movements) are converted to monthly range partitions
+    before their first publication.  A partitioned target is always refreshed
+    by truncating the scope's whole months, whichever flag converted it.
+    """
+    if workers < 1:
+        raise ReceiverError("Receiver worker count must be positive")
     with engine.begin() as connection:
         _ensure_metadata_tables(connection)
-        existing_sha = connection.execute(
-            text(
-                "SELECT manifest_sha256 FROM public.one_c_import_run "
-                "WHERE run_id = :run_id AND status = 'succeeded'"
-            ),
-            {"run_id": str(manifest.run_id)},
-        ).scalar_one_or_none()
+        _drop_orphan_stage_tables(connection)
+        existing_sha = _applied_manifest_sha(connection, manifest.run_id)
         if existing_sha is not None:
-            if existing_sha != manifest.manifest_sha256:
-                raise ReceiverError("Run id was already applied with another manifest")
-            return ApplyResult(
-                run_id=manifest.run_id,
-                status="already_applied",
-                applied_contracts=0,
-                applied_rows=0,
+            return _already_applied(manifest, existing_sha)
+        unchanged = _unchanged_contracts(connection, manifest)
+    changed = tuple(entry for entry in manifest.entries if entry.spec.name not in unchanged)
+    for entry in manifest.entries:
+        if entry.spec.name in unchanged:
+            _require_artifact_fingerprint(resolve_artifact(source_dir, entry), entry)
+    publish = {
+        "single_pass": single_pass,
+        "unchanged": unchanged,
+        "delta_snapshots": delta_snapshots,
+        "partitioned_periods": partitioned_periods,
+    }
+    if workers == 1:
+        if not single_pass:
+            for entry in changed:
+                validate_artifact(source_dir, entry)
+        return _publish_manifest(engine, source_dir, manifest, stage_tables={}, **publish)
+    stage_tables = {
+        entry.spec.name: _unlogged_stage_table(entry, manifest.run_id) for entry in changed
+    }
+    # The session lock marks the stage tables as owned; if this process dies,
+    # the lock goes with its session and the next run drops the tables.
+    lock = {"lock_class": _STAGE_LOCK_CLASS, "run": manifest.run_id.hex[:12]}
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as guard:
+        guard.execute(text("SELECT pg_advisory_lock(hashtext(:lock_class), hashtext(:run))"), lock)
+        try:
+            _stage_parallel(
+                engine,
+                source_dir,
+                changed,
+                stage_tables,
+                single_pass=single_pass,
+                workers=workers,
+            )
+            return _publish_manifest(
+                engine, source_dir, manifest, stage_tables=stage_tables, **publish
+            )
+        finally:
+            _drop_stage_tables(engine, stage_tables.values())
+            # The pooled connection outlives this run; release the lock explicitly.
+            guard.execute(
+                text("SELECT pg_advisory_unlock(hashtext(:lock_class), hashtext(:run))"), lock
             )
+
+
+def _already_applied(manifest: ImportManifest, existing_sha: str) -> ApplyResult:
+    if existing_sha != manifest.manifest_sha256:
+        raise ReceiverError("Run id was already applied with another manifest")
+    return ApplyResult(
+        run_id=manifest.run_id,
+        status="already_applied",
+        applied_contracts=0,
+        applied_rows=0,
+    )
+
+
+def _publish_manifest(
+    engine: Engine,
+    source_dir: Path,
+    manifest: ImportManifest,
+    *,
+    single_pass: bool,
+    stage_tables: dict[str, str],
+    unchanged: dict[str, str],
+    delta_snapshots: bool,
+    partitioned_periods: bool = False,
+) -> ApplyResult:
+    with engine.begin() as connection:
+        _ensure_metadata_tables(connection)
+        existing_sha = _applied_manifest_sha(connection, manifest.run_id)
+        if existing_sha is not None:
+            return _already_applied(manifest, existing_sha)
+        # Content was fingerprinted before staging; here only the history is re-read.
+        history = _unchanged_contracts(connection, manifest, verify_targets=False)
+        if not unchanged.items() <= history.items():
+            raise ReceiverError("Contract publication history changed during the run")
+        counts: dict[str, PublicationCounts] = {}
+        fingerprints = dict(unchanged)
         for entry in manifest.entries:
-            _apply_entry(connection, source_dir, entry)
+            if entry.spec.name in unchanged:
+                counts[entry.spec.name] = PublicationCounts(
+                    inserted=0, deleted=0, unchanged=entry.row_count
+                )
+                continue
+            counts[entry.spec.name], fingerprints[entry.spec.name] = _apply_entry(
+                connection,
+                source_dir,
+                entry,
+                single_pass=single_pass,
+                stage_table=stage_tables.get(entry.spec.name),
+                delta=delta_snapshots and entry.spec.name in _SNAPSHOT_CONTRACTS,
+                partition=partitioned_periods,
+                fingerprint=manifest.mode in _SKIP_UNCHANGED_MODES,
+            )
         connection.execute(
             text(
                 "INSERT INTO public.one_c_import_run "
@@ -419,10 +608,12 @@ def apply_manifest(
                 text(
                     "INSERT INTO public.one_c_import_contract "
                     "(run_id, contract_name, contract_version, publication, scope_start, "
-                    "scope_end_exclusive, source_sha256, source_size_bytes, row_count) "
+                    "scope_end_exclusive, source_sha256, source_size_bytes, row_count, "
+                    "skipped, rows_inserted, rows_deleted, rows_unchanged, target_fingerprint) "
                     "VALUES (:run_id, :contract_name, :contract_version, :publication, "
                     ":scope_start, :scope_end_exclusive, :source_sha256, "
-                    ":source_size_bytes, :row_count)"
+                    ":source_size_bytes, :row_count, :skipped, :rows_inserted, "
+                    ":rows_deleted, :rows_unchanged, :target_fingerprint)"
                 ),
                 {
                     "run_id": str(manifest.run_id),
@@ -436,16 +627,203 @@ def apply_manifest(
                     "source_sha256": entry.sha256,
                     "source_size_bytes": entry.size_bytes,
                     "row_count": entry.row_count,
+                    "skipped": entry.spec.name in unchanged,
+                    "rows_inserted": counts[entry.spec.name].inserted,
+                    "rows_deleted": counts[entry.spec.name].deleted,
+                    "rows_unchanged": counts[entry.spec.name].unchanged,
+                    "target_fingerprint": fingerprints[entry.spec.name],
                 },
             )
+    published = [entry for entry in manifest.entries if entry.spec.name not in unchanged]
     return ApplyResult(
         run_id=manifest.run_id,
         status="succeeded",
-        applied_contracts=len(manifest.entries),
-        applied_rows=sum(entry.row_count for entry in manifest.entries),
+        applied_contracts=len(published),
+        applied_rows=sum(entry.row_count for entry in published),
+        skipped_contracts=len(unchanged),
     )
 
 
+def _applied_manifest_sha(connection: Connection, run_id: UUID) -> str | None:
+    return connection.execute(
+        text(
+            "SELECT manifest_sha256 FROM public.one_c_import_run "
+            "WHERE run_id = :run_id AND status = 'succeeded'"
+        ),
+        {"run_id": str(run_id)},
+    ).scalar_one_or_none()
+
+
+def _unchanged_contracts(
+    connection: Connection, manifest: ImportManifest, *, verify_targets: bool = True
+) -> dict[str, str]:
+    """Map contracts whose latest successful publication has identical content to its fingerprint.
+
+    The published scope must still match the content fingerprint recorded with
+    that publication; publications recorded without a fingerprint (before they
+    were kept, or by reconciliation and recovery runs) are never skipped.
+    Without ``verify_targets`` only the publication history is compared.
+    """
+    if manifest.mode not in _SKIP_UNCHANGED_MODES:
+        return {}
+    latest = {
+        str(row["contract_name"]): row
+        for row in connection.execute(
+            text(
+                "SELECT DISTINCT ON (contract.contract_name) contract.contract_name, "
+                "contract.contract_version, contract.publication, contract.scope_start, "
+                "contract.scope_end_exclusive, contract.source_sha256, contract.row_count, "
+                "contract.target_fingerprint "
+                "FROM public.one_c_import_contract AS contract "
+                "JOIN public.one_c_import_run AS run ON run.run_id = contract.run_id "
+                "WHERE run.status = 'succeeded' AND contract.contract_name IN :names "
+                "ORDER BY contract.contract_name, run.applied_at DESC"
+            ).bindparams(bindparam("names", expanding=True)),
+            {"names": [entry.spec.name for entry in manifest.entries]},
+        ).mappings()
+    }
+    unchanged: dict[str, str] = {}
+    for entry in manifest.entries:
+        previous = latest.get(entry.spec.name)
+        if previous is None or previous["target_fingerprint"] is None:
+            continue
+        if (
+            previous["contract_version"],
+            previous["publication"],
+            previous["scope_start"],
+            previous["scope_end_exclusive"],
+            previous["source_sha256"],
+            previous["row_count"],
+        ) != (
+            entry.contract.version,
+            entry.publication.value,
+            None if entry.scope is None else entry.scope.start,
+            None if entry.scope is None else entry.scope.end_exclusive,
+            entry.sha256,
+            entry.row_count,
+        ):
+            continue
+        # Another loader may have rewritten the table since; never skip a drifted target.
+        if not verify_targets or (
+            _target_scope_fingerprint(connection, entry) == previous["target_fingerprint"]
+        ):
+            unchanged[entry.spec.name] = previous["target_fingerprint"]
+    return unchanged
+
+
+def _require_artifact_size(path: Path, entry: ManifestEntry) -> None:
+    if not path.is_file():
+        raise ReceiverError(f"Artifact is missing for {entry.spec.name}")
+    if path.stat().st_size != entry.size_bytes:
+        raise ReceiverError(f"Artifact fingerprint mismatch for {entry.spec.name}")
+
+
+def _require_artifact_fingerprint(path: Path, entry: ManifestEntry) -> None:
+    _require_artifact_size(path, entry)
+    if sha256_file(path) != entry.sha256:
+        raise ReceiverError(f"Artifact fingerprint mismatch for {entry.spec.name}")
+
+
+def _stage_parallel(
+    engine: Engine,
+    source_dir: Path,
+    entries: tuple[ManifestEntry, ...],
+    stage_tables: dict[str, str],
+    *,
+    single_pass: bool,
+    workers: int,
+) -> None:
+    # Largest artifacts first so the longest staging job never starts last.
+    ordered = sorted(entries, key=lambda entry: entry.size_bytes, reverse=True)
+    # Parsing and value normalisation are CPU-bound Python, so each artifact is
+    # staged in its own process over its own connection.
+    database_url = engine.url.render_as_string(hide_password=False)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _stage_in_process,
+                database_url,
+                source_dir,
+                entry,
+                stage_tables[entry.spec.name],
+                single_pass=single_pass,
+            )
+            for entry in ordered
+        ]
+        _, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in pending:
+            future.cancel()
+    for future in futures:
+        if not future.cancelled():
+            future.result()
+
+
+def _unlogged_stage_table(entry: ManifestEntry, run_id: UUID) -> str:
+    stage_name = f"{_STAGE_PREFIX}{entry.spec.table_name}_{run_id.hex[:12]}"
+    return f"public.{_quote_identifier(stage_name)}"
+
+
+def _drop_orphan_stage_tables(connection: Connection) -> None:
+    """Drop parallel stage tables whose run no longer holds its stage lock."""
+    leftovers = connection.execute(
+        text(
+            "SELECT relname FROM pg_class "
+            "WHERE relnamespace = 'public'::regnamespace AND relkind = 'r' "
+            "AND starts_with(relname, :prefix)"
+        ),
+        {"prefix": _STAGE_PREFIX},
+    ).scalars().all()
+    for stage_name in leftovers:
+        owner_gone = connection.execute(
+            text("SELECT pg_try_advisory_xact_lock(hashtext(:lock_class), hashtext(:run))"),
+            {"lock_class": _STAGE_LOCK_CLASS, "run": stage_name.rpartition("_")[2]},
+        ).scalar_one()
+        if owner_gone:
+            connection.execute(text(f"DROP TABLE IF EXISTS public.{_quote_identifier(stage_name)}"))
+
+
+def _stage_in_process(
+    database_url: str,
+    source_dir: Path,
+    entry: ManifestEntry,
+    stage_table: str,
+    *,
+    single_pass: bool,
+) -> None:
+    engine = create_engine(database_url, poolclass=NullPool)
+    try:
+        _stage_unlogged(engine, source_dir, entry, stage_table, single_pass=single_pass)
+    finally:
+        engine.dispose()
+
+
+def _stage_unlogged(
+    engine: Engine,
+    source_dir: Path,
+    entry: ManifestEntry,
+    stage_table: str,
+    *,
+    single_pass: bool,
+) -> None:
+    if not single_pass:
+        validate_artifact(source_dir, entry)
+    stage_columns = _stage_columns(entry)
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {stage_table}"))
+        connection.execute(
+            text(f"CREATE UNLOGGED TABLE {stage_table} ({_stage_definition(stage_columns)})")
+        )
+        _fill_stage(
+            connection, source_dir, entry, stage_table, stage_columns, single_pass=single_pass
+        )
+
+
+def _drop_stage_tables(engine: Engine, stage_tables: Iterable[str]) -> None:
+    with engine.begin() as connection:
+        for stage_table in stage_tables:
+            connection.execute(text(f"DROP TABLE IF EXISTS {stage_table}"))
+
+
 def _ensure_metadata_tables(connection: Connection) -> None:
     connection.execute(
         text(
@@ -486,14 +864,33 @@ def _ensure_metadata_tables(connection: Connection) -> None:
             """
         )
     )
+    connection.execute(
+        text(
+            "ALTER TABLE public.one_c_import_contract "
+            "ADD COLUMN IF NOT EXISTS skipped boolean NOT NULL DEFAULT false, "
+            "ADD COLUMN IF NOT EXISTS rows_inserted bigint, "
+            "ADD COLUMN IF NOT EXISTS rows_deleted bigint, "
+            "ADD COLUMN IF NOT EXISTS rows_unchanged bigint, "
+            "ADD COLUMN IF NOT EXISTS target_fingerprint text"
+        )
+    )
 
 
 def _apply_entry(
     connection: Connection,
     source_dir: Path,
     entry: ManifestEntry,
-) -> None:
+    *,
+    single_pass: bool = False,
+    stage_table: str | None = None,
+    delta: bool = False,
+    partition: bool = False,
+    fingerprint: bool = False,
+) -> tuple[PublicationCounts, str | None]:
+    """Publish one entry; return its counts and, with ``fingerprint``, the scope fingerprint."""
     _ensure_target_table(connection, entry)
+    if partition and entry.spec.table_name in PARTITIONED_PERIOD_COLUMNS:
+        partition_table(connection, entry.spec.table_name)
     if (
         entry.spec.name == "service_order_executors"
         and entry.publication is PublicationKind.PERIOD
@@ -512,22 +909,61 @@ def _apply_entry(
         )
         if not bootstrap_exists:
             raise ReceiverError("Executor period publication requires a version 2 snapshot")
-    stage_name = f"one_c_stage_{entry.spec.table_name}"
-    quoted_stage = _quote_identifier(stage_name)
-    connection.execute(text(f"DROP TABLE IF EXISTS pg_temp.{quoted_stage}"))
-    stage_columns = tuple(entry.spec.target_column(header) for header in entry.contract.headers)
-    stage_definition = ", ".join(f"{_quote_identifier(column)} text" for column in stage_columns)
-    connection.execute(
-        text(f"CREATE TEMP TABLE {quoted_stage} ({stage_definition}) ON COMMIT DROP")
-    )
-    _load_stage(connection, source_dir, entry, stage_name, stage_columns)
+    stage_columns = _stage_columns(entry)
+    if stage_table is None:
+        stage_table = _quote_identifier(f"one_c_stage_{entry.spec.table_name}")
+        connection.execute(text(f"DROP TABLE IF EXISTS pg_temp.{stage_table}"))
+        connection.execute(
+            text(
+                f"CREATE TEMP TABLE {stage_table} ({_stage_definition(stage_columns)}) "
+                "ON COMMIT DROP"
+            )
+        )
+        _fill_stage(
+            connection, source_dir, entry, stage_table, stage_columns, single_pass=single_pass
+        )
+    _quality_gate_stage(connection, entry, stage_table)
+    if delta:
+        counts = _publish_snapshot_delta(connection, entry, stage_table, stage_columns)
+    else:
+        deleted = _delete_scope(connection, entry)
+        _insert_stage(connection, entry, stage_table, stage_columns)
+        if entry.publication is PublicationKind.SNAPSHOT and _partitioned_target(
+            connection, entry
+        ):
+            rebalance_default_partition(connection, entry.spec.table_name)
+        counts = PublicationCounts(inserted=entry.row_count, deleted=deleted, unchanged=0)
+    return counts, _quality_gate_target_scope(connection, entry, fingerprint=fingerprint)
+
+
+def _stage_columns(entry: ManifestEntry) -> tuple[str, ...]:
+    return tuple(entry.spec.target_column(header) for header in entry.contract.headers)
+
+
+def _stage_definition(stage_columns: tuple[str, ...]) -> str:
+    return ", ".join(f"{_quote_identifier(column)} text" for column in stage_columns)
+
+
+def _fill_stage(
+    connection: Connection,
+    source_dir: Path,
+    entry: ManifestEntry,
+    stage_table: str,
+    stage_columns: tuple[str, ...],
+    *,
+    single_pass: bool,
+) -> None:
     path = resolve_artifact(source_dir, entry)
-    if path.stat().st_size != entry.size_bytes or sha256_file(path) != entry.sha256:
+    if single_pass:
+        _stream_stage(connection, path, entry, stage_table, stage_columns)
+    else:
+        _load_stage(
+            connection, _accepted_blocks(source_dir, entry), entry, stage_table, stage_columns
+        )
+    if path.stat().st_size != entry.size_bytes or (
+        not single_pass and sha256_file(path) != entry.sha256
+    ):
         raise ReceiverError(f"Artifact changed during staging for {entry.spec.name}")
-    _quality_gate_stage(connection, entry, stage_name)
-    _delete_scope(connection, entry)
-    _insert_stage(connection, entry, stage_name, stage_columns)
-    _quality_gate_target_scope(connection, entry)
 
 
 def _ensure_target_table(connection: Connection, entry: ManifestEntry) -> None:
@@ -582,46 +1018,141 @@ def _ensure_target_table(connection: Connection, entry: ManifestEntry) -> None:
         raise ReceiverError(f"Legacy target type mismatch for {spec.name}")
 
 
+def _stream_stage(
+    connection: Connection,
+    path: Path,
+    entry: ManifestEntry,
+    stage_table: str,
+    stage_columns: tuple[str, ...],
+) -> None:
+    _require_artifact_size(path, entry)
+    metadata = _artifact_metadata(path, entry)
+    with path.open("rb", buffering=0) as raw:
+        fingerprint = _FingerprintReader(raw)
+        source = io.TextIOWrapper(
+            io.BufferedReader(fingerprint, buffer_size=1024 * 1024),
+            encoding=metadata.encoding,
+            newline="",
+        )
+        blocks = iter_source_blocks(source, metadata, entry.contract)
+        _load_stage(
+            connection, _validated_blocks(blocks, entry), entry, stage_table, stage_columns
+        )
+        fingerprint.drain()
+    if fingerprint.size_bytes != entry.size_bytes or fingerprint.hexdigest() != entry.sha256:
+        raise ReceiverError(f"Artifact fingerprint mismatch for {entry.spec.name}")
+
+
 def _load_stage(
     connection: Connection,
-    source_dir: Path,
+    blocks: Iterator[RowBlock],
     entry: ManifestEntry,
-    stage_name: str,
+    stage_table: str,
     stage_columns: tuple[str, ...],
+) -> None:
+    rows = _stage_rows(blocks, entry)
+    if connection.dialect.name == "postgresql" and connection.dialect.driver in _COPY_DRIVERS:
+        _copy_stage(connection, stage_table, stage_columns, rows)
+    else:
+        _insert_stage_rows(connection, stage_table, stage_columns, rows)
+
+
+def _stage_rows(
+    blocks: Iterator[RowBlock],
+    entry: ManifestEntry,
+) -> Iterator[tuple[str | None, ...]]:
+    typed_headers = tuple(
+        (header, entry.spec.sql_type(entry.spec.target_column(header)))
+        for header in entry.contract.headers
+    )
+    for block in blocks:
+        columns = [
+            [_stage_value(value, sql_type) for value in block.columns[header]]
+            for header, sql_type in typed_headers
+        ]
+        yield from zip(*columns, strict=True)
+
+
+def _insert_stage_rows(
+    connection: Connection,
+    stage_table: str,
+    stage_columns: tuple[str, ...],
+    rows: Iterator[tuple[str | None, ...]],
 ) -> None:
     quoted_columns = ", ".join(_quote_identifier(column) for column in stage_columns)
     parameters = ", ".join(f":{column}" for column in stage_columns)
     statement = text(
-        f"INSERT INTO {_quote_identifier(stage_name)} ({quoted_columns}) VALUES ({parameters})"
+        f"INSERT INTO {stage_table} ({quoted_columns}) VALUES ({parameters})"
     )
-    chunk: list[dict[str, str | None]] = []
-    for payload in _accepted_payloads(source_dir, entry):
-        chunk.append(
-            {
-                entry.spec.target_column(header): _stage_value(
-                    payload[header],
-                    entry.spec.sql_type(entry.spec.target_column(header)),
-                )
-                for header in entry.contract.headers
-            }
-        )
-        if len(chunk) >= _WRITE_CHUNK_SIZE:
-            connection.execute(statement, chunk)
-            chunk.clear()
-    if chunk:
+    while chunk := [
+        dict(zip(stage_columns, row, strict=True)) for row in islice(rows, _WRITE_CHUNK_SIZE)
+    ]:
         connection.execute(statement, chunk)
 
 
-def _accepted_payloads(
+def _copy_stage(
+    connection: Connection,
+    stage_table: str,
+    stage_columns: tuple[str, ...],
+    rows: Iterator[tuple[str | None, ...]],
+) -> None:
+    quoted_columns = ", ".join(_quote_identifier(column) for column in stage_columns)
+    statement = (
+        f"COPY {stage_table} ({quoted_columns}) "
+        "FROM STDIN WITH (FORMAT csv, NULL '')"
+    )
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(statement, _CopySource(rows), size=_COPY_READ_SIZE)
+    finally:
+        cursor.close()
+
+
+class _CopySource:
+    """Read-only text stream that renders staged rows as COPY CSV on demand.
+
+    ``_stage_value`` maps blank source values to ``None``, so an unquoted empty
+    field is always SQL NULL and never an empty string.
+    """
+
+    def __init__(self, rows: Iterator[tuple[str | None, ...]]) -> None:
+        self._rows = rows
+        self._rendered = io.StringIO()
+        self._writer = csv.writer(self._rendered, lineterminator="\n")
+        self._pending = ""
+        self._offset = 0
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._pending) - self._offset < size:
+            if not self._render_chunk():
+                break
+        end = len(self._pending) if size < 0 else min(len(self._pending), self._offset + size)
+        chunk = self._pending[self._offset : end]
+        self._offset = end
+        return chunk
+
+    def _render_chunk(self) -> bool:
+        self._writer.writerows(islice(self._rows, _WRITE_CHUNK_SIZE))
+        rendered = self._rendered.getvalue()
+        if not rendered:
+            return False
+        self._rendered.seek(0)
+        self._rendered.truncate()
+        self._pending = self._pending[self._offset :] + rendered
+        self._offset = 0
+        return True
+
+
+def _accepted_blocks(
     source_dir: Path,
     entry: ManifestEntry,
-) -> Iterator[dict[str, str]]:
+) -> Iterator[RowBlock]:
     path = resolve_artifact(source_dir, entry)
     metadata = read_metadata(path)
-    for row in iter_rows(path, metadata, entry.contract):
-        if not isinstance(row, AcceptedRow):
+    for block in iter_row_blocks(path, metadata, entry.contract):
+        if block.rejected:
             raise ReceiverError(f"Artifact changed after validation for {entry.spec.name}")
-        yield row.payload
+        yield block
 
 
 def _stage_value(raw_value: str, sql_type: str) -> str | None:
@@ -651,11 +1182,11 @@ def _stage_value(raw_value: str, sql_type: str) -> str | None:
 def _quality_gate_stage(
     connection: Connection,
     entry: ManifestEntry,
-    stage_name: str,
+    stage_table: str,
 ) -> None:
     stage_count = int(
         connection.execute(
-            text(f"SELECT count(*) FROM {_quote_identifier(stage_name)}")
+            text(f"SELECT count(*) FROM {stage_table}")
         ).scalar_one()
     )
     if stage_count != entry.row_count:
@@ -665,7 +1196,7 @@ def _quality_gate_stage(
             connection.execute(
                 text(
                     f"SELECT count(*) - count(DISTINCT kod) + count(*) FILTER "
-                    f"(WHERE kod IS NULL) FROM {_quote_identifier(stage_name)}"
+                    f"(WHERE kod IS NULL) FROM {stage_table}"
                 )
             ).scalar_one()
         )
@@ -677,7 +1208,7 @@ def _quality_gate_stage(
                 text(
                     f"SELECT count(*) - count(DISTINCT (kod, model)) + count(*) FILTER "
                     f"(WHERE kod IS NULL OR model IS NULL) "
-                    f"FROM {_quote_identifier(stage_name)}"
+                    f"FROM {stage_table}"
                 )
             ).scalar_one()
         )
@@ -685,13 +1216,16 @@ def _quality_gate_stage(
             raise ReceiverError("Applicability staging contains an invalid key")
 
 
-def _delete_scope(connection: Connection, entry: ManifestEntry) -> None:
+def _delete_scope(connection: Connection, entry: ManifestEntry) -> int:
     table = f"public.{_quote_identifier(entry.spec.table_name)}"
     if entry.publication is PublicationKind.SNAPSHOT:
-        connection.execute(text(f"DELETE FROM {table}"))
-        return
+        return connection.execute(text(f"DELETE FROM {table}")).rowcount
     assert entry.scope is not None
     assert entry.spec.period_header is not None
+    if _partitioned_target(connection, entry):
+        return clear_period(
+            connection, entry.spec.table_name, entry.scope.start, entry.scope.end_exclusive
+        )
     column = _quote_identifier(entry.spec.target_column(entry.spec.period_header))
     if entry.spec.period_storage == "timestamp":
         expression = column
@@ -701,18 +1235,18 @@ def _delete_scope(connection: Connection, entry: ManifestEntry) -> None:
         expression = f"to_timestamp(NULLIF({column}, ''), 'DD.MM.YYYY HH24:MI:SS')"
     else:
         raise ReceiverError(f"Period storage is unsupported for {entry.spec.name}")
-    connection.execute(
+    return connection.execute(
         text(
             f"DELETE FROM {table} WHERE {expression} >= :scope_start AND {expression} < :scope_end"
         ),
         {"scope_start": entry.scope.start, "scope_end": entry.scope.end_exclusive},
-    )
+    ).rowcount
 
 
 def _insert_stage(
     connection: Connection,
     entry: ManifestEntry,
-    stage_name: str,
+    stage_table: str,
     stage_columns: tuple[str, ...],
 ) -> None:
     columns = ", ".join(_quote_identifier(column) for column in stage_columns)
@@ -722,8 +1256,74 @@ def _insert_stage(
     connection.execute(
         text(
             f"INSERT INTO public.{_quote_identifier(entry.spec.table_name)} ({columns}) "
-            f"SELECT {expressions} FROM {_quote_identifier(stage_name)}"
+            f"SELECT {expressions} FROM {stage_table}"
+        )
+    )
+
+
+def _publish_snapshot_delta(
+    connection: Connection,
+    entry: ManifestEntry,
+    stage_table: str,
+    stage_columns: tuple[str, ...],
+) -> PublicationCounts:
+    """Replace a snapshot by the multiset difference of row digests instead of a full rewrite.
+
+    A row's digest is taken over the typed values of every target column, on
+    the published side and for the cast staged rows alike, so nothing is stored
+    on the published table and rows written by other loaders are matched by
+    content too.
+    """
+    table = f"public.{_quote_identifier(entry.spec.table_name)}"
+    target_columns = entry.spec.all_target_columns
+    published_digest = "md5(ROW({})::text)".format(
+        ", ".join(f"target.{_quote_identifier(column)}" for column in target_columns)
+    )
+    staged_digest = "md5(ROW({})::text)".format(
+        ", ".join(
+            _cast_stage_column(column, entry.spec.sql_type(column))
+            if column in stage_columns
+            else f"NULL::{entry.spec.sql_type(column)}"
+            for column in target_columns
+        )
+    )
+    deleted = connection.execute(
+        text(
+            f"DELETE FROM {table} AS published USING ("
+            f"SELECT ranked.ctid FROM ("
+            f"SELECT target.ctid, {published_digest} AS row_digest, "
+            f"row_number() OVER (PARTITION BY {published_digest}) AS ordinal "
+            f"FROM {table} AS target"
+            f") AS ranked LEFT JOIN ("
+            f"SELECT {staged_digest} AS row_digest, count(*) AS copies "
+            f"FROM {stage_table} GROUP BY 1"
+            f") AS staged ON staged.row_digest = ranked.row_digest "
+            f"WHERE ranked.ordinal > COALESCE(staged.copies, 0)"
+            f") AS vanished WHERE published.ctid = vanished.ctid"
+        )
+    ).rowcount
+    columns = ", ".join(_quote_identifier(column) for column in stage_columns)
+    expressions = ", ".join(
+        _cast_stage_column(column, entry.spec.sql_type(column)) for column in stage_columns
+    )
+    inserted = connection.execute(
+        text(
+            f"INSERT INTO {table} ({columns}) "
+            f"SELECT {expressions} FROM ("
+            f"SELECT *, {staged_digest} AS one_c_row_digest, "
+            f"row_number() OVER (PARTITION BY {staged_digest}) AS one_c_ordinal "
+            f"FROM {stage_table}"
+            f") AS ranked LEFT JOIN ("
+            f"SELECT {published_digest} AS row_digest, count(*) AS copies "
+            f"FROM {table} AS target GROUP BY 1"
+            f") AS published ON published.row_digest = ranked.one_c_row_digest "
+            f"WHERE ranked.one_c_ordinal > COALESCE(published.copies, 0)"
         )
+    ).rowcount
+    return PublicationCounts(
+        inserted=inserted,
+        deleted=deleted,
+        unchanged=entry.row_count - inserted,
     )
 
 
@@ -736,31 +1336,74 @@ def _cast_stage_column(column: str, sql_type: str) -> str:
     return f"{quoted}::{sql_type}"
 
 
-def _quality_gate_target_scope(connection: Connection, entry: ManifestEntry) -> None:
+def _quality_gate_target_scope(
+    connection: Connection, entry: ManifestEntry, *, fingerprint: bool = False
+) -> str | None:
+    """Check the published row count; with ``fingerprint`` the same scan returns the fingerprint.
+
+    Only runs that may skip unchanged contracts later need the fingerprint, so
+    the others keep the cheaper count.
+    """
+    if not fingerprint:
+        rows, result = _target_scope_count(connection, entry), None
+    else:
+        result = _target_scope_fingerprint(connection, entry)
+        rows = int(result.partition(":")[0])
+    if rows != entry.row_count:
+        raise ReceiverError(f"Published row count mismatch for {entry.spec.name}")
+    return result
+
+
+def _target_scope_count(connection: Connection, entry: ManifestEntry) -> int:
     table = f"public.{_quote_identifier(entry.spec.table_name)}"
+    condition, parameters = _target_scope_condition(connection, entry)
+    return int(
+        connection.execute(
+            text(f"SELECT count(*) FROM {table} WHERE {condition}"), parameters
+        ).scalar_one()
+    )
+
+
+def _target_scope_fingerprint(connection: Connection, entry: ManifestEntry) -> str:
+    """Order-independent fingerprint of the published scope: row count and summed row hashes."""
+    table = f"public.{_quote_identifier(entry.spec.table_name)}"
+    condition, parameters = _target_scope_condition(connection, entry)
+    rows, total = connection.execute(
+        text(
+            "SELECT count(*), COALESCE(sum(hashtextextended(target::text, 0)), 0)::text "
+            f"FROM {table} AS target WHERE {condition}"
+        ),
+        parameters,
+    ).one()
+    return f"{rows}:{total}"
+
+
+def _target_scope_condition(
+    connection: Connection, entry: ManifestEntry
+) -> tuple[str, dict[str, object]]:
     if entry.publication is PublicationKind.SNAPSHOT:
-        target_count = int(connection.execute(text(f"SELECT count(*) FROM {table}")).scalar_one())
+        return "TRUE", {}
+    assert entry.scope is not None
+    assert entry.spec.period_header is not None
+    column = _quote_identifier(entry.spec.target_column(entry.spec.period_header))
+    if _partitioned_target(connection, entry):
+        # The partition key keeps the count pruned to the scope's months.
+        expression = period_key(entry.spec.table_name)
+    elif entry.spec.period_storage == "timestamp":
+        expression = column
+    elif entry.spec.period_storage == "text_date":
+        expression = f"to_date(NULLIF({column}, ''), 'DD.MM.YYYY')"
     else:
-        assert entry.scope is not None
-        assert entry.spec.period_header is not None
-        column = _quote_identifier(entry.spec.target_column(entry.spec.period_header))
-        if entry.spec.period_storage == "timestamp":
-            expression = column
-        elif entry.spec.period_storage == "text_date":
-            expression = f"to_date(NULLIF({column}, ''), 'DD.MM.YYYY')"
-        else:
-            expression = f"to_timestamp(NULLIF({column}, ''), 'DD.MM.YYYY HH24:MI:SS')"
-        target_count = int(
-            connection.execute(
-                text(
-                    f"SELECT count(*) FROM {table} WHERE {expression} >= :scope_start "
-                    f"AND {expression} < :scope_end"
-                ),
-                {"scope_start": entry.scope.start, "scope_end": entry.scope.end_exclusive},
-            ).scalar_one()
-        )
-    if target_count != entry.row_count:
-        raise ReceiverError(f"Published row count mismatch for {entry.spec.name}")
+        expression = f"to_timestamp(NULLIF({column}, ''), 'DD.MM.YYYY HH24:MI:SS')"
+    return (
+        f"{expression} >= :scope_start AND {expression} < :scope_end",
+        {"scope_start": entry.scope.start, "scope_end": entry.scope.end_exclusive},
+    )
+
+
+def _partitioned_target(connection: Connection, entry: ManifestEntry) -> bool:
+    table_name = entry.spec.table_name
+    return table_name in PARTITIONED_PERIOD_COLUMNS and is_partitioned(connection, table_name)
 
 
 def _quote_identifier(value: str) -> str:
@@ -774,12 +1417,28 @@ def run_from_paths(
     database_url: str,
     source_dir: Path,
     manifest_path: Path,
+    single_pass: bool = False,
+    workers: int = 1,
+    delta_snapshots: bool = False,
+    partitioned_periods: bool = False,
 ) -> ApplyResult:
     if not database_url:
         raise ReceiverError("Database URL must be supplied explicitly")
     manifest = load_manifest(manifest_path)
-    engine = create_engine(database_url, future=True)
+    engine = create_engine(
+        database_url,
+        future=True,
+        pool_size=max(5, workers),
+    )
     try:
-        return apply_manifest(engine, source_dir, manifest)
+        return apply_manifest(
+            engine,
+            source_dir,
+            manifest,
+            single_pass=single_pass,
+            workers=workers,
+            delta_snapshots=delta_snapshots,
+            partitioned_periods=partitioned_periods,
+        )
     finally:
         engine.dispose()
@@ -0,0 +1,347 @@
+"""
+Обновление аналитических витрин по зависимостям.
+
+Для каждой витрины известны базовые таблицы, из которых она строится, и
+витрины, которые должны быть обновлены раньше.  Витрина устарела, если у
+какой-либо ее зависимости изменилась отметка с последнего успешного
+обновления: последний прогон приемника 1С, изменивший таблицу, отметка
+``mark_tables_changed`` из public.table_change_marker (ее ставят
+update_analitics_gl и скрипты витрин) и oid таблицы.  Таблицы, которые пишут
+загрузчики без отметок (прайсы, API, старые выгрузки Access), сравниваются по
+счетчикам изменённых строк pg_stat_user_tables.  Витрины, которые
+считаются от даты запуска (снимок цен дня, окна от текущего месяца), устаревают
+и с наступлением нового дня или месяца.  Устаревшие витрины пересчитываются
+своими скриптами в отдельных процессах, независимые — параллельно.
+Время, число строк и отметки зависимостей каждого пересчета записываются в
+``public.pivot_refresh``.
+
+    python -m reglament_task.refresh_pivots [витрина ...] [--force] [--workers N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections.abc import Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import text
+
+from ugkorea.db.database import get_db_engine
+from ugkorea.db.tablecache import MARKER_TABLE
+from ugkorea.reglament_task.one_c_receiver_runtime.receiver import TABLE_BY_CONTRACT
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+LOG_TABLE = "pivot_refresh"
+DEFAULT_WORKERS = 3
+
+
+@dataclass(frozen=True, slots=True)
+class PivotSpec:
+    """Витрина, скрипт, который ее строит, и ее зависимости."""
+
+    name: str
+    module: str
+    arguments: tuple[str, ...] = ()
+    # Базовые таблицы; 'schema.*' — все таблицы схемы
+    tables: tuple[str, ...] = ()
+    # Витрины, которые обновляются раньше этой
+    upstream: tuple[str, ...] = ()
+    # Результат зависит от даты запуска: 'day' — пересчет каждый день, 'month' — каждый месяц
+    calendar: str | None = None
+
+    @property
+    def dependencies(self) -> tuple[str, ...]:
+        return tuple(_qualified(table) for table in self.tables + self.upstream)
+
+
+@dataclass(frozen=True, slots=True)
+class RefreshResult:
+    """Итог обработки одной витрины."""
+
+    pivot: str
+    # succeeded, failed, fresh (не устарела) или blocked (не обновилась зависимость)
+    status: str
+    seconds: float = 0.0
+    rows: int | None = None
+
+    def describe(self) -> str:
+        if self.status == "succeeded":
+            return f"обновлена за {self.seconds:.1f} с, {self.rows} строк"
+        if self.status == "failed":
+            return f"ошибка через {self.seconds:.1f} с"
+        if self.status == "fresh":
+            return "актуальна"
+        return "пропущена: не обновилась зависимость"
+
+
+PIVOTS = (
+    PivotSpec("salespivot", "accessold.statisticforacc", ("salespivot",), tables=("prodazhi",)),
+    PivotSpec("suppliespivot", "accessold.statisticforacc", ("suppliespivot",), tables=("postuplenija",)),
+    # Сетка концов месяцев (priceendmonth) и последний закрытый месяц (stockendmonth)
+    # доходят до текущего месяца
+    PivotSpec("stockendmonth", "accessold.stockend", tables=("registrostatkitovarov",), calendar="month"),
+    PivotSpec(
+        "priceendmonth",
+        "accessold.priceendmonth",
+        tables=("nomenklatura", "postuplenija", "tsenynakonetsmesjatsa", "priceold"),
+        calendar="month",
+    ),
+    # full_statistic читает и deliveryminprice, но та сама строится из full_statistic:
+    # обратная связь не делает full_statistic устаревшей, иначе обе пересчитывались бы всегда.
+    # Текущий месяц и окно ABC-анализа отсчитываются от даты запуска.
+    PivotSpec(
+        "full_statistic",
+        "statistic.calculation",
+        tables=(
+            "nomenklatura", "nomenklaturaold", "stockold", "priceold", "prodazhi",
+            "postuplenija", "groupanalogiold", "typedetailgen",
+        ),
+        upstream=("priceendmonth", "stockendmonth", "suppliespivot"),
+        calendar="day",
+    ),
+    # Каждый день добавляет снимок в analitic.deliverypriceintime и отсекает предложения старше 7 дней
+    PivotSpec(
+        "deliveryminprice",
+        "reglament_task.deliveryminprice",
+        tables=("prices.*", "api.bergapi"),
+        upstream=("full_statistic",),
+        calendar="day",
+    ),
+)
+PIVOTS_BY_NAME = {spec.name: spec for spec in PIVOTS}
+
+
+def import_runs(connection: object) -> dict[str, str]:
+    """Таблица -> последний прогон приемника 1С, который ее изменил (контракт не пропущен)."""
+    if connection.execute(text("SELECT to_regclass('public.one_c_import_contract') IS NULL")).scalar():
+        return {}
+    rows = connection.execute(
+        text(
+            "SELECT DISTINCT ON (contract.contract_name) contract.contract_name, run.run_id::text "
+            "FROM public.one_c_import_contract AS contract "
+            "JOIN public.one_c_import_run AS run ON run.run_id = contract.run_id "
+            "WHERE NOT contract.skipped "
+            "ORDER BY contract.contract_name, run.applied_at DESC, run.run_id DESC"
+        )
+    ).all()
+    return {
+        _qualified(TABLE_BY_CONTRACT[contract]): run_id
+        for contract, run_id in rows
+        if contract in TABLE_BY_CONTRACT
+    }
+
+
+def change_markers(connection: object) -> dict[str, str]:
+    """Таблица -> время последней отметки ``mark_tables_changed``."""
+    if connection.execute(text(f"SELECT to_regclass('public.{MARKER_TABLE}') IS NULL")).scalar():
+        return {}
+    rows = connection.execute(text(f"SELECT table_name, changed_at::text FROM public.{MARKER_TABLE}")).all()
+    return {_qualified(table): changed_at for table, changed_at in rows}
+
+
+def dependency_tokens(connection: object, dependencies: Sequence[str]) -> dict[str, str]:
+    """
+    Отметка каждой зависимости, для 'schema.*' — каждой таблицы схемы.
+
+    Таблица с прогоном 1С или отметкой изменения получает oid:прогон:отметка,
+    остальные — oid:изменённые строки таблицы и ее секций по pg_stat, которые
+    сервер публикует с задержкой.  Отсутствующая таблица получает отметку '-'.
+    """
+    runs = import_runs(connection)
+    markers = change_markers(connection)
+    tokens = {}
+    for dependency in dependencies:
+        schema, _, table = dependency.partition(".")
+        if table == "*":
+            relations = connection.execute(
+                text(
+                    "SELECT schemaname || '.' || relname FROM pg_stat_user_tables "
+                    "WHERE schemaname = :schema ORDER BY 1"
+                ),
+                {"schema": schema},
+            ).scalars().all()
+        else:
+            relations = [dependency]
+        parts = [_relation_token(connection, relation, runs, markers) for relation in relations]
+        tokens[dependency] = ",".join(part for part in parts if part != "-") or "-"
+    return tokens
+
+
+def pivot_tokens(connection: object, spec: PivotSpec, today: date) -> dict[str, str]:
+    """Отметки зависимостей витрины и, для витрин с calendar, день или месяц запуска."""
+    tokens = dependency_tokens(connection, spec.dependencies)
+    if spec.calendar == "day":
+        tokens["calendar"] = today.isoformat()
+    elif spec.calendar == "month":
+        tokens["calendar"] = f"{today:%Y-%m}"
+    return tokens
+
+
+def is_stale(connection: object, spec: PivotSpec, tokens: dict[str, str]) -> bool:
+    """Витрины нет или отметки зависимостей отличаются от записанных при последнем успешном пересчете."""
+    if connection.execute(text("SELECT to_regclass(:name) IS NULL"), {"name": _qualified(spec.name)}).scalar():
+        return True
+    previous = connection.execute(
+        text(
+            f"SELECT dependencies FROM public.{LOG_TABLE} "
+            "WHERE pivot = :pivot AND status = 'succeeded' "
+            "ORDER BY started_at DESC LIMIT 1"
+        ),
+        {"pivot": spec.name},
+    ).scalar()
+    return previous != tokens
+
+
+def run_pivot(spec: PivotSpec) -> tuple[int, float, str]:
+    """Запускает скрипт витрины отдельным процессом, как .bat: код возврата, секунды, вывод."""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-m", spec.module, *spec.arguments],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "PYTHONIOENCODING": "utf-8"},
+        capture_output=True,
+        check=False,
+    )
+    output = (completed.stdout + completed.stderr).decode("utf-8", errors="replace")
+    return completed.returncode, time.perf_counter() - started, output
+
+
+def refresh(
+    engine: object,
+    names: Sequence[str] | None = None,
+    *,
+    force: bool = False,
+    workers: int = DEFAULT_WORKERS,
+) -> list[RefreshResult]:
+    """
+    Пересчитывает устаревшие витрины из names (по умолчанию все) в порядке зависимостей.
+
+    Устарелость проверяется непосредственно перед запуском, когда витрины,
+    от которых зависит эта, уже обработаны.  force пересчитывает без проверки.
+    """
+    specs = {name: PIVOTS_BY_NAME[name] for name in (names or PIVOTS_BY_NAME)}
+    _ensure_log_table(engine)
+    results: dict[str, RefreshResult] = {}
+    running: dict[Future, tuple[PivotSpec, dict[str, str]]] = {}
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        while len(results) < len(specs):
+            launching = {spec.name for spec, _ in running.values()}
+            for spec in specs.values():
+                upstream = [name for name in spec.upstream if name in specs]
+                if spec.name in results or spec.name in launching:
+                    continue
+                if any(name not in results for name in upstream):
+                    continue
+                if any(results[name].status in {"failed", "blocked"} for name in upstream):
+                    results[spec.name] = RefreshResult(spec.name, "blocked")
+                    print(f"[Витрина] {spec.name}: {results[spec.name].describe()}.", flush=True)
+                    continue
+                with engine.connect() as connection:
+                    tokens = pivot_tokens(connection, spec, date.today())
+                    stale = force or is_stale(connection, spec, tokens)
+                if not stale:
+                    results[spec.name] = RefreshResult(spec.name, "fresh")
+                    print(f"[Витрина] {spec.name}: {results[spec.name].describe()}.", flush=True)
+                    continue
+                print(f"[Витрина] {spec.name}: пересчет ({spec.module}).", flush=True)
+                running[pool.submit(run_pivot, spec)] = (spec, tokens)
+                launching.add(spec.name)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                spec, tokens = running.pop(future)
+                results[spec.name] = _record(engine, spec, tokens, *future.result())
+    return [results[name] for name in specs]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pivots", nargs="*", metavar="pivot", help=", ".join(PIVOTS_BY_NAME))
+    parser.add_argument("--force", action="store_true", help="пересчитать без проверки устарелости")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    arguments = parser.parse_args(argv)
+    unknown = set(arguments.pivots) - set(PIVOTS_BY_NAME)
+    if unknown:
+        parser.error(f"unknown pivots: {', '.join(sorted(unknown))}")
+    results = refresh(get_db_engine(), arguments.pivots, force=arguments.force, workers=arguments.workers)
+    return 1 if any(result.status in {"failed", "blocked"} for result in results) else 0
+
+
+def _record(
+    engine: object, spec: PivotSpec, tokens: dict[str, str], returncode: int, seconds: float, output: str
+) -> RefreshResult:
+    status = "succeeded" if returncode == 0 else "failed"
+    with engine.begin() as connection:
+        rows = None
+        if status == "succeeded":
+            rows = connection.execute(text(f"SELECT count(*) FROM {_qualified(spec.name)}")).scalar()
+        connection.execute(
+            text(
+                f"INSERT INTO public.{LOG_TABLE} "
+                "(started_at, pivot, module, status, seconds, row_count, dependencies) "
+                "VALUES (now() - make_interval(secs => :seconds), :pivot, :module, :status, "
+                ":seconds, :row_count, CAST(:dependencies AS jsonb))"
+            ),
+            {
+                "pivot": spec.name,
+                "module": spec.module,
+                "status": status,
+                "seconds": seconds,
+                "row_count": rows,
+                "dependencies": json.dumps(tokens, sort_keys=True),
+            },
+        )
+    result = RefreshResult(spec.name, status, seconds, rows)
+    print(f"[Витрина] {spec.name}: {result.describe()}.", flush=True)
+    print(output, end="" if output.endswith("\n") or not output else "\n", flush=True)
+    return result
+
+
+def _ensure_log_table(engine: object) -> None:
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS public.{LOG_TABLE} ("
+                "started_at timestamptz NOT NULL, "
+                "pivot text NOT NULL, module text NOT NULL, status text NOT NULL, "
+                "seconds double precision NOT NULL, row_count bigint, dependencies jsonb NOT NULL)"
+            )
+        )
+
+
+def _relation_token(
+    connection: object, relation: str, runs: dict[str, str], markers: dict[str, str]
+) -> str:
+    oid = connection.execute(text("SELECT to_regclass(:name)::oid::text"), {"name": relation}).scalar()
+    if oid is None:
+        return "-"
+    if relation in runs or relation in markers:
+        return f"{oid}:{runs.get(relation, '-')}:{markers.get(relation, '-')}"
+    # Загрузчик без отметок: изменённые строки таблицы и ее секций
+    changes = connection.execute(
+        text(
+            "SELECT sum(stat.n_tup_ins + stat.n_tup_upd + stat.n_tup_del)::text "
+            "FROM pg_stat_user_tables AS stat "
+            "WHERE stat.relid = to_regclass(:name) "
+            "OR stat.relid IN (SELECT relid FROM pg_partition_tree(to_regclass(:name)))"
+        ),
+        {"name": relation},
+    ).scalar()
+    return f"{oid}:stat:{changes or '-'}"
+
+
+def _qualified(table: str) -> str:
+    return table if "." in table else f"public.{table}"
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
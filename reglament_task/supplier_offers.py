@@ -0,0 +1,236 @@
+"""
+Нормализованный индекс предложений поставщиков.
+
+Для каждой таблицы схемы ``prices`` в ``public.supplier_offers`` хранятся
+строки ее последней даты с очищенными артикулом и производителем (правила
+``replacement_dict`` и ``clean_key``), количеством, ценой и поставщиком.
+Индекс обновляется при загрузке прайсов (``from_folder_to_df.prices_to_sql``),
+а ``sync_offer_index`` перед расчетом deliveryminprice переиндексирует
+таблицы, последняя дата которых разошлась с записанной в
+``public.supplier_offer_sources``.  Минимальная цена по kod выбирается одним
+соединением по индексу (artikul_clean, proizvoditel_clean).
+
+Таблицы индекса лежат вне схемы ``prices``: все таблицы этой схемы считаются прайсами.
+
+    python -m reglament_task.supplier_offers [таблица ...]   # переиндексация
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sys
+from collections.abc import Sequence
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+from ugkorea.db.bulkwrite import write_frame
+from ugkorea.db.database import get_db_engine
+from ugkorea.reglament_task.dicts import replacement_dict
+
+PRICES_SCHEMA = "prices"
+OFFER_TABLE = "supplier_offers"
+SOURCE_TABLE = "supplier_offer_sources"
+# Колонки прайса, без которых таблица не участвует в подборе
+REQUIRED_COLUMNS = ("артикул", "производитель", "количество", "цена", "поставщик")
+# Отметка правил очистки: при их изменении индекс строится заново
+RULES = hashlib.sha1(repr(sorted(replacement_dict.items())).encode("utf-8")).hexdigest()
+
+
+def clean_key(values: pd.Series) -> pd.Series:
+    """Ключ сопоставления: str(значение) без пробелов, точек и дефисов в нижнем регистре."""
+    return values.map(str).str.replace(r"[\s.-]", "", regex=True).str.lower()
+
+
+def ensure_offer_index(connection: object) -> None:
+    """Создает таблицы индекса, если их нет."""
+    if not connection.execute(text(f"SELECT to_regclass('public.{SOURCE_TABLE}') IS NULL")).scalar():
+        return
+    # Прайсы и расчет могут начать одновременно: таблицы создает только одна транзакция
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": OFFER_TABLE})
+    connection.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS public.{OFFER_TABLE} ("
+            "supplier_table text NOT NULL, artikul_clean text NOT NULL, "
+            "proizvoditel_clean text NOT NULL, kolichestvo double precision NOT NULL, "
+            "tsena double precision NOT NULL, postavshchik text)"
+        )
+    )
+    connection.execute(
+        text(
+            f"CREATE INDEX IF NOT EXISTS {OFFER_TABLE}_key_idx "
+            f"ON public.{OFFER_TABLE} (artikul_clean, proizvoditel_clean)"
+        )
+    )
+    connection.execute(
+        text(
+            f"CREATE INDEX IF NOT EXISTS {OFFER_TABLE}_table_idx ON public.{OFFER_TABLE} (supplier_table)"
+        )
+    )
+    connection.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS public.{SOURCE_TABLE} ("
+            "supplier_table text PRIMARY KEY, offer_date text, offer_count bigint NOT NULL, "
+            "rules text NOT NULL, indexed_at timestamptz NOT NULL DEFAULT now())"
+        )
+    )
+
+
+def supplier_tables(connection: object) -> list[str]:
+    return connection.execute(
+        text("SELECT table_name FROM information_schema.tables WHERE table_schema = :schema ORDER BY table_name"),
+        {"schema": PRICES_SCHEMA},
+    ).scalars().all()
+
+
+def latest_date(connection: object, table: str) -> str | None:
+    return connection.execute(text(f'SELECT MAX(дата) FROM {PRICES_SCHEMA}."{table}"')).scalar()
+
+
+def index_supplier_table(connection: object, table: str) -> int:
+    """
+    Переиндексирует предложения последней даты таблицы прайса; возвращает число строк.
+
+    Вызывается в транзакции загрузки, поэтому видит только что добавленную дату.
+    Строки без количества или цены не могут быть выбраны и в индекс не попадают.
+    """
+    ensure_offer_index(connection)
+    columns = set(
+        connection.execute(
+            text(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_schema = :schema AND table_name = :table"
+            ),
+            {"schema": PRICES_SCHEMA, "table": table},
+        ).scalars()
+    )
+    offer_date = latest_date(connection, table) if "дата" in columns else None
+    offers = pd.DataFrame(
+        columns=["supplier_table", "artikul_clean", "proizvoditel_clean", "kolichestvo", "tsena", "postavshchik"]
+    )
+    if offer_date is not None and columns.issuperset(REQUIRED_COLUMNS):
+        selected = ", ".join(f'"{column}"' for column in REQUIRED_COLUMNS)
+        data = pd.read_sql(
+            text(f'SELECT {selected} FROM {PRICES_SCHEMA}."{table}" WHERE дата = :offer_date'),
+            connection,
+            params={"offer_date": offer_date},
+        )
+        offers = pd.DataFrame({
+            "supplier_table": table,
+            "artikul_clean": clean_key(data["артикул"]),
+            "proizvoditel_clean": clean_key(data["производитель"].replace(replacement_dict, regex=True)),
+            "kolichestvo": pd.to_numeric(data["количество"], errors="coerce"),
+            "tsena": pd.to_numeric(data["цена"], errors="coerce"),
+            "postavshchik": data["поставщик"].astype(object).where(data["поставщик"].notna(), None),
+        }).dropna(subset=["kolichestvo", "tsena"])
+
+    connection.execute(text(f"DELETE FROM public.{OFFER_TABLE} WHERE supplier_table = :table"), {"table": table})
+    write_frame(offers, OFFER_TABLE, connection, schema="public", if_exists="append", index=False)
+    connection.execute(
+        text(
+            f"INSERT INTO public.{SOURCE_TABLE} (supplier_table, offer_date, offer_count, rules) "
+            "VALUES (:table, :offer_date, :offer_count, :rules) "
+            "ON CONFLICT (supplier_table) DO UPDATE SET offer_date = EXCLUDED.offer_date, "
+            "offer_count = EXCLUDED.offer_count, rules = EXCLUDED.rules, indexed_at = now()"
+        ),
+        {"table": table, "offer_date": offer_date, "offer_count": len(offers.index), "rules": RULES},
+    )
+    return len(offers.index)
+
+
+def sync_offer_index(connection: object, tables: Sequence[str] | None = None) -> list[str]:
+    """
+    Приводит индекс в соответствие со схемой prices; возвращает переиндексированные таблицы.
+
+    Таблица переиндексируется, если ее нет в индексе, изменилась ее последняя дата
+    или правила очистки, либо она указана в tables.  Удаленные таблицы убираются.
+    """
+    ensure_offer_index(connection)
+    current = supplier_tables(connection)
+    for index_table in (OFFER_TABLE, SOURCE_TABLE):
+        connection.execute(
+            text(f"DELETE FROM public.{index_table} WHERE supplier_table <> ALL(CAST(:tables AS text[]))"),
+            {"tables": current},
+        )
+    indexed = dict(
+        connection.execute(
+            text(f"SELECT supplier_table, offer_date || '|' || rules FROM public.{SOURCE_TABLE}")
+        ).all()
+    )
+    refreshed = []
+    for table in current:
+        try:
+            with connection.begin_nested():
+                if tables is None:
+                    has_date = connection.execute(
+                        text(
+                            "SELECT EXISTS (SELECT 1 FROM information_schema.columns "
+                            "WHERE table_schema = :schema AND table_name = :table AND column_name = 'дата')"
+                        ),
+                        {"schema": PRICES_SCHEMA, "table": table},
+                    ).scalar()
+                    offer_date = latest_date(connection, table) if has_date else None
+                    if table in indexed and indexed[table] == (
+                        None if offer_date is None else f"{offer_date}|{RULES}"
+                    ):
+                        continue
+                elif table not in tables:
+                    continue
+                rows = index_supplier_table(connection, table)
+        except Exception as e:
+            print(f"[Индекс] Ошибка при индексации таблицы {table}: {e}")
+            continue
+        print(f"[Индекс] Таблица {PRICES_SCHEMA}.{table}: {rows} предложений.")
+        refreshed.append(table)
+    return refreshed
+
+
+def min_price_offers(connection: object, wanted: pd.DataFrame, date_limit: datetime) -> pd.DataFrame:
+    """
+    Предложение с минимальной ценой для каждого kod.
+
+    wanted — kod, artikul_clean, proizvoditel_clean, min_stock.  Подходят
+    предложения таблиц с последней датой не раньше date_limit и количеством не
+    меньше min_stock; при равной цене выбирается большее количество.
+    """
+    return pd.read_sql(
+        text(
+            f"""
+            SELECT DISTINCT ON (wanted.kod)
+                wanted.kod, offer.kolichestvo AS stock, offer.tsena AS price,
+                offer.postavshchik AS sklad, wanted.proizvoditel_clean
+            FROM unnest(
+                CAST(:kods AS text[]), CAST(:artikuls AS text[]),
+                CAST(:producers AS text[]), CAST(:min_stocks AS float8[])
+            ) AS wanted (kod, artikul_clean, proizvoditel_clean, min_stock)
+            JOIN public.{OFFER_TABLE} AS offer
+                ON offer.artikul_clean = wanted.artikul_clean
+               AND offer.proizvoditel_clean = wanted.proizvoditel_clean
+            JOIN public.{SOURCE_TABLE} AS source ON source.supplier_table = offer.supplier_table
+            WHERE offer.kolichestvo >= wanted.min_stock
+              AND source.offer_date::timestamp >= :date_limit
+            ORDER BY wanted.kod, offer.tsena, offer.kolichestvo DESC, offer.supplier_table, offer.postavshchik
+            """
+        ),
+        connection,
+        params={
+            "kods": wanted["kod"].tolist(),
+            "artikuls": wanted["artikul_clean"].tolist(),
+            "producers": wanted["proizvoditel_clean"].tolist(),
+            "min_stocks": pd.to_numeric(wanted["min_stock"], errors="coerce").astype(float).tolist(),
+            "date_limit": date_limit,
+        },
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    tables = (sys.argv[1:] if argv is None else argv) or None
+    with get_db_engine().begin() as connection:
+        refreshed = sync_offer_index(connection, tables)
+    print(f"[Индекс] Переиндексировано таблиц: {len(refreshed)}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,6 +7,7 @@ import os
 import re
 import sys
 import warnings
+from collections.abc import Iterator
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -21,12 +22,23 @@ if str(PROJECT_PARENT) not in sys.path:
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+from ugkorea.db.bulkwrite import BulkWriter, WriteResult, copy_rows, write_frame
 from ugkorea.db.database import get_db_engine
+from ugkorea.db.tablecache import mark_tables_changed, refresh_snapshots
 
 from reglament_task.one_c_receiver_runtime.contracts import (
     OBSERVED_CONTRACTS,
     PRUNED_HEADERS_BY_NAME,
 )
+from reglament_task.one_c_receiver_runtime.receiver import LEGACY_CONTRACTS
+from reglament_task.one_c_receiver_runtime.partitions import (
+    PARTITIONED_PERIOD_COLUMNS,
+    clear_period,
+    ensure_text_period_function,
+    is_partitioned,
+    partition_table,
+    text_period_expression,
+)
 
 DEFAULT_LOCAL_EXPORT_DIR = Path(
     r"D:\NAS\заказы\Евгений\Access\Табличные выгрузки1С"
@@ -69,6 +81,7 @@ TEXT_PERIOD_CONTRACTS = {
     "month_end_prices",
     "inventory_movements",
 }
+INDEXED_DESTINATIONS = {"nomenklaturaprimenjaemost", "nomenklatura"}
 # A transaction-scoped PostgreSQL advisory lock prevents two scheduler/manual
 # receiver runs from deleting the same old window and then both appending it.
 RECEIVER_ADVISORY_LOCK_KEY = 1_837_436_591_001
@@ -118,12 +131,209 @@ def table_name(file_name: str) -> str:
     return to_snake_case(stem)
 
 
+def stream_chunk_rows() -> int | None:
+    configured = os.getenv("UGKOREA_ONE_C_CHUNK_ROWS")
+    if not configured:
+        return None
+    chunk_rows = int(configured)
+    if chunk_rows <= 0:
+        raise ValueError("UGKOREA_ONE_C_CHUNK_ROWS must be a positive row count")
+    return chunk_rows
+
+
+def partition_periods() -> bool:
+    return os.getenv("UGKOREA_ONE_C_PARTITIONED", "").strip().lower() in {"1", "true", "yes"}
+
+
+def log_parser_warnings(file_name: str, caught: list[warnings.WarningMessage]) -> None:
+    for warning in caught:
+        logging.warning("CSV parser warning for %s: %s", file_name, warning.message)
+
+
+def read_export_csv(file_path: Path, **options: object) -> pd.DataFrame:
+    """Read a whole export with pandas type inference, as the loader always has."""
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        data = pd.read_csv(file_path, sep=";", on_bad_lines="warn", **options)
+    log_parser_warnings(file_path.name, caught)
+    return data
+
+
+def iter_export_csv(
+    file_path: Path,
+    chunk_rows: int,
+    **options: object,
+) -> Iterator[pd.DataFrame]:
+    """Yield raw text export chunks, logging parser warnings like ``read_export_csv``.
+
+    Chunks are read as text and typed by ``prepare_frame(pin_types=True)``:
+    per-chunk type guessing could change a column's type between chunks or
+    strip leading zeros from one chunk only.
+    """
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        reader = pd.read_csv(
+            file_path,
+            sep=";",
+            on_bad_lines="warn",
+            dtype=str,
+            chunksize=chunk_rows,
+            **options,
+        )
+    log_parser_warnings(file_path.name, caught)
+    with reader:
+        while True:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                chunk = next(reader, None)
+            log_parser_warnings(file_path.name, caught)
+            if chunk is None:
+                return
+            yield chunk
+
+
+def prepare_frame(
+    data: pd.DataFrame,
+    contract_name: str,
+    file_name: str,
+    expected_headers: tuple[str, ...],
+    *,
+    cutoff: datetime,
+    window_end: datetime,
+    pin_types: bool = False,
+) -> pd.DataFrame:
+    """Validate and clean one export frame.
+
+    ``pin_types`` converts the numeric columns of a text-read chunk to the
+    legacy table types; whole files keep the types pandas inferred for them.
+    """
+    source_headers = tuple(
+        str(column).lstrip("\ufeff").strip() for column in data.columns
+    )
+    if source_headers != expected_headers:
+        raise ValueError(
+            f"Unexpected header for {file_name}: "
+            f"expected {expected_headers!r}, got {source_headers!r}"
+        )
+    data.columns = [to_snake_case(column) for column in source_headers]
+    data = data.apply(
+        lambda column: column.map(
+            lambda value: value.strip() if isinstance(value, str) else value
+        )
+    )
+
+    # Numeric columns of streamed chunks take the legacy table types the 1C receiver publishes.
+    spec = LEGACY_CONTRACTS[contract_name]
+    for column in data.columns if pin_types else ():
+        sql_type = spec.sql_type(column)
+        if sql_type not in {"bigint", "double precision"}:
+            continue
+        try:
+            values = pd.to_numeric(data[column].str.replace(",", ".", regex=False))
+        except ValueError as error:
+            raise ValueError(f"{file_name} column {column} is not numeric: {error}") from error
+        data[column] = values.astype("Int64") if sql_type == "bigint" else values.astype(float)
+
+    for column in [name for name in data.columns if "data" in name]:
+        data[column] = pd.to_datetime(data[column], errors="coerce", dayfirst=True)
+
+    if contract_name in PERIOD_FIELD_BY_CONTRACT:
+        period_column = to_snake_case(PERIOD_FIELD_BY_CONTRACT[contract_name])
+        parsed_period = pd.to_datetime(
+            data[period_column], errors="coerce", dayfirst=True
+        )
+        invalid_period_count = int(parsed_period.isna().sum())
+        if invalid_period_count:
+            raise ValueError(
+                f"{file_name} contains {invalid_period_count} rows "
+                "without a valid period"
+            )
+        outside_scope_count = int(
+            ((parsed_period < cutoff) | (parsed_period >= window_end)).sum()
+        )
+        if outside_scope_count:
+            raise ValueError(
+                f"{file_name} contains {outside_scope_count} rows outside "
+                f"the rolling window [{cutoff:%Y-%m-%d}, {window_end:%Y-%m-%d})"
+            )
+
+    if table_name(file_name) in INDEXED_DESTINATIONS:
+        if "kod" not in data.columns:
+            raise ValueError(f"Required kod column is missing in {file_name}")
+        data.set_index("kod", inplace=True)
+    return data
+
+
+class StreamedExport:
+    """A 1C export that is read and prepared chunk by chunk while it is written.
+
+    Only the header is validated up front; period and scope violations surface
+    while loading and roll back the surrounding transaction.
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        contract_name: str,
+        expected_headers: tuple[str, ...],
+        *,
+        cutoff: datetime,
+        window_end: datetime,
+        chunk_rows: int,
+    ) -> None:
+        self.file_path = file_path
+        self.contract_name = contract_name
+        self.expected_headers = expected_headers
+        self.cutoff = cutoff
+        self.window_end = window_end
+        self.chunk_rows = chunk_rows
+
+    def header(self) -> pd.DataFrame:
+        return self._prepare(read_export_csv(self.file_path, nrows=0, dtype=str))
+
+    def chunks(self) -> Iterator[pd.DataFrame]:
+        yielded = False
+        for chunk in iter_export_csv(self.file_path, self.chunk_rows):
+            yielded = True
+            yield self._prepare(chunk)
+        if not yielded:
+            # A header-only export still creates a missing destination table.
+            yield self.header()
+
+    def column_values(self, header: str) -> set[object]:
+        """Distinct stripped values of one source column, read chunk by chunk."""
+        values: set[object] = set()
+        for chunk in iter_export_csv(
+            self.file_path,
+            self.chunk_rows,
+            usecols=[self.expected_headers.index(header)],
+        ):
+            values.update(
+                value.strip() if isinstance(value, str) else value
+                for value in chunk.iloc[:, 0].dropna()
+            )
+        return values
+
+    def _prepare(self, data: pd.DataFrame) -> pd.DataFrame:
+        return prepare_frame(
+            data,
+            self.contract_name,
+            self.file_path.name,
+            self.expected_headers,
+            cutoff=self.cutoff,
+            window_end=self.window_end,
+            pin_types=True,
+        )
+
+
 def prepare_exports(
     source_dir: Path,
     *,
     cutoff: datetime,
     window_end: datetime,
-) -> list[tuple[str, str, pd.DataFrame, bool]]:
+    chunk_rows: int | None = None,
+) -> list[tuple[str, str, pd.DataFrame | StreamedExport, bool]]:
+    """Read and validate every export, or with ``chunk_rows`` only prepare streaming."""
     if not source_dir.is_dir():
         raise FileNotFoundError(f"1C export directory does not exist: {source_dir}")
 
@@ -143,56 +353,33 @@ def prepare_exports(
     ):
         print(f"[Чтение {position}/{total_files}] {file_name}...", flush=True)
         file_path = source_dir / file_name
-        with warnings.catch_warnings(record=True) as caught:
-            warnings.simplefilter("always")
-            data = pd.read_csv(file_path, sep=";", on_bad_lines="warn")
-        for warning in caught:
-            logging.warning("CSV parser warning for %s: %s", file_name, warning.message)
-
-        source_headers = tuple(
-            str(column).lstrip("\ufeff").strip() for column in data.columns
-        )
-        if source_headers != expected_headers:
-            raise ValueError(
-                f"Unexpected header for {file_name}: "
-                f"expected {expected_headers!r}, got {source_headers!r}"
+        destination = table_name(file_name)
+        use_index = destination in INDEXED_DESTINATIONS
+        if chunk_rows is not None:
+            data = StreamedExport(
+                file_path,
+                contract_name,
+                expected_headers,
+                cutoff=cutoff,
+                window_end=window_end,
+                chunk_rows=chunk_rows,
             )
-        data.columns = [to_snake_case(column) for column in source_headers]
-        data = data.apply(
-            lambda column: column.map(
-                lambda value: value.strip() if isinstance(value, str) else value
+            data.header()
+            prepared.append((contract_name, destination, data, use_index))
+            print(
+                f"[Подготовлено {position}/{total_files}] {file_name}: "
+                f"потоковая загрузка по {chunk_rows} строк -> таблица '{destination}'.",
+                flush=True,
             )
+            continue
+        data = prepare_frame(
+            read_export_csv(file_path),
+            contract_name,
+            file_name,
+            expected_headers,
+            cutoff=cutoff,
+            window_end=window_end,
         )
-
-        for column in [name for name in data.columns if "data" in name]:
-            data[column] = pd.to_datetime(data[column], errors="coerce", dayfirst=True)
-
-        if contract_name in PERIOD_FIELD_BY_CONTRACT:
-            period_column = to_snake_case(PERIOD_FIELD_BY_CONTRACT[contract_name])
-            parsed_period = pd.to_datetime(
-                data[period_column], errors="coerce", dayfirst=True
-            )
-            invalid_period_count = int(parsed_period.isna().sum())
-            if invalid_period_count:
-                raise ValueError(
-                    f"{file_name} contains {invalid_period_count} rows "
-                    "without a valid period"
-                )
-            outside_scope_count = int(
-                ((parsed_period < cutoff) | (parsed_period >= window_end)).sum()
-            )
-            if outside_scope_count:
-                raise ValueError(
-                    f"{file_name} contains {outside_scope_count} rows outside "
-                    f"the rolling window [{cutoff:%Y-%m-%d}, {window_end:%Y-%m-%d})"
-                )
-
-        destination = table_name(file_name)
-        use_index = destination in {"nomenklaturaprimenjaemost", "nomenklatura"}
-        if use_index:
-            if "kod" not in data.columns:
-                raise ValueError(f"Required kod column is missing in {file_name}")
-            data.set_index("kod", inplace=True)
         prepared.append((contract_name, destination, data, use_index))
         print(
             f"[Подготовлено {position}/{total_files}] {file_name}: "
@@ -201,8 +388,8 @@ def prepare_exports(
         )
 
     frames = {contract_name: data for contract_name, _, data, _ in prepared}
-    work_refs = set(frames["service_order_works"]["ssylka"].dropna())
-    executor_refs = set(frames["service_order_executors"]["ssylka"].dropna())
+    work_refs = export_references(frames["service_order_works"])
+    executor_refs = export_references(frames["service_order_executors"])
     orphan_executor_ref_count = len(executor_refs - work_refs)
     if orphan_executor_ref_count:
         raise ValueError(
@@ -212,6 +399,42 @@ def prepare_exports(
     return prepared
 
 
+def export_references(data: pd.DataFrame | StreamedExport) -> set[object]:
+    if isinstance(data, StreamedExport):
+        return data.column_values("Ссылка")
+    return set(data["ssylka"].dropna())
+
+
+def append_export(
+    data: pd.DataFrame | StreamedExport,
+    destination: str,
+    connection: object,
+    *,
+    use_index: bool,
+    writer: BulkWriter | None = copy_rows,
+) -> int:
+    frames = [data] if isinstance(data, pd.DataFrame) else data.chunks()
+    rows = 0
+    seconds = 0.0
+    for frame in frames:
+        result = write_frame(
+            frame,
+            destination,
+            connection,
+            if_exists="append",
+            index=use_index,
+            method=writer,
+        )
+        rows += result.rows
+        seconds += result.seconds
+        print(
+            f"[Загрузка] Таблица '{destination}': записано "
+            f"{WriteResult(rows=rows, seconds=seconds).describe()}...",
+            flush=True,
+        )
+    return rows
+
+
 def rolling_bounds(reference: datetime | None = None) -> tuple[datetime, datetime]:
     reference = reference or datetime.now()
     cutoff = datetime(reference.year - 1, reference.month, 1)
@@ -225,68 +448,93 @@ def quoted_identifier(value: str) -> str:
     return f'"{value}"'
 
 
-def text_period_expression(column: str) -> str:
-    quoted = quoted_identifier(column)
-    trimmed = f"BTRIM(REPLACE({quoted}, CHR(160), ' '))"
-    return (
-        "CASE "
-        f"WHEN {trimmed} ~ '^[0-9]{{2}}[.][0-9]{{2}}[.][0-9]{{4}} "
-        f"[0-9]{{2}}:[0-9]{{2}}:[0-9]{{2}}$' THEN to_timestamp({trimmed}, "
-        "'DD.MM.YYYY HH24:MI:SS') "
-        f"WHEN {trimmed} ~ '^[0-9]{{2}}[.][0-9]{{2}}[.][0-9]{{4}}$' "
-        f"THEN to_timestamp({trimmed}, 'DD.MM.YYYY') "
-        f"WHEN {trimmed} ~ '^[0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}}' "
-        f"THEN {trimmed}::timestamp "
-        "ELSE NULL END"
-    )
+def period_index_name(destination: str) -> str:
+    return quoted_identifier(f"{destination}_period_idx")
 
 
-def table_row_count(
+def ensure_text_period_indexes(
+    connection: object,
+    period_columns: dict[str, str],
+) -> None:
+    ensure_text_period_function(connection)
+    for destination, column in period_columns.items():
+        index_name = period_index_name(destination)
+        exists = connection.execute(
+            text("SELECT to_regclass(:index_name) IS NOT NULL"),
+            {"index_name": index_name},
+        ).scalar_one()
+        if exists:
+            continue
+        connection.execute(
+            text(
+                f"CREATE INDEX {index_name} ON {quoted_identifier(destination)} "
+                f"({text_period_expression(column)})"
+            )
+        )
+        # Expression statistics exist only after ANALYZE; without them the
+        # planner keeps estimating a third of the table per window predicate.
+        connection.execute(text(f"ANALYZE {quoted_identifier(destination)}"))
+        print(
+            f"[Индекс] Таблица '{destination}': создан индекс периода.",
+            flush=True,
+        )
+
+
+def table_row_counts(
     connection: object,
     destination: str,
+    filters: dict[str, str | None],
     *,
-    where_sql: str | None = None,
     parameters: dict[str, object] | None = None,
-) -> int:
-    query = f"SELECT COUNT(*) FROM {quoted_identifier(destination)}"
-    if where_sql is not None:
-        query += f" WHERE {where_sql}"
-    return int(connection.execute(text(query), parameters or {}).scalar_one())
+) -> dict[str, int]:
+    """Count the rows matching each filter (``None`` for all rows) in one scan."""
+    aggregates = ", ".join(
+        "COUNT(*)" if where_sql is None else f"COUNT(*) FILTER (WHERE {where_sql})"
+        for where_sql in filters.values()
+    )
+    row = connection.execute(
+        text(f"SELECT {aggregates} FROM {quoted_identifier(destination)}"),
+        parameters or {},
+    ).one()
+    return {name: int(count) for name, count in zip(filters, row, strict=True)}
 
 
-def require_table_row_count(
+def require_table_row_counts(
     connection: object,
     destination: str,
-    expected: int,
+    checks: list[tuple[str, str | None, int]],
     *,
-    phase: str,
-    where_sql: str | None = None,
     parameters: dict[str, object] | None = None,
 ) -> None:
-    actual = table_row_count(
+    """Verify ``(phase, where_sql, expected)`` row counts with a single aggregate."""
+    actual_counts = table_row_counts(
         connection,
         destination,
-        where_sql=where_sql,
+        {phase: where_sql for phase, where_sql, _ in checks},
         parameters=parameters,
     )
-    if actual != expected:
-        raise RuntimeError(
-            f"Row-count verification failed for table '{destination}' during "
-            f"{phase}: expected {expected}, got {actual}"
+    for phase, _, expected in checks:
+        actual = actual_counts[phase]
+        if actual != expected:
+            raise RuntimeError(
+                f"Row-count verification failed for table '{destination}' during "
+                f"{phase}: expected {expected}, got {actual}"
+            )
+        print(
+            f"[Проверка] Таблица '{destination}', {phase}: {actual} строк.",
+            flush=True,
         )
-    print(
-        f"[Проверка] Таблица '{destination}', {phase}: {actual} строк.",
-        flush=True,
-    )
 
 
 def update_exports(
-    prepared: list[tuple[str, str, pd.DataFrame, bool]],
+    prepared: list[tuple[str, str, pd.DataFrame | StreamedExport, bool]],
     engine: object,
     *,
     cutoff: datetime,
     window_end: datetime,
-) -> None:
+    writer: BulkWriter | None = copy_rows,
+    partitioned: bool = False,
+) -> dict[str, int]:
     destinations = {name: destination for name, destination, _, _ in prepared}
     source_files = {
         contract_name: file_name
@@ -313,8 +561,31 @@ def update_exports(
             )
         print("[Блокировка] Получена.", flush=True)
 
+        partitioned_destinations = set()
+        for _, destination, _, _ in prepared:
+            if destination not in PARTITIONED_PERIOD_COLUMNS:
+                continue
+            if partitioned and not is_partitioned(connection, destination):
+                moved = partition_table(connection, destination)
+                print(
+                    f"[Секционирование] Таблица '{destination}': "
+                    f"{moved} строк перенесено в помесячные секции.",
+                    flush=True,
+                )
+            if is_partitioned(connection, destination):
+                partitioned_destinations.add(destination)
+
+        ensure_text_period_indexes(
+            connection,
+            {
+                destination: to_snake_case(PERIOD_FIELD_BY_CONTRACT[contract_name])
+                for contract_name, destination, _, _ in prepared
+                if contract_name in TEXT_PERIOD_CONTRACTS
+            },
+        )
+
         period_scopes = {}
-        period_preserved_rows = {}
+        period_totals = {}
         for contract_name, destination, _, _ in prepared:
             if contract_name in SNAPSHOT_CONTRACTS or contract_name == "service_order_executors":
                 continue
@@ -324,32 +595,20 @@ def update_exports(
                 if contract_name in TEXT_PERIOD_CONTRACTS
                 else quoted_identifier(column)
             )
-            invalid_count = table_row_count(
+            counts = table_row_counts(
                 connection,
                 destination,
-                where_sql=f"{expression} IS NULL",
+                {"total": None, "invalid": f"{expression} IS NULL"},
             )
-            if invalid_count:
+            if counts["invalid"]:
                 raise RuntimeError(
-                    f"Table '{destination}' contains {invalid_count} rows "
+                    f"Table '{destination}' contains {counts['invalid']} rows "
                     f"without a parseable {column}; update was stopped"
                 )
-            scope = f"{expression} >= :cutoff AND {expression} < :window_end"
-            period_scopes[contract_name] = scope
-            total_before = table_row_count(connection, destination)
-            scope_before = table_row_count(
-                connection,
-                destination,
-                where_sql=scope,
-                parameters=window_parameters,
-            )
-            period_preserved_rows[contract_name] = total_before - scope_before
-            print(
-                f"[Классификация] Таблица '{destination}': "
-                f"{scope_before} строк окна, "
-                f"{period_preserved_rows[contract_name]} строк истории.",
-                flush=True,
+            period_scopes[contract_name] = (
+                f"{expression} >= :cutoff AND {expression} < :window_end"
             )
+            period_totals[contract_name] = counts["total"]
 
         for contract_name in sorted(SNAPSHOT_CONTRACTS):
             result = connection.execute(
@@ -360,12 +619,6 @@ def update_exports(
                 f"удалено {result.rowcount} строк.",
                 flush=True,
             )
-            require_table_row_count(
-                connection,
-                destinations[contract_name],
-                0,
-                phase="после очистки снимка",
-            )
 
         executor_table = quoted_identifier(destinations["service_order_executors"])
         works_table = quoted_identifier(destinations["service_order_works"])
@@ -374,77 +627,71 @@ def update_exports(
             f"(SELECT DISTINCT ssylka FROM {works_table} "
             "WHERE data >= :cutoff AND data < :window_end)"
         )
-        executor_total_before = table_row_count(
+        executor_total_before = table_row_counts(
             connection,
             destinations["service_order_executors"],
-        )
-        executor_scope_before = table_row_count(
-            connection,
-            destinations["service_order_executors"],
-            where_sql=executor_scope,
-            parameters=window_parameters,
-        )
-        executor_preserved_rows = executor_total_before - executor_scope_before
+            {"total": None},
+        )["total"]
         result = connection.execute(
             text(
                 f"DELETE FROM {executor_table} WHERE {executor_scope}"
             ),
             window_parameters,
         )
+        executor_preserved_rows = executor_total_before - result.rowcount
         print(
             f"[Очистка] Таблица '{destinations['service_order_executors']}': "
-            f"удалено {result.rowcount} строк текущего окна.",
+            f"удалено {result.rowcount} строк текущего окна, "
+            f"{executor_preserved_rows} строк истории.",
             flush=True,
         )
-        require_table_row_count(
-            connection,
-            destinations["service_order_executors"],
-            0,
-            phase="после очистки окна",
-            where_sql=executor_scope,
-            parameters=window_parameters,
-        )
 
+        period_preserved_rows = {}
         for contract_name, destination, _, _ in prepared:
             if contract_name in SNAPSHOT_CONTRACTS or contract_name == "service_order_executors":
                 continue
-            scope = period_scopes[contract_name]
-            result = connection.execute(
-                text(
-                    f"DELETE FROM {quoted_identifier(destination)} "
-                    f"WHERE {scope}"
-                ),
-                window_parameters,
+            if destination in partitioned_destinations:
+                deleted = clear_period(connection, destination, cutoff, window_end)
+            else:
+                deleted = connection.execute(
+                    text(
+                        f"DELETE FROM {quoted_identifier(destination)} "
+                        f"WHERE {period_scopes[contract_name]}"
+                    ),
+                    window_parameters,
+                ).rowcount
+            period_preserved_rows[contract_name] = (
+                period_totals[contract_name] - deleted
             )
             print(
                 f"[Очистка] Таблица '{destination}': удалено "
-                f"{result.rowcount} строк текущего окна.",
+                f"{deleted} строк текущего окна, "
+                f"{period_preserved_rows[contract_name]} строк истории.",
                 flush=True,
             )
-            require_table_row_count(
-                connection,
-                destination,
-                0,
-                phase="после очистки окна",
-                where_sql=scope,
-                parameters=window_parameters,
-            )
 
+        expected_rows = {}
         for position, (contract_name, destination, data, use_index) in enumerate(
             prepared,
             start=1,
         ):
             file_name = source_files[contract_name]
+            size = (
+                "потоково"
+                if isinstance(data, StreamedExport)
+                else f"{len(data.index)} строк"
+            )
             print(
                 f"[Загрузка {position}/{total_tables}] {file_name} -> "
-                f"таблица '{destination}' ({len(data.index)} строк)...",
+                f"таблица '{destination}' ({size})...",
                 flush=True,
             )
-            data.to_sql(
+            expected_rows[contract_name] = append_export(
+                data,
                 destination,
                 connection,
-                if_exists="append",
-                index=use_index,
+                use_index=use_index,
+                writer=writer,
             )
             print(
                 f"[Записано {position}/{total_tables}] Таблица '{destination}' "
@@ -452,47 +699,42 @@ def update_exports(
                 flush=True,
             )
 
-        expected_rows = {
-            contract_name: len(data.index)
-            for contract_name, _, data, _ in prepared
-        }
+        # One aggregate per table checks both the freshly written window and
+        # the preserved history; rows left behind by the DELETE would break
+        # the window count, so no separate post-delete scan is needed.
         for contract_name, destination, _, _ in prepared:
+            loaded = expected_rows[contract_name]
             if contract_name in SNAPSHOT_CONTRACTS:
-                where_sql = None
-                parameters = None
-                expected_total = expected_rows[contract_name]
-            elif contract_name == "service_order_executors":
-                where_sql = executor_scope
-                parameters = window_parameters
-                expected_total = (
-                    executor_preserved_rows + expected_rows[contract_name]
+                require_table_row_counts(
+                    connection,
+                    destination,
+                    [("итоговая таблица снимка", None, loaded)],
                 )
+                continue
+            if contract_name == "service_order_executors":
+                where_sql = executor_scope
+                preserved = executor_preserved_rows
             else:
                 where_sql = period_scopes[contract_name]
-                parameters = window_parameters
-                expected_total = (
-                    period_preserved_rows[contract_name]
-                    + expected_rows[contract_name]
-                )
-            require_table_row_count(
-                connection,
-                destination,
-                expected_rows[contract_name],
-                phase="после записи",
-                where_sql=where_sql,
-                parameters=parameters,
-            )
-            require_table_row_count(
+                preserved = period_preserved_rows[contract_name]
+            require_table_row_counts(
                 connection,
                 destination,
-                expected_total,
-                phase="итоговая таблица с сохранённой историей",
+                [
+                    ("после записи", where_sql, loaded),
+                    ("итоговая таблица с сохранённой историей", None, preserved + loaded),
+                ],
+                parameters=window_parameters,
             )
 
+        # Кэш и снимки db.tablecache узнают о загрузке по этой отметке
+        mark_tables_changed(connection, destinations.values())
+
     print(
         f"Транзакция обновления {total_tables} таблиц успешно зафиксирована.",
         flush=True,
     )
+    return expected_rows
 
 
 def main() -> int:
@@ -509,8 +751,22 @@ def main() -> int:
             source_dir,
             cutoff=cutoff,
             window_end=window_end,
+            chunk_rows=stream_chunk_rows(),
+        )
+        loaded_rows = update_exports(
+            prepared,
+            engine,
+            cutoff=cutoff,
+            window_end=window_end,
+            partitioned=partition_periods(),
         )
-        update_exports(prepared, engine, cutoff=cutoff, window_end=window_end)
+        try:
+            refreshed = refresh_snapshots(engine)
+            print(f"[Снимок] Обновлены снимки таблиц: {', '.join(refreshed) or 'нет'}.", flush=True)
+        except Exception as error:
+            # Загрузка уже зафиксирована; без снимков чтения идут на сервер
+            logging.exception("Parquet snapshot refresh failed")
+            print(f"[Снимок] Снимки не обновлены: {type(error).__name__}: {error}", flush=True)
     except Exception as error:
         logging.exception("1C CSV rolling-window update failed")
         print(f"1C CSV rolling-window update failed: {type(error).__name__}: {error}")
@@ -519,7 +775,7 @@ def main() -> int:
         if engine is not None:
             engine.dispose()
 
-    total_rows = sum(len(data.index) for _, _, data, _ in prepared)
+    total_rows = sum(loaded_rows.values())
     print(
         f"Updated {len(prepared)} analytical tables from {total_rows} CSV rows "
         f"for the rolling window starting {cutoff:%Y-%m-%d}."
@@ -4,6 +4,7 @@ import numpy as np
 from openpyxl import load_workbook
 from datetime import datetime
 import re
+from ugkorea.db.tablecache import read_base_table
 
 
 def load_forreprice_data(engine):
@@ -19,13 +20,13 @@ def load_forreprice_data(engine):
         return df
 
     # Загрузка данных с нормализацией
-    nomenklatura_query = """
-    SELECT kod, artikul, proizvoditel, naimenovaniepolnoe, 
-           bazovajaedinitsa AS edizm, datasozdanija
-    FROM nomenklatura
-    WHERE vidnomenklatury = 'Товар'
-    """
-    nomenklatura_df = load_and_normalize_table(nomenklatura_query)
+    nomenklatura_df = normalize_kod_column(read_base_table(
+        engine,
+        "nomenklatura",
+        ["kod", "artikul", "proizvoditel", "naimenovaniepolnoe", "bazovajaedinitsa", "datasozdanija"],
+        filters={"vidnomenklatury": "Товар"},
+        rename={"bazovajaedinitsa": "edizm"},
+    ))
 
     nomenklaturaold_query = """
     SELECT kod, stellazh, pometkaudalenija
@@ -45,17 +46,11 @@ def load_forreprice_data(engine):
     """
     middlemaxprice_df = load_and_normalize_table(middlemaxprice_query)
 
-    priceold_query = """
-    SELECT kod, tsenazakup, tsenarozn
-    FROM priceold
-    """
-    priceold_df = load_and_normalize_table(priceold_query)
+    priceold_df = normalize_kod_column(read_base_table(engine, "priceold", ["kod", "tsenazakup", "tsenarozn"]))
 
-    stockold_query = """
-    SELECT kod, osnsklad AS ostatok
-    FROM stockold
-    """
-    stockold_df = load_and_normalize_table(stockold_query)
+    stockold_df = normalize_kod_column(
+        read_base_table(engine, "stockold", ["kod", "osnsklad"], rename={"osnsklad": "ostatok"})
+    )
 
     typedetailgen_query = """
     SELECT kod, type_detail
@@ -150,12 +145,12 @@ def load_forreprice_data(engine):
     """
     suppliespivot_df = load_and_normalize_table(suppliespivot_query)
 
-    postuplenija_query = """
-    SELECT kod, data, kolichestvo
-    FROM postuplenija
-    WHERE proveden = 'Да' AND hozoperatsija = 'Поступление товаров'
-    """
-    postuplenija_df = load_and_normalize_table(postuplenija_query)
+    postuplenija_df = normalize_kod_column(read_base_table(
+        engine,
+        "postuplenija",
+        ["kod", "data", "kolichestvo"],
+        filters={"proveden": "Да", "hozoperatsija": "Поступление товаров"},
+    ))
 
     # Фильтрация данных по kod, которые есть в filtered_df
     priceendmonth_filtered = priceendmonth_df[
@@ -1,5 +1,6 @@
 import pandas as pd
 from ugkorea.db.database import get_db_engine
+from ugkorea.db.tablecache import read_table
 
 # Основная функция для загрузки, объединения и обработки данных
 def load_and_process_data(engine):
@@ -10,12 +11,10 @@ def load_and_process_data(engine):
                 df[col] = df[col].map(lambda x: x.strip() if isinstance(x, str) else x)
         return df
 
-    # Загрузка данных из таблицы prodazhi
-    query_prodazhi = """
-        SELECT hozoperatsija, dokumentprodazhi, kolichestvo, summa, period, sebestoimost, kod 
-        FROM prodazhi;
-    """
-    prodazhi_df = pd.read_sql(query_prodazhi, engine)
+    # Загрузка данных из таблицы prodazhi (через общий кэш базовых таблиц)
+    prodazhi_df = read_table(
+        engine, "prodazhi", ["hozoperatsija", "dokumentprodazhi", "kolichestvo", "summa", "period", "sebestoimost", "kod"]
+    )
 
     # Загрузка данных из таблицы realizatsija, включая колонку avtor
     query_realizatsija = """
@@ -1,6 +1,7 @@
 import logging
 from ugkorea.statistic.loaddata import get_final_data, load_and_process_data, perform_abc_xyz_analysis
 from ugkorea.db.database import get_db_engine
+from ugkorea.db.bulkwrite import write_frame
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -46,277 +47,364 @@ def load_additional_data(engine):
     return priceendmonth, stockendmonth, suppliespivot, deliveryminprice
 
 
-def calculate_sales_metrics(
-    sales_data: pd.DataFrame, union_data: pd.DataFrame, deliveryminprice: pd.DataFrame) -> pd.DataFrame:
-    # Use the current date as the reference date
-    reference_date = datetime.now()
-    current_period = pd.Period(reference_date.strftime("%Y-%m"), freq="M")
-
-    # Отладочная информация
-    print("Начинаем расчет метрик продаж...")
-
-    # Заполняем значения price текущего месяца из tsenarozn, если они пустые
-    # Функция для заполнения текущего месяца значениями price и balance
-    def fill_current_month_data(row):
-        # Проверка условий для заполнения значения 'price'
-        if (
-            pd.isna(row["price"])
-            and row["year_month"] == current_period
-            and pd.notna(row["total_sales"])
-            and pd.notna(row["balance"])
-        ):
-            kod = row["kod"]
-            # Получаем значение tsenarozn из union_data для текущего kod
-            price_value = union_data.loc[union_data["kod"] == kod, "tsenarozn"].values
-            row["price"] = price_value[0] if len(price_value) > 0 else row["price"]
-
-        # Проверка условий для заполнения значения 'balance'
-        if row["year_month"] == current_period:
-            kod = row["kod"]
-            # Получаем значение osnsklad из union_data для текущего kod
-            balance_value = union_data.loc[union_data["kod"] == kod, "osnsklad"].values
-            if len(balance_value) > 0 and balance_value[0] > 0:
-                row["balance"] = balance_value[0]
-
-        return row
-
-    sales_data = sales_data.apply(fill_current_month_data, axis=1)
-
-    # Calculate relevant periods directly as Period objects
-    twelve_months_ago = current_period - 12
-    three_months_ago = current_period - 3
-
-    # Periods for August, September, and October of previous years
-    periods_last_year = [pd.Period(f"{reference_date.year - 1}-{month:02d}", freq='M') for month in range(8, 11)]
-    periods_two_years_ago = [period - 12 for period in periods_last_year]
-    periods_three_years_ago = [period - 24 for period in periods_last_year]
-
-    # Initialize an empty DataFrame to store the results
-    metrics = []
-    print("Происходит расчет метрик средних продаж, отклонений, суммарных продаж в разные периоды, время с последней продажи и т.п...")
-
-    # Group by 'kod' and calculate the required sums in a single pass
-    for kod, group in sales_data.groupby('kod'):
-
-        # Fill NaN values in 'total_sales' and 'balance' with 0 for sales calculations
-        group['total_sales_filled'] = group['total_sales'].fillna(0)
-        group['balance_filled'] = group['balance'].fillna(0)
-
-        # Total sales calculations considering all months
-        total_sales_last_12 = group[(group['year_month'] > twelve_months_ago) & (group['year_month'] <= current_period)]['total_sales_filled'].sum()
-        total_sales_last_3 = group[(group['year_month'] > three_months_ago) & (group['year_month'] <= current_period)]['total_sales_filled'].sum()
-
-        # Добавление максимального и минимального значений продаж за последние 12 месяцев
-        max_sales_last_12 = group[
-            (group["year_month"] > twelve_months_ago)
-            & (group["year_month"] <= current_period)
-        ]["total_sales_filled"].max()
-        min_sales_last_12 = group[
-            (group["year_month"] > twelve_months_ago)
-            & (group["year_month"] <= current_period)
-            & (group["total_sales_filled"] > 0)
-        ]["total_sales_filled"].min()
-
-        sum_sales_last_year = group[group['year_month'].isin(periods_last_year)]['total_sales_filled'].sum()
-        sum_sales_two_years_ago = group[group['year_month'].isin(periods_two_years_ago)]['total_sales_filled'].sum()
-        sum_sales_three_years_ago = group[group['year_month'].isin(periods_three_years_ago)]['total_sales_filled'].sum()
-
-        # Filter for the last 12 months and include months where there were sales or balance was > 0
-        filtered_last_12_months = group[(group['year_month'] > twelve_months_ago) & (group['year_month'] <= current_period) & 
-                                        ((group['balance_filled'] > 0) | (group['total_sales_filled'] > 0))].copy()
-
-        # Calculate mean and standard deviation of total_sales for the filtered months
-        if not filtered_last_12_months.empty:
-            mean_sales = filtered_last_12_months['total_sales_filled'].sum() / filtered_last_12_months.shape[0]
-            std_sales = filtered_last_12_months['total_sales_filled'].std()
-        else:
-            mean_sales = std_sales = 0
-
-        # Count months without sales over the entire period in sales_data
-        if group['total_sales_filled'].sum() == 0:
-            # If no sales at all, set months_without_sales to the number of unique months
-            months_without_sales = group['year_month'].nunique()
-        elif group[(group['balance_filled'] > 0) & ((group['total_sales'].isna()) | (group['total_sales_filled'] <= 0))].empty:
-            # If there were sales in every month, set months_without_sales to 0
-            months_without_sales = 0
-        else:
-            # Otherwise, count months without sales where balance > 0 and sales are <= 0 or NaN
-            months_without_sales = group[
-                (group['balance_filled'] > 0) & ((group['total_sales'].isna()) | (group['total_sales_filled'] <= 0))
-            ].shape[0]
-
-        # Calculate the number of months since the last sale
-        last_sale_period = group[group['total_sales_filled'] > 0]['year_month'].max()
-        if pd.notna(last_sale_period):
-            months_since_last_sale = current_period - last_sale_period
-            months_since_last_sale = months_since_last_sale.n
-        else:
-            # If no sales were found, set months_since_last_sale to the total number of months in the observation
-            months_since_last_sale = group['year_month'].nunique()
-
-        metrics.append(
-            {
-                "kod": kod,
-                "total_sales_last_12_months": total_sales_last_12,
-                "total_sales_last_3_months": total_sales_last_3,
-                "sum_sales_last_year": sum_sales_last_year,
-                "sum_sales_two_years_ago": sum_sales_two_years_ago,
-                "sum_sales_three_years_ago": sum_sales_three_years_ago,
-                "mean_sales_last_12_months": mean_sales,
-                "std_sales_last_12_months": std_sales,
-                "months_without_sales": months_without_sales,
-                "months_since_last_sale": months_since_last_sale,
-                "max_sales_last_12_months": max_sales_last_12,
-                "min_sales_last_12_months": min_sales_last_12,
-            }
-        )
-
-    # Convert the results into a DataFrame
-    sales_metrics = pd.DataFrame(metrics)
-
-    # Merge with union_data
-    print("Объединение данных union_data с рассчитанными метриками...")
-    union_data = union_data.merge(sales_metrics, on='kod', how='left')
-
-    # Calculate 'min_stock' based on the given logic
-    def calculate_min_stock(row):
-        if pd.isna(row['mean_sales_last_12_months']) or pd.isna(row['std_sales_last_12_months']):
-            return 0  # Return 0 if no data for calculations
-
-        if row['abc'] in ['A', 'A1']:
-            return round((row['mean_sales_last_12_months'] * 1 + row['std_sales_last_12_months']) + 0.49)
-        elif row['abc'] == 'B':
-            return round((row['mean_sales_last_12_months'] * 1 + row['std_sales_last_12_months']) + 0.49)
-        elif row['mean_sales_last_12_months'] == 0:
-            return 1
-        else:
-            return round((row['mean_sales_last_12_months'] + row['std_sales_last_12_months']) + 0.49)
-
-    print("Вычисление начальных значений min_stock...")
-    union_data['min_stock'] = union_data.apply(calculate_min_stock, axis=1)
+def fill_current_month_data(
+    sales_data: pd.DataFrame, union_data: pd.DataFrame, current_period: pd.Period) -> pd.DataFrame:
+    """
+    Заполняет price и balance текущего месяца из tsenarozn и osnsklad первой строки union_data с тем же kod.
 
-    # Calculate 'min_stock' for each gruppa_analogov based on the same logic
-    def calculate_min_stock_for_group(gruppa_analogov, union_data, sales_data):
-        # Filter union_data for the given gruppa_analogov
-        group_data = union_data[union_data["gruppa_analogov"] == gruppa_analogov]
+    price заполняется только там, где он пуст, а total_sales и balance известны;
+    balance заменяется, если osnsklad больше нуля.
+    """
+    sales_data = sales_data.copy()
+    first_rows = union_data.drop_duplicates("kod").set_index("kod")
+    tsenarozn = sales_data["kod"].map(first_rows["tsenarozn"]).to_numpy()
+    osnsklad = sales_data["kod"].map(first_rows["osnsklad"]).to_numpy()
+    is_current = (sales_data["year_month"] == current_period).to_numpy()
+
+    fill_price = (
+        is_current
+        & sales_data["price"].isna().to_numpy()
+        & sales_data["total_sales"].notna().to_numpy()
+        & sales_data["balance"].notna().to_numpy()
+    )
+    fill_balance = is_current & (osnsklad > 0)
+    sales_data.loc[fill_price, "price"] = tsenarozn[fill_price]
+    sales_data.loc[fill_balance, "balance"] = osnsklad[fill_balance]
+    return sales_data
 
-        # Use sales_data to calculate mean and std only for this gruppa_analogov
-        sales_group_data = sales_data[sales_data["kod"].isin(group_data["kod"])].copy()
 
-        # Fill missing values in 'total_sales' and 'balance' with 0
-        sales_group_data["total_sales_filled"] = sales_group_data["total_sales"].fillna(0)
-        sales_group_data["balance_filled"] = sales_group_data["balance"].fillna(0)
+def calculate_kod_sales_metrics(
+    sales_data: pd.DataFrame, current_period: pd.Period, reference_year: int) -> pd.DataFrame:
+    """
+    Метрики продаж по каждому kod, вычисленные масками по всей таблице sales_data сразу.
 
-        mean_sales_last_12_months = (
-            sales_group_data["total_sales_filled"].sum() / sales_group_data.shape[0]
-            if sales_group_data.shape[0] > 0
-            else 0
-        )
-        std_sales_last_12_months = (
-            sales_group_data["total_sales_filled"].std()
-            if sales_group_data.shape[0] > 0
-            else 0
+    Суммы и отклонения считаются так же, как при обходе групп groupby('kod'),
+    вплоть до порядка сложения, поэтому результат совпадает побитно.
+    """
+    codes, kods = pd.factorize(sales_data["kod"], sort=True)
+    groups = len(kods)
+    valid = codes >= 0
+    codes = codes[valid]
+    sales_data = sales_data[valid]
+
+    total_sales = sales_data["total_sales"].fillna(0).to_numpy(dtype=np.float64)
+    balance = sales_data["balance"].fillna(0).to_numpy(dtype=np.float64)
+    no_sales = sales_data["total_sales"].isna().to_numpy() | (total_sales <= 0)
+    year_month = pd.PeriodIndex(sales_data["year_month"], freq="M")
+    has_month = ~year_month.isna()
+    months = year_month.asi8
+    current = current_period.ordinal
+
+    last_12 = has_month & (months > current - 12) & (months <= current)
+    last_3 = has_month & (months > current - 3) & (months <= current)
+
+    # Август, сентябрь и октябрь прошлого и двух предыдущих лет
+    season_last_year = [pd.Period(f"{reference_year - 1}-{month:02d}", freq="M").ordinal for month in range(8, 11)]
+    season_two_years_ago = [month - 12 for month in season_last_year]
+    season_three_years_ago = [month - 24 for month in season_last_year]
+
+    def masked_sums(mask):
+        return _group_sums(total_sales[mask], codes[mask], groups)
+
+    def masked_extreme(mask, reducer):
+        result = np.full(groups, np.nan)
+        reducer.at(result, codes[mask], total_sales[mask])
+        return result
+
+    # Месяцы последнего года, где были продажи или остаток > 0
+    active = last_12 & ((balance > 0) | (total_sales > 0))
+    active_counts = np.bincount(codes[active], minlength=groups)
+    active_sums = masked_sums(active)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_sales = active_sums / active_counts
+        deviations = (mean_sales[codes[active]] - total_sales[active]) ** 2
+        variance = _group_sums(deviations, codes[active], groups) / np.where(
+            active_counts > 1, active_counts - 1, np.nan
         )
+    std_sales = np.sqrt(variance)
+    mean_sales[active_counts == 0] = 0
+    std_sales[active_counts == 0] = 0
 
-        if pd.isna(mean_sales_last_12_months) or pd.isna(std_sales_last_12_months):
-            return 0
+    month_counts = (
+        pd.Series(year_month, copy=False).groupby(codes).nunique().reindex(range(groups), fill_value=0).to_numpy()
+    )
+    missed = np.bincount(codes[(balance > 0) & no_sales], minlength=groups)
+    months_without_sales = np.where(_group_sums(total_sales, codes, groups) == 0, month_counts, missed)
+
+    last_sale = np.full(groups, np.iinfo(np.int64).min)
+    sold = has_month & (total_sales > 0)
+    np.maximum.at(last_sale, codes[sold], months[sold])
+    months_since_last_sale = np.where(
+        last_sale == np.iinfo(np.int64).min, month_counts, current - last_sale
+    )
 
-        if group_data["abc"].iloc[0] in ["A", "A1"]:
-            return round((mean_sales_last_12_months * 1 + std_sales_last_12_months) + 0.49)
-        elif group_data["abc"].iloc[0] == "B":
-            return round((mean_sales_last_12_months * 1 + std_sales_last_12_months) + 0.49)
-        elif mean_sales_last_12_months == 0:
-            return 1
-        else:
-            return round((mean_sales_last_12_months + std_sales_last_12_months) + 0.49)
+    sales_metrics = pd.DataFrame(
+        {
+            "kod": kods,
+            "total_sales_last_12_months": masked_sums(last_12),
+            "total_sales_last_3_months": masked_sums(last_3),
+            "sum_sales_last_year": masked_sums(np.isin(months, season_last_year) & has_month),
+            "sum_sales_two_years_ago": masked_sums(np.isin(months, season_two_years_ago) & has_month),
+            "sum_sales_three_years_ago": masked_sums(np.isin(months, season_three_years_ago) & has_month),
+            "mean_sales_last_12_months": mean_sales,
+            "std_sales_last_12_months": std_sales,
+            "months_without_sales": months_without_sales.astype(np.int64),
+            "months_since_last_sale": months_since_last_sale.astype(np.int64),
+            "max_sales_last_12_months": masked_extreme(last_12, np.fmax),
+            "min_sales_last_12_months": masked_extreme(last_12 & (total_sales > 0), np.fmin),
+        }
+    )
+    if groups and not active_counts.any():
+        # Без активных месяцев среднее и отклонение — целые нули, как при построчном расчете
+        sales_metrics[["mean_sales_last_12_months", "std_sales_last_12_months"]] = 0
+    return sales_metrics
 
-    print("Вычисление начальных значений min_stock для каждой gruppa_analogov...")
-    # Get unique gruppa_analogov from union_data and calculate min_stock for each
-    unique_groups = union_data['gruppa_analogov'].unique()
-    min_stock_group_values = {
-        group: calculate_min_stock_for_group(group, union_data, sales_data) for group in unique_groups
-    }
 
-    # Apply calculated min_stock_group values to the union_data
-    union_data['min_stock_group'] = union_data['gruppa_analogov'].map(min_stock_group_values)
+def _group_sums(values: np.ndarray, codes: np.ndarray, groups: int) -> np.ndarray:
+    """
+    Суммы values по кодам групп с тем же округлением, что у Series.sum для каждой группы.
 
-    def recalculate_for_group_analogues(union_data, sales_data):
-        # Шаг 1: Выбираем группы аналогов с 2 и более позициями
-        group_counts = union_data.groupby('gruppa_analogov')['kod'].count()
-        valid_groups = group_counts[group_counts >= 2].index
+    numpy складывает одномерный массив попарно, и результат зависит от длины,
+    поэтому группы одной длины суммируются построчно в одном двумерном блоке.
+    """
+    order = np.argsort(codes, kind="stable")
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=groups)
+    starts = np.cumsum(counts) - counts
+    sums = np.zeros(groups)
+    for size in np.unique(counts[counts > 0]):
+        members = np.flatnonzero(counts == size)
+        sums[members] = sorted_values[starts[members, None] + np.arange(size)].sum(axis=1)
+    return sums
+
+
+# Фразы в naimenovanie, при которых min_stock делается четным (детали ставятся парами)
+MIN_STOCK_EVEN_PHRASES = (
+    "пружина амортизатора",
+    "пружина задней подвески",
+    "rh/lh",
+    "lh/rh",
+    "fr/rr",
+    "втулка поперечного стабилизатора",
+    "рем. ком. суппорта",
+    "подшипник опоры стойки",
+    "опора задней стойки",
+    "опора передней стойки",
+)
+# Начала naimenovanie, при которых min_stock округляется вверх до кратного 4
+MIN_STOCK_FOUR_PREFIXES = ("свеча зажигания", "свеча накала")
+
+
+def min_stock_rule(mean_sales, std_sales, abc) -> np.ndarray:
+    """
+    Базовое правило min_stock: round(mean + std + 0.49) с округлением к четному, как у round().
 
-        # Фильтруем данные по валидным группам
-        union_data_filtered = union_data[union_data['gruppa_analogov'].isin(valid_groups)].copy()
+    Без данных для расчета min_stock равен 0, при нулевом среднем вне классов A, A1 и B — 1.
+    """
+    mean_sales = np.asarray(mean_sales, dtype=np.float64)
+    std_sales = np.asarray(std_sales, dtype=np.float64)
+    frequent = pd.Series(abc, copy=False).isin(["A", "A1", "B"]).to_numpy()
+    missing = np.isnan(mean_sales) | np.isnan(std_sales)
+    min_stock = np.round(np.where(missing, 0, mean_sales + std_sales + 0.49))
+    min_stock[~frequent & (mean_sales == 0)] = 1
+    min_stock[missing] = 0
+    return min_stock.astype(np.int64)
 
-        # Шаг 2: Сложить min_stock для всех позиций одной группы аналогов и сравнить с min_stock_group
-        group_min_stock_sum = union_data_filtered.groupby('gruppa_analogov')['min_stock'].sum().reset_index()
-        group_min_stock_sum = group_min_stock_sum[group_min_stock_sum['min_stock'] >= 5]
 
-        union_data_filtered = pd.merge(union_data_filtered, group_min_stock_sum, on='gruppa_analogov', how='inner', suffixes=('', '_sum'))
+def calculate_group_min_stock(union_data: pd.DataFrame, sales_data: pd.DataFrame) -> pd.Series:
+    """
+    min_stock каждой gruppa_analogov по всем строкам продаж ее kod; abc берется из первой строки группы.
+    """
+    group_codes, _ = pd.factorize(union_data["gruppa_analogov"])
+    groups = group_codes.max() + 1 if len(group_codes) else 0
+    in_group = group_codes >= 0
+    keys, rows = _sales_rows_by_key(union_data["kod"].to_numpy()[in_group], group_codes[in_group], sales_data)
 
-        # Шаг 3: Фильтруем только те группы, у которых сумма min_stock больше на 30% чем min_stock_group
-        union_data_filtered['min_stock_diff'] = (union_data_filtered['min_stock_sum'] - union_data_filtered['min_stock_group']) / union_data_filtered['min_stock_group'] * 100
-        kods_for_recalculation = union_data_filtered[union_data_filtered['min_stock_diff'] > 30]['kod'].unique()
+    total_sales = sales_data["total_sales"].fillna(0).to_numpy(dtype=np.float64)[rows]
+    row_counts = np.bincount(keys, minlength=groups)
+    mean_sales, std_sales = _group_mean_std(total_sales, keys, groups)
+    mean_sales[row_counts == 0] = 0
+    std_sales[row_counts == 0] = 0
 
-        print(f"Найдено {len(kods_for_recalculation)} kod для перерасчетов.")
+    first_rows = in_group & ~pd.Series(group_codes).duplicated().to_numpy()
+    first_abc = np.full(groups, None, dtype=object)
+    first_abc[group_codes[first_rows]] = union_data["abc"].to_numpy(dtype=object)[first_rows]
+    group_min_stock = min_stock_rule(mean_sales, std_sales, first_abc)
 
-        # Шаг 4: Пересчет mean_sales_last_12_months и std_sales_last_12_months для выбранных kod
-        def recalculate_sales_metrics_for_kod(group, sales_data):
-            # Получаем список kod из группы аналогов, которые в наличии
-            kod_in_stock = group[group['osnsklad'] > 0]['kod'].unique()
+    if in_group.all():
+        return pd.Series(group_min_stock[group_codes], index=union_data.index)
+    return pd.Series(np.where(in_group, group_min_stock[group_codes], np.nan), index=union_data.index)
 
-            # Если нет позиций в наличии, пропускаем эту группу
-            if len(kod_in_stock) == 0:
-                return union_data
 
-            # Ищем месяцы, где были продажи или баланс > 0 для каждого kod
-            def find_valid_months(kod):
-                valid_months = sales_data[(sales_data['kod'] == kod) &
-                                      ((sales_data['balance'] > 0) | (sales_data['total_sales'] > 0))]['year_month'].unique()
-                return valid_months
+def recalculate_for_group_analogues(
+    union_data: pd.DataFrame, sales_data: pd.DataFrame, current_period: pd.Period) -> pd.DataFrame:
+    """
+    Пересчитывает среднее и отклонение продаж kod в наличии по месяцам, общим для группы аналогов.
 
-            # Находим месяцы, где позиции были в наличии
-            kod_to_valid_months = {kod: find_valid_months(kod) for kod in kod_in_stock}
+    Пересчет идет в группах из 2 и более позиций с суммой min_stock от 5; min_stock заново
+    вычисляется у kod групп, где эта сумма больше min_stock_group более чем на 30%.
+    Если kod входит в несколько групп, остаются метрики последней из них.
+    """
+    group_codes, _ = pd.factorize(union_data["gruppa_analogov"])
+    groups = group_codes.max() + 1 if len(group_codes) else 0
+    in_group = group_codes >= 0
+    kods = union_data["kod"].to_numpy(dtype=object)
+    min_stock = union_data["min_stock"].to_numpy()
+
+    # Шаг 1-2: группы из 2 и более позиций с суммой min_stock не меньше 5
+    group_sizes = np.bincount(group_codes[in_group & union_data["kod"].notna().to_numpy()], minlength=groups)
+    stock_sums = np.zeros(groups, dtype=min_stock.dtype)
+    np.add.at(stock_sums, group_codes[in_group], min_stock[in_group])
+    eligible = np.zeros(len(union_data), dtype=bool)
+    eligible[in_group] = ((group_sizes >= 2) & (stock_sums >= 5))[group_codes[in_group]]
+
+    # Шаг 3: группы, у которых сумма min_stock больше min_stock_group на 30%
+    group_min_stock = union_data["min_stock_group"].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stock_diff = (stock_sums[group_codes] - group_min_stock) / group_min_stock * 100
+    kods_for_recalculation = pd.unique(kods[eligible & (stock_diff > 30)])
+    print(f"Найдено {len(kods_for_recalculation)} kod для перерасчетов.")
+
+    # Шаг 4: kod в наличии и месяцы, в которых продажи или остаток были у всех них
+    in_stock = eligible & (union_data["osnsklad"] > 0).to_numpy()
+    pairs = pd.DataFrame({"group": group_codes[in_stock], "kod": kods[in_stock]}).drop_duplicates(ignore_index=True)
+    kods_in_stock = np.bincount(pairs["group"], minlength=groups)
+
+    months = pd.PeriodIndex(sales_data["year_month"], freq="M").asi8
+    available = ((sales_data["balance"] > 0) | (sales_data["total_sales"] > 0)).to_numpy()
+    valid_months = pd.DataFrame(
+        {"kod": sales_data["kod"].to_numpy(dtype=object)[available], "month": months[available]}
+    ).drop_duplicates()
+    month_kods = pairs.merge(valid_months, on="kod").groupby(["group", "month"]).size().reset_index(name="kods")
+    common_months = month_kods.loc[
+        month_kods["kods"].to_numpy() == kods_in_stock[month_kods["group"]], ["group", "month"]
+    ]
+    # Если общих месяцев нет, используется текущий месяц
+    without_common = np.setdiff1d(pairs["group"].unique(), common_months["group"].unique())
+    common_months = pd.concat(
+        [common_months, pd.DataFrame({"group": without_common, "month": current_period.ordinal})],
+        ignore_index=True,
+    )
 
-            # Находим общие месяцы, где несколько kod были в наличии
-            common_months = set(kod_to_valid_months[kod_in_stock[0]])  # Начинаем с первого kod
-            for kod in kod_in_stock[1:]:
-                common_months.intersection_update(kod_to_valid_months[kod])
+    sales_rows = pd.DataFrame(
+        {"kod": sales_data["kod"].to_numpy(dtype=object), "month": months, "row": np.arange(len(sales_data))}
+    )
+    matched = (
+        sales_rows.merge(pairs.reset_index(names="pair"), on="kod")
+        .merge(common_months, on=["group", "month"])
+        .sort_values(["row", "pair"], kind="stable")
+    )
+    pair_keys = matched["pair"].to_numpy()
+    total_sales = sales_data["total_sales"].to_numpy(dtype=np.float64, na_value=np.nan)[matched["row"].to_numpy()]
+    mean_sales, std_sales = _group_mean_std(total_sales, pair_keys, len(pairs))
+    empty = np.bincount(pair_keys, minlength=len(pairs)) == 0
+    mean_sales[empty] = 0
+    std_sales[empty] = 0
+
+    # Группы обрабатываются в порядке первого появления, поэтому для kod побеждает последняя
+    recalculated = pd.DataFrame({"kod": pairs["kod"], "mean": mean_sales, "std": std_sales}).drop_duplicates(
+        "kod", keep="last"
+    ).set_index("kod")
+    updated = union_data["kod"].isin(recalculated.index).to_numpy()
+    updated_kods = union_data["kod"][updated]
+    union_data.loc[updated, "mean_sales_last_12_months"] = updated_kods.map(recalculated["mean"])
+    union_data.loc[updated, "std_sales_last_12_months"] = updated_kods.map(recalculated["std"])
+
+    recalculate = union_data["kod"].isin(kods_for_recalculation).to_numpy()
+    union_data.loc[recalculate, "min_stock"] = min_stock_rule(
+        union_data["mean_sales_last_12_months"].to_numpy()[recalculate],
+        union_data["std_sales_last_12_months"].to_numpy()[recalculate],
+        union_data["abc"].to_numpy(dtype=object)[recalculate],
+    )
+    print("Перерасчет завершен.")
+    return union_data
 
-            # Если не найдено общих месяцев, используем текущий месяц
-            if len(common_months) == 0:
-                common_months = [current_period]
 
-            # Фильтруем sales_data по общим месяцам
-            sales_filtered = sales_data[(sales_data['kod'].isin(kod_in_stock)) &
-                                        (sales_data['year_month'].isin(common_months))]
+def make_min_stock_even(naimenovanie: pd.Series, min_stock: np.ndarray) -> np.ndarray:
+    """
+    Делает min_stock четным для парных деталей и кратным 4 для свечей.
 
-            # Пересчет метрик для каждого kod
-            for kod in kod_in_stock:
-                kod_sales_data = sales_filtered[sales_filtered['kod'] == kod]
-                mean_sales = kod_sales_data['total_sales'].mean() if not kod_sales_data.empty else 0
-                std_sales = kod_sales_data['total_sales'].std() if not kod_sales_data.empty else 0
+    Кратность 4 проверяется, только если правило четности не сработало.
+    """
+    naimenovanie = naimenovanie.str.lower()
+    paired = np.zeros(len(naimenovanie), dtype=bool)
+    for phrase in MIN_STOCK_EVEN_PHRASES:
+        paired |= naimenovanie.str.contains(phrase, regex=False).fillna(False).to_numpy(dtype=bool)
+    four_pack = naimenovanie.str.startswith(MIN_STOCK_FOUR_PREFIXES).fillna(False).to_numpy(dtype=bool)
 
-                # Обновляем значения в union_data
-                union_data.loc[union_data['kod'] == kod, 'mean_sales_last_12_months'] = mean_sales
-                union_data.loc[union_data['kod'] == kod, 'std_sales_last_12_months'] = std_sales
+    make_even = paired & (min_stock % 2 != 0)
+    round_up_to_four = ~make_even & four_pack & (min_stock % 4 != 0)
+    min_stock = np.where(make_even, min_stock + 1, min_stock)
+    return np.where(round_up_to_four, (min_stock // 4 + 1) * 4, min_stock)
 
-            return union_data
 
-        for gruppa_analogov in union_data_filtered['gruppa_analogov'].unique():
-            group = union_data_filtered[union_data_filtered['gruppa_analogov'] == gruppa_analogov]
-            union_data = recalculate_sales_metrics_for_kod(group, sales_data)
+def adjust_min_stock_to_last_year(
+    union_data: pd.DataFrame, sales_data: pd.DataFrame, current_period: pd.Period, min_stock: np.ndarray) -> np.ndarray:
+    """
+    Поднимает min_stock до максимума продаж kod в том же месяце прошлого года и в соседних с ним.
+    """
+    same_month = pd.Period(f"{current_period.year - 1}-{current_period.month:02d}", freq="M").ordinal
+    months = pd.PeriodIndex(sales_data["year_month"], freq="M").asi8
+    window = np.isin(months, [same_month - 1, same_month, same_month + 1])
+    last_year_max = sales_data.loc[window, "total_sales"].groupby(sales_data.loc[window, "kod"]).max()
+    relevant_sales = union_data["kod"].map(last_year_max).to_numpy(dtype=np.float64, na_value=np.nan)
+    return _replace_where(min_stock, relevant_sales > min_stock, relevant_sales)
 
-        # Теперь вместо recalculate_min_stock_after_metrics используем calculate_min_stock
-        union_data.loc[union_data['kod'].isin(kods_for_recalculation), 'min_stock'] = \
-            union_data.loc[union_data['kod'].isin(kods_for_recalculation)].apply(calculate_min_stock, axis=1)
 
-        print("Перерасчет завершен.")
+def adjust_min_stock_by_margin(union_data: pd.DataFrame, min_stock: np.ndarray) -> np.ndarray:
+    """
+    Заменяет min_stock минимумом продаж за год при низкой или неизвестной наценке
+    (до 36% при цене до 10000) и максимумом при наценке выше 70%.
+    """
+    tsenarozn = union_data["tsenarozn"].to_numpy(dtype=np.float64, na_value=np.nan)
+    deliveryprice = union_data["deliveryprice"].to_numpy(dtype=np.float64, na_value=np.nan)
+    min_sales = union_data["min_sales_last_12_months"].to_numpy(dtype=np.float64, na_value=np.nan)
+    max_sales = union_data["max_sales_last_12_months"].to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        margin = (tsenarozn - deliveryprice) / deliveryprice * 100
+    no_margin = np.isnan(margin)
+
+    use_min = (no_margin | ((margin < 36) & (tsenarozn <= 10000))) & (min_sales > 0)
+    use_max = ~use_min & ~no_margin & (margin > 70) & (max_sales > 0)
+    min_stock = _replace_where(min_stock, use_min, min_sales)
+    return _replace_where(min_stock, use_max, max_sales)
+
+
+def correct_min_stock_for_single_sale(
+    union_data: pd.DataFrame, sales_data: pd.DataFrame, current_period: pd.Period, min_stock: np.ndarray) -> np.ndarray:
+    """
+    Ставит min_stock = 1, если за последние 12 месяцев остаток kod всегда был больше нуля,
+    а продажи были ровно в одном месяце.
+    """
+    months = pd.PeriodIndex(sales_data["year_month"], freq="M").asi8
+    window = (months > current_period.ordinal - 12) & (months <= current_period.ordinal)
+    last_year = pd.DataFrame(
+        {
+            "empty": ~(sales_data["balance"] > 0).to_numpy()[window],
+            "sold": (sales_data["total_sales"] > 0).to_numpy()[window],
+        }
+    ).groupby(sales_data["kod"].to_numpy(dtype=object)[window]).sum()
+    single_sale = (last_year["empty"] == 0) & (last_year["sold"] == 1)
+    correct = union_data["kod"].map(single_sale).fillna(False).to_numpy(dtype=bool)
+    return np.where(correct, 1, min_stock)
+
+
+def calculate_min_stock(
+    union_data: pd.DataFrame, sales_data: pd.DataFrame, deliveryminprice: pd.DataFrame,
+    current_period: pd.Period) -> pd.DataFrame:
+    """
+    Цепочка правил min_stock; каждое правило — выражение над столбцами union_data целиком.
+    """
+    print("Вычисление начальных значений min_stock...")
+    union_data["min_stock"] = min_stock_rule(
+        union_data["mean_sales_last_12_months"], union_data["std_sales_last_12_months"], union_data["abc"]
+    )
 
-        return union_data
+    print("Вычисление начальных значений min_stock для каждой gruppa_analogov...")
+    union_data["min_stock_group"] = calculate_group_min_stock(union_data, sales_data)
 
     print("Пересчитываем средние продажи и отклонения...")
-    union_data = recalculate_for_group_analogues(union_data, sales_data)
+    union_data = recalculate_for_group_analogues(union_data, sales_data, current_period)
 
     # Присоединение таблицы deliveryminprice по полю kod
     print("Присоединение таблицы deliveryminprice...")
@@ -324,106 +412,75 @@ def calculate_sales_metrics(
     union_data = union_data.merge(
         deliveryminprice[["kod", "deliveryprice"]], on="kod", how="left"
     )
-
-    # Adjust 'min_stock' to be even if certain phrases are in 'naimenovanie'
-    def make_min_stock_even(row):
-        phrases = [
-            "пружина амортизатора",
-            "пружина задней подвески",
-            "rh/lh",
-            "lh/rh",
-            "fr/rr",
-            "втулка поперечного стабилизатора",
-            "рем. ком. суппорта",
-            "подшипник опоры стойки",
-            "опора задней стойки",
-            "опора передней стойки",
-        ]
-        naimenovanie_lower = row["naimenovanie"].lower()  # Приводим naimenovanie к нижнему регистру
-
-        # Проверка на определенные фразы и приведение к четному значению
-        if any(phrase in naimenovanie_lower for phrase in phrases) and row["min_stock"] % 2 != 0:
-            return row["min_stock"] + 1  # Сделать четным, добавив 1
-
-        # Проверка для строк, начинающихся со "Свеча зажигания" или "Свеча накала"
-        if naimenovanie_lower.startswith("свеча зажигания") or naimenovanie_lower.startswith("свеча накала"):
-            if row["min_stock"] % 4 != 0:
-                return (row["min_stock"] // 4 + 1) * 4  # Округление до кратного 4 в большую сторону
-
-        return row["min_stock"]
+    min_stock = union_data["min_stock"].to_numpy()
 
     print("Корректировка min_stock на четное значение для определенных наименований...")
-    union_data["min_stock"] = union_data.apply(make_min_stock_even, axis=1)
+    min_stock = make_min_stock_even(union_data["naimenovanie"], min_stock)
 
-    # Adjust 'min_stock' based on sales data from the previous year
-    def adjust_min_stock(row):
-        current_month = current_period.month
-        last_year_same_month = pd.Period(f"{current_period.year - 1}-{current_month:02d}", freq='M')
-        last_year_month_minus_1 = last_year_same_month - 1
-        last_year_month_plus_1 = last_year_same_month + 1
+    print("Корректировка min_stock на основе данных о продажах за прошлый год...")
+    min_stock = adjust_min_stock_to_last_year(union_data, sales_data, current_period, min_stock)
 
-        # Find sales for the specified periods
-        relevant_sales = sales_data[
-            (sales_data['kod'] == row['kod']) &
-            (sales_data['year_month'].isin([last_year_same_month, last_year_month_minus_1, last_year_month_plus_1]))
-        ]['total_sales'].max()
+    print("Корректировка min_stock на основе наценки и наличия цены поставщика...")
+    min_stock = adjust_min_stock_by_margin(union_data, min_stock)
 
-        if pd.notna(relevant_sales) and relevant_sales > row['min_stock']:
-            return relevant_sales
-        return row['min_stock']
+    min_stock = correct_min_stock_for_single_sale(union_data, sales_data, current_period, min_stock)
+    union_data["min_stock"] = make_min_stock_even(union_data["naimenovanie"], min_stock)
+    return union_data
 
-    print("Корректировка min_stock на основе данных о продажах за прошлый год...")
-    union_data['min_stock'] = union_data.apply(adjust_min_stock, axis=1)
 
-    def adjust_min_stock_based_on_margin(row):
-        # Рассчитываем наценку, если цены присутствуют
-        if pd.isna(row['deliveryprice']) or pd.isna(row['tsenarozn']):
-            margin = None
-        else:
-            margin = (row['tsenarozn'] - row['deliveryprice']) / row['deliveryprice'] * 100
+def _sales_rows_by_key(kods: np.ndarray, keys: np.ndarray, sales_data: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Строки sales_data для каждого ключа, к которому отнесен их kod: ключи и позиции строк.
 
-        # Проверка условия для корректировки на минимальное значение
-        if (pd.isna(margin) or (margin < 36 and row['tsenarozn'] <= 10000)) and pd.notna(row['min_sales_last_12_months']) and row['min_sales_last_12_months'] > 0:
-            return row['min_sales_last_12_months']
+    Внутри ключа строки идут в исходном порядке, как после фильтра sales_data по isin.
+    """
+    pairs = pd.DataFrame({"kod": kods, "key": keys}).drop_duplicates()
+    sales_rows = pd.DataFrame({"kod": sales_data["kod"].to_numpy(dtype=object), "row": np.arange(len(sales_data))})
+    matched = sales_rows.merge(pairs, on="kod").sort_values(["row", "key"], kind="stable")
+    return matched["key"].to_numpy(), matched["row"].to_numpy()
 
-        # Проверка условия для корректировки на максимальное значение, только если margin не NaN
-        elif pd.notna(margin) and margin > 70 and pd.notna(row['max_sales_last_12_months']) and row['max_sales_last_12_months'] > 0:
-            return row['max_sales_last_12_months']
 
-        # Если условия не выполнены, возвращаем текущее значение min_stock
-        else:
-            return row['min_stock']
+def _group_mean_std(values: np.ndarray, codes: np.ndarray, groups: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Series.mean() и Series.std() каждой группы с пропуском NaN и тем же порядком сложения.
+    """
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0)
+    counts = np.bincount(codes[present], minlength=groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = _group_sums(filled, codes, groups) / counts
+        deviations = np.where(present, (mean[codes] - filled) ** 2, 0)
+        variance = _group_sums(deviations, codes, groups) / np.where(counts > 1, counts - 1, np.nan)
+    return mean, np.sqrt(variance)
 
-    print("Корректировка min_stock на основе наценки и наличия цены поставщика...")
-    union_data['min_stock'] = union_data.apply(adjust_min_stock_based_on_margin, axis=1)
 
-    def correct_min_stock_based_on_balance_and_sales(union_data, sales_data):
-        # Текущий период
-        current_period = pd.Period(datetime.now().strftime("%Y-%m"), freq="M")
-        twelve_months_ago = current_period - 12
+def _replace_where(min_stock: np.ndarray, mask: np.ndarray, values: np.ndarray) -> np.ndarray:
+    # Целый min_stock становится дробным, только если хотя бы одно значение заменено
+    if not mask.any():
+        return min_stock
+    return np.where(mask, values, min_stock)
 
-        # Проходим по каждой позиции для проверки условий
-        def check_and_correct(row):
-            # Получаем данные за последний год для конкретного kod
-            kod_sales_data = sales_data[(sales_data["kod"] == row["kod"]) & 
-                                    (sales_data["year_month"] > twelve_months_ago) & 
-                                    (sales_data["year_month"] <= current_period)]
 
-            # Условие: balance всегда > 0 и продажи были в одном месяце (неважно, сколько продали)
-            if (kod_sales_data["balance"] > 0).all() and kod_sales_data["total_sales"].gt(0).sum() == 1:
-                row["min_stock"] = 1  # Устанавливаем min_stock в 1
+def calculate_sales_metrics(
+    sales_data: pd.DataFrame, union_data: pd.DataFrame, deliveryminprice: pd.DataFrame) -> pd.DataFrame:
+    # Use the current date as the reference date
+    reference_date = datetime.now()
+    current_period = pd.Period(reference_date.strftime("%Y-%m"), freq="M")
 
-            return row
+    # Отладочная информация
+    print("Начинаем расчет метрик продаж...")
 
-        # Применяем корректировку по каждому ряду
-        union_data = union_data.apply(check_and_correct, axis=1)
+    # Заполняем значения price и balance текущего месяца из tsenarozn и osnsklad
+    sales_data = fill_current_month_data(sales_data, union_data, current_period)
 
-        # Применяем корректировку make_min_stock_even для этих позиций
-        union_data["min_stock"] = union_data.apply(make_min_stock_even, axis=1)
+    print("Происходит расчет метрик средних продаж, отклонений, суммарных продаж в разные периоды, время с последней продажи и т.п...")
+    sales_metrics = calculate_kod_sales_metrics(sales_data, current_period, reference_date.year)
 
-        return union_data
+    # Merge with union_data
+    print("Объединение данных union_data с рассчитанными метриками...")
+    union_data = union_data.merge(sales_metrics, on='kod', how='left')
 
-    union_data = correct_min_stock_based_on_balance_and_sales(union_data, sales_data)
+    union_data = calculate_min_stock(union_data, sales_data, deliveryminprice, current_period)
 
     print("Завершено!")
     return union_data
@@ -452,5 +509,5 @@ if __name__ == "__main__":
     # Сохранение данных в базу данных,
     
     print("Сохранение результатов в базу данных...")
-    union_data.to_sql('full_statistic', con=engine, if_exists='replace', index=False)
-    print("Данные успешно сохранены в таблицу 'full_statistic'.")
+    result = write_frame(union_data, 'full_statistic', engine, if_exists='replace', index=False)
+    print(f"Данные успешно сохранены в таблицу 'full_statistic': {result.describe()}.")
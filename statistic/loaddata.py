@@ -1,5 +1,15 @@
 import pandas as pd
 import numpy as np
+from sqlalchemy import text
+from ugkorea.db.tablecache import read_table
+from ugkorea.reglament_task.one_c_receiver_runtime.partitions import TEXT_PERIOD_FUNCTION, text_period_expression
+
+# Границы накопленной доли (%) для ABC и XYZ: до 10% — A1/X1, до 80% — A/X, до 95% — B/Y, дальше — C/Z
+ABC_XYZ_THRESHOLDS = (10, 80, 95)
+ABC_LABELS = ('A1', 'A', 'B', 'C')
+XYZ_LABELS = ('X1', 'X', 'Y', 'Z')
+# Число после удаления пробелов и замены запятой на точку; остальное считается нулем
+NUMBER_PATTERN = r'^[+-]?([0-9]+([.][0-9]*)?|[.][0-9]+)([eE][+-]?[0-9]+)?$'
 
 # Функция для удаления пробелов
 def trim_whitespace(df):
@@ -9,16 +19,16 @@ def trim_whitespace(df):
 
 def load_and_process_data(engine):
     # Загрузка данных из таблиц
-    nomenklaturaold = pd.read_sql_table('nomenklaturaold', engine)
-    nomenklatura = pd.read_sql_table('nomenklatura', engine)
-    stockold = pd.read_sql_table('stockold', engine)
-    priceold = pd.read_sql_table('priceold', engine)
-    prodazhi = pd.read_sql_table('prodazhi', engine)
-    postuplenija = pd.read_sql_table('postuplenija', engine)
-    stockendmonth = pd.read_sql_table('stockendmonth', engine)
-    priceendmonth = pd.read_sql_table('priceendmonth', engine)  # Добавлена загрузка таблицы priceendmonth
-    groupanalogiold = pd.read_sql_table('groupanalogiold', engine)
-    typedetailgen = pd.read_sql_table('typedetailgen', engine)
+    nomenklaturaold = read_table(engine, 'nomenklaturaold', ['kod', 'naimenovanie', 'artikul', 'proizvoditel', 'edizm', 'pometkaudalenija'])
+    nomenklatura = read_table(engine, 'nomenklatura', ['kod', 'datasozdanija', 'roditel', 'vidnomenklatury'])
+    stockold = read_table(engine, 'stockold')
+    priceold = read_table(engine, 'priceold')
+    prodazhi = read_table(engine, 'prodazhi', ['kod', 'kolichestvo', 'period'])
+    postuplenija = read_table(engine, 'postuplenija', ['kod', 'kolichestvo', 'data', 'proveden'])
+    stockendmonth = read_table(engine, 'stockendmonth', ['nomenklaturakod', 'month', 'balance'])
+    priceendmonth = read_table(engine, 'priceendmonth', ['kod', 'data', 'tsena'])  # Добавлена загрузка таблицы priceendmonth
+    groupanalogiold = read_table(engine, 'groupanalogiold')
+    typedetailgen = read_table(engine, 'typedetailgen')
 
     # Удаление пробелов сначала и конца у каждой строковой колонки
     nomenklaturaold = trim_whitespace(nomenklaturaold)
@@ -165,111 +175,84 @@ def get_final_data(engine):
     return final_data, nomenklatura_ml
 
 
-def perform_abc_xyz_analysis(engine):
-    import pandas as pd
-
-    # Вспомогательная функция для очистки и преобразования колонки summa и kolichestvo
-    def clean_and_convert_columns(df):
-        # Удаляем пробелы и преобразуем строки в числовой формат
-        df["summa"] = (
-            df["summa"]
-            .astype(str)
-            .str.replace("\s", "", regex=True)
-            .str.replace(",", ".")
+def load_sales_totals(engine, start):
+    """
+    Суммы summa и kolichestvo по kod товаров (vidnomenklatury = 'Товар') за продажи с period >= start.
+
+    Очистка чисел повторяет прежнюю в pandas: пробелы удаляются, запятая заменяется
+    точкой, нечисловые значения считаются нулем.  Окно отбирается по выражению
+    one_c_text_period(period), для которого загрузчик строит индекс.
+    """
+    with engine.connect() as connection:
+        has_function = connection.execute(
+            text("SELECT to_regprocedure(:signature) IS NOT NULL"),
+            {"signature": f"{TEXT_PERIOD_FUNCTION}(text)"},
+        ).scalar_one()
+        period = text_period_expression("period") if has_function else "to_timestamp(BTRIM(\"period\"), 'DD.MM.YYYY')"
+        totals = pd.read_sql(
+            text(
+                f"""
+                WITH sales AS (
+                    SELECT
+                        BTRIM(kod::text) AS kod,
+                        REPLACE(REPLACE(regexp_replace(summa::text, '\\s', '', 'g'), CHR(160), ''), ',', '.') AS summa,
+                        REPLACE(REPLACE(regexp_replace(kolichestvo::text, '\\s', '', 'g'), CHR(160), ''), ',', '.') AS kolichestvo
+                    FROM prodazhi
+                    WHERE {period} >= :start
+                )
+                SELECT
+                    kod,
+                    COALESCE(sum(CASE WHEN summa ~ :number THEN summa::numeric END), 0)::float8 AS summa,
+                    COALESCE(sum(CASE WHEN kolichestvo ~ :number THEN kolichestvo::numeric END), 0)::float8 AS kolichestvo
+                FROM sales
+                WHERE kod IN (SELECT BTRIM(kod::text) FROM nomenklatura WHERE vidnomenklatury = 'Товар')
+                GROUP BY kod
+                """
+            ),
+            connection,
+            params={"start": pd.Timestamp(start).to_pydatetime(), "number": NUMBER_PATTERN},
         )
-        df["kolichestvo"] = (
-            df["kolichestvo"]
-            .astype(str)
-            .str.replace("\s", "", regex=True)
-            .str.replace(",", ".")
-        )
-        # Преобразуем в числовой тип данных
-        df["summa"] = pd.to_numeric(df["summa"], errors="coerce").fillna(0)
-        df["kolichestvo"] = pd.to_numeric(df["kolichestvo"], errors="coerce").fillna(0)
-        return df
-
-    # Загрузка данных из таблиц
-    prodazhi_df = pd.read_sql_table("prodazhi", con=engine)
-    nomenklatura_df = pd.read_sql_table("nomenklatura", con=engine)
-
-    # Удаление пробелов и нежелательных символов в колонке kod
-    prodazhi_df["kod"] = prodazhi_df["kod"].str.strip()
-    nomenklatura_df["kod"] = nomenklatura_df["kod"].str.strip()
-
-    # Фильтрация nomenklatura по vidnomenklatury == "Товар"
-    filtered_nomenklatura = nomenklatura_df[
-        nomenklatura_df["vidnomenklatury"] == "Товар"
-    ][["kod"]]
-
-    # Фильтрация prodazhi на основе kod из отфильтрованной nomenklatura
-    filtered_prodazhi = prodazhi_df[
-        prodazhi_df["kod"].isin(filtered_nomenklatura["kod"])
-    ].copy()
-
-    # Преобразование summa и kolichestvo
-    filtered_prodazhi = clean_and_convert_columns(filtered_prodazhi)
-
-    # Преобразование period в дату
-    filtered_prodazhi["period"] = pd.to_datetime(
-        filtered_prodazhi["period"], format="%d.%m.%Y"
-    )
-
-    # Фильтрация данных за последние 13 месяцев от текущей даты
-    current_date = pd.Timestamp.now()
-    last_13_months = current_date - pd.DateOffset(months=13)
-    last_13_months_data = filtered_prodazhi[
-        filtered_prodazhi["period"] >= last_13_months
-    ]
-
-    # ABC анализ по сумме
-    total_summa = (
-        last_13_months_data.groupby("kod")["summa"].sum().sort_values(ascending=False)
-    )
-    total_summa = total_summa[total_summa > 0]  # Оставляем только значения > 0
-    overall_summa = total_summa.sum()
-    cumulative_summa = total_summa.cumsum()
-    percent_of_total_summa = (cumulative_summa / overall_summa) * 100
-
-    def assign_abc_category(percent):
-        if percent <= 10:
-            return "A1"
-        elif percent <= 80:
-            return "A"
-        elif percent <= 95:
-            return "B"
-        else:
-            return "C"
-
-    abc_categories = percent_of_total_summa.apply(assign_abc_category)
-
-    # XYZ анализ по количеству
-    total_kolichestvo = (
-        last_13_months_data.groupby("kod")["kolichestvo"]
-        .sum()
-        .sort_values(ascending=False)
-    )
-    total_kolichestvo = total_kolichestvo[
-        total_kolichestvo > 0
-    ]  # Оставляем только значения > 0
-    overall_kolichestvo = total_kolichestvo.sum()
-    cumulative_kolichestvo = total_kolichestvo.cumsum()
-    percent_of_total_kolichestvo = (cumulative_kolichestvo / overall_kolichestvo) * 100
-
-    def assign_xyz_category(percent):
-        if percent <= 10:
-            return "X1"
-        elif percent <= 80:
-            return "X"
-        elif percent <= 95:
-            return "Y"
-        else:
-            return "Z"
-
-    xyz_categories = percent_of_total_kolichestvo.apply(assign_xyz_category)
+    # Порядок kod как у groupby в pandas, чтобы равные суммы классифицировались как раньше
+    return totals.set_index("kod").sort_index()
+
+
+def classify_by_cumulative_share(totals, thresholds=ABC_XYZ_THRESHOLDS, labels=ABC_LABELS):
+    """
+    Класс каждого kod с положительной суммой по накопленной доле (%) в общей сумме.
+
+    Доля до thresholds[0] включительно получает labels[0], до thresholds[1] — labels[1] и т.д.
+    """
+    # Сортировка до отбора положительных сумм сохраняет прежний порядок равных сумм
+    totals = totals.sort_values(ascending=False)
+    totals = totals[totals > 0]
+    percent = (totals.cumsum() / totals.sum()) * 100
+    positions = np.searchsorted(np.asarray(thresholds, dtype=float), percent.to_numpy(), side="left")
+    return pd.Series(np.asarray(labels, dtype=object)[positions], index=totals.index)
+
+
+def perform_abc_xyz_analysis(
+    engine,
+    months=13,
+    abc_thresholds=ABC_XYZ_THRESHOLDS,
+    xyz_thresholds=ABC_XYZ_THRESHOLDS,
+    reference_date=None,
+):
+    """
+    ABC-анализ по сумме и XYZ-анализ по количеству продаж за последние months месяцев.
+
+    Суммы по kod считает PostgreSQL, поэтому повторный вызов с другим окном или
+    порогами не загружает историю продаж в память.
+    """
+    # Фильтрация данных за последние months месяцев от текущей даты
+    reference_date = pd.Timestamp.now() if reference_date is None else pd.Timestamp(reference_date)
+    totals = load_sales_totals(engine, reference_date - pd.DateOffset(months=months))
+
+    abc_categories = classify_by_cumulative_share(totals["summa"], abc_thresholds, ABC_LABELS)
+    xyz_categories = classify_by_cumulative_share(totals["kolichestvo"], xyz_thresholds, XYZ_LABELS)
 
     # Формирование итогового DataFrame с колонками kod, abc и xyz
     abc_xyz_analysis = pd.DataFrame(
-        {"abc": abc_categories, "xyz": xyz_categories}, index=total_summa.index
+        {"abc": abc_categories, "xyz": xyz_categories}, index=abc_categories.index
     )
 
     return abc_xyz_analysis
@@ -0,0 +1,51 @@
+"""Запись через COPY на PostgreSQL из ``UGKOREA_TEST_DATABASE_URL``."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from ugkorea.db.bulkwrite import _csv_line, _csv_field, _integer_field, write_frame
+
+DATABASE_URL = os.getenv("UGKOREA_TEST_DATABASE_URL")
+
+
+def test_integer_field_drops_the_fraction_of_whole_floats():
+    assert _csv_line((5.0, 5.0, None), [_integer_field, _csv_field, _integer_field]) == '"5","5.0",\n'
+
+
+@pytest.fixture
+def engine():
+    if not DATABASE_URL:
+        pytest.skip("UGKOREA_TEST_DATABASE_URL не задан")
+    engine = create_engine(DATABASE_URL)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS bulkwrite_test"))
+        connection.execute(text("CREATE TABLE bulkwrite_test (kod text, kolichestvo bigint, tsena double precision)"))
+    yield engine
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE bulkwrite_test"))
+    engine.dispose()
+
+
+def test_float_column_with_a_blank_goes_into_bigint(engine):
+    # Один пропуск делает колонку количества float
+    frame = pd.DataFrame({"kod": ["001", "002", "003"], "kolichestvo": [5.0, np.nan, 12.0], "tsena": [1.5, 2.0, 3.0]})
+    assert frame["kolichestvo"].dtype == float
+    with engine.begin() as connection:
+        assert write_frame(frame, "bulkwrite_test", connection).rows == 3
+    stored = pd.read_sql("SELECT * FROM bulkwrite_test ORDER BY kod", engine)
+    assert stored["kolichestvo"].tolist()[::2] == [5, 12]
+    assert stored["kolichestvo"].isna().tolist() == [False, True, False]
+    assert stored["tsena"].tolist() == [1.5, 2.0, 3.0]
+
+
+def test_fractional_value_for_bigint_is_cast_by_insert_like_before(engine):
+    frame = pd.DataFrame({"kod": ["001", "002"], "kolichestvo": [2.5, 3.0], "tsena": [1.0, 1.0]})
+    with engine.begin() as connection:
+        write_frame(frame, "bulkwrite_test", connection)
+        write_frame(frame.assign(kod=["101", "102"]), "bulkwrite_test", connection, method=None)
+    stored = pd.read_sql("SELECT kod, kolichestvo FROM bulkwrite_test ORDER BY kod", engine)
+    assert stored["kolichestvo"].tolist() == [3, 3, 3, 3]
@@ -0,0 +1,34 @@
+"""Расчет full_statistic на выборке tests/fixtures против замороженного результата."""
+
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from ugkorea.statistic import calculation
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+class FrozenDatetime(datetime):
+    # Ожидаемый результат посчитан прежним построчным расчетом на ноябрь 2024 года
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 11, 15, 12, 0)
+
+
+def read_fixture(name: str, **kwargs) -> pd.DataFrame:
+    return pd.read_csv(FIXTURES / f"statistic_{name}.csv", float_precision="round_trip", **kwargs)
+
+
+def test_calculate_sales_metrics_matches_frozen_output(monkeypatch):
+    monkeypatch.setattr(calculation, "datetime", FrozenDatetime)
+    sales_data = read_fixture("sales_data", dtype={"kod": str})
+    sales_data["year_month"] = pd.PeriodIndex(sales_data["year_month"], freq="M")
+    union_data = read_fixture("union_data", dtype={"kod": str, "gruppa_analogov": str})
+    deliveryminprice = read_fixture("deliveryminprice", dtype={"kod": str})
+
+    result = calculation.calculate_sales_metrics(sales_data, union_data, deliveryminprice)
+
+    expected = read_fixture("full_statistic_expected", dtype={"kod": str, "gruppa_analogov": str})
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)